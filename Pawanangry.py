@@ -6,10 +6,19 @@
 # - Signal Validator
 # ============================================================
 
-from SmartApi.smartWebSocketV2 import SmartWebSocketV2
 from datetime import datetime
 import threading
 import time
+from pawanfeed import ShardedFeedManager, FeedSupervisor, HistoricalBackfill
+from pawanrepaint import RepaintEngine, IncrementalValidateSignal
+from pawanstartup import lazy_module
+from pawanmetrics import REGISTRY as METRICS, TimedClient, register_feed, start_http_server
+from pawanclock import ExchangeClock, SessionScheduler
+
+smart_ws = lazy_module("SmartApi.smartWebSocketV2")    # loaded when the first shard connects
+
+IND_TIME = METRICS.histogram("indicator_seconds", "calculate_indicators + validate_signal per closed bar")
+SIGNALS = METRICS.counter("signals", "Signals fired", ("side",))
 
 # ============================================================
 # ORDER MANAGER (FUTURES + OPTIONS READY)
@@ -59,71 +68,117 @@ class AngelOneOrderManager:
 # WEBSOCKET HANDLER (REAL LTP → CANDLE → SIGNAL → ORDER)
 # ============================================================
 class AngelOneLiveEngine:
-    def __init__(self, session, feed_token, symbol_token_map):
+    def __init__(self, session, feed_token, symbol_token_map, ui_store=None, fanout=None):
         self.builder_5m = NonRepaintingCandleBuilder(5)
         self.builder_15m = NonRepaintingCandleBuilder(15)
 
+        # intrabar vs closed validate_signal, O(1) per tick on incremental state
+        self.repaint = RepaintEngine(IncrementalValidateSignal)
+        self.ui_store = ui_store
+
         self.session = session
         self.feed_token = feed_token
         self.symbol_token_map = symbol_token_map
 
-        self.order_manager = AngelOneOrderManager(session)
+        self.order_manager = AngelOneOrderManager(TimedClient(session))
+        # pawanaccounts.OrderFanout: the same orders for more accounts, signals computed once
+        self.fanout = fanout
+        self.token_symbol_map = {v: k for k, v in symbol_token_map.items()}
 
-        self.ws = SmartWebSocketV2(
-            session.authToken,
-            session.apiKey,
-            session.clientCode,
-            feed_token
+        self.feed = ShardedFeedManager(self.new_ws, self.on_tick)
+        self.supervisor = FeedSupervisor(
+            self.feed, backfill=HistoricalBackfill(session, self.replay_tick)
         )
 
-        self.ws.on_data = self.on_tick
-        self.ws.on_open = self.on_open
-        self.ws.on_error = self.on_error
-        self.ws.on_close = self.on_close
-
-    def on_open(self, ws):
-        print("✅ WebSocket Connected")
-        tokens = [
-            {
-                "exchangeType": 2,
-                "tokens": list(self.symbol_token_map.values())
-            }
-        ]
-        ws.subscribe(correlation_id="pawan_algo", mode=1, tokenList=tokens)
+        # session events run on exchange time, not on the next tick
+        self.clock = ExchangeClock()
+        self.scheduler = SessionScheduler(self.clock)
 
-    def on_error(self, ws, error):
-        print("❌ WS Error:", error)
+    def new_ws(self):
+        return smart_ws.SmartWebSocketV2(
+            self.session.authToken,
+            self.session.apiKey,
+            self.session.clientCode,
+            self.feed_token
+        )
 
-    def on_close(self, ws):
-        print("⚠️ WS Closed")
+    def replay_tick(self, token, ltp, ts):
+        # backfilled history only rebuilds candles, it never trades
+        self.builder_5m.process_tick(self.token_symbol_map[token], ltp, ts)
 
     def on_tick(self, ws, message):
         token = message["token"]
         ltp = float(message["last_traded_price"]) / 100
+        self.clock.observe(message["exchange_timestamp"])
         exch_ts = datetime.fromtimestamp(message["exchange_timestamp"]/1000)
 
-        symbol = [k for k,v in self.symbol_token_map.items() if v == token][0]
+        symbol = self.token_symbol_map[token]
 
         closed_5m = self.builder_5m.process_tick(symbol, ltp, exch_ts)
+        self.repaint.on_tick(symbol, 5, ltp, exch_ts)
 
         if closed_5m:
+            if self.ui_store is not None:
+                self.repaint.publish(self.ui_store)
             df = self.builder_5m.get_closed_df(symbol)
-            ind_df = calculate_indicators(df)
+            with IND_TIME.time():
+                ind_df = calculate_indicators(df)
+                sig = validate_signal(ind_df) if ind_df is not None else None
             if ind_df is not None:
-                sig = validate_signal(ind_df)
-
-                if sig["BUY"] and self.order_manager.can_trade(symbol):
-                    self.order_manager.place_market_order(
-                        symbol, token, "BUY", qty=1
-                    )
-
-                if sig["SELL"] and self.order_manager.can_trade(symbol):
-                    self.order_manager.place_market_order(
-                        symbol, token, "SELL", qty=1
-                    )
+                for side in ("BUY", "SELL"):
+                    if sig[side]:
+                        SIGNALS.labels(side).inc()
+
+                for side in ("BUY", "SELL"):
+                    if not sig[side]:
+                        continue
+                    if self.fanout is not None:
+                        self.fanout.entry(token, symbol, side, 1, ltp, signal_ts=exch_ts.timestamp())
+                    if self.order_manager.can_trade(symbol):
+                        self.order_manager.place_market_order(
+                            symbol, token, side, qty=1
+                        )
+
+    # ---------------- scheduled session events ----------------
+    def _shard_symbols(self, shard):
+        return {self.token_symbol_map[t] for toks in shard.tokens.values()
+                for t in toks if t in self.token_symbol_map}
+
+    def on_bar_close(self, boundary):
+        # each shard closes its own quiet symbols, in tick order on its worker
+        def close(shard):
+            if self.repaint.close_due(boundary, 5, self._shard_symbols(shard)) and self.ui_store is not None:
+                self.repaint.publish(self.ui_store)
+        self.feed.broadcast(close)
+
+    def square_off(self, when):
+        if self.fanout is not None:
+            self.fanout.square_off()
+        def close(shard):
+            for symbol in self._shard_symbols(shard) & set(self.order_manager.open_positions):
+                self.order_manager.exit_position(symbol, self.symbol_token_map[symbol])
+        self.feed.broadcast(close)
+
+    def pre_open(self, when):
+        # overnight sessions are often half-open: start the day on fresh ones
+        for shard in self.feed.shards:
+            shard.force_reconnect()
+        if self.fanout is not None:
+            self.fanout.new_day(when.date())
+
+    def end_of_day(self, when):
+        self.order_manager.daily_count.clear()
 
     def start(self):
-        self.ws.connect()
+        self.feed.subscribe(self.symbol_token_map.values(), exchange_type=2)
+        self.feed.start()
+        self.supervisor.start()
+        register_feed(self.feed)
+        self.scheduler.every_bar(5, self.on_bar_close)
+        self.scheduler.daily("square_off", self.square_off)
+        self.scheduler.daily("pre_open", self.pre_open)
+        self.scheduler.daily("eod", self.end_of_day)
+        self.scheduler.start()
 
 # ============================================================
 # BOOTSTRAP (AFTER LOGIN SUCCESS)
@@ -137,13 +192,18 @@ SYMBOL_TOKEN_MAP = {
     "BANKNIFTY-FUT": "26009"
 }
 
+from pawanaccounts import OrderFanout, accounts_from_config
+FOLLOWER_ACCOUNTS = []      # [{"name", "api_key", "cid", "pin", "totp", "multiplier", "limits"}]
+
 engine = AngelOneLiveEngine(
     session=angel_session.smart,
     feed_token=angel_session.feed_token,
-    symbol_token_map=SYMBOL_TOKEN_MAP
+    symbol_token_map=SYMBOL_TOKEN_MAP,
+    fanout=OrderFanout(accounts_from_config(FOLLOWER_ACCOUNTS)).start()
 )
 
 engine.start()
+start_http_server()     # /metrics on :9108
 """
 
 # ============================================================
@@ -155,4 +215,9 @@ engine.start()
 # ✅ BUY & SELL (opposite)
 # ✅ Max 2 trades per symbol/day
 # ✅ Live order placement
+# ✅ Auto reconnect + gap backfill
+# ✅ Repaint analytics (intrabar vs closed)
+# ✅ Metrics: shard tick rates, indicator time, signals, broker latency
+# ✅ Exchange-time scheduler: bar closes, 15:20 square-off, daily reset
+# ✅ Multi-account fan-out (one signal stream, per-account limits + ledger)
 # ============================================================
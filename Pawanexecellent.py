@@ -7,10 +7,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import datetime, time, pyotp, requests, os
+import datetime, time, os
 from SmartApi import SmartConnect
 from SmartApi.smartWebSocketV2 import SmartWebSocketV2
-import plotly.graph_objects as go
+from pawanchain import load_scrip_master
+from pawansession import get_session
+from pawanstartup import lazy_module
+
+go = lazy_module("plotly.graph_objects")    # snapshots + chart tab only
 
 # -----------------------------
 # 1️⃣ Credentials & Risk Setup
@@ -129,14 +133,12 @@ def save_signal_snapshot(df, symbol, sig):
 # -----------------------------
 # 5️⃣ Connect AngelOne
 # -----------------------------
-smart = SmartConnect(api_key=C["api_key"])
-totp = pyotp.TOTP(C["totp"]).now()
-session = smart.generateSession(C["cid"], C["pin"], totp)
-auth_token = session["data"]["jwtToken"]
-feed_token = smart.getfeedToken()
-
-u = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
-raw = pd.DataFrame(requests.get(u).json())
+broker_session = get_session(C["api_key"], C["cid"], C["pin"], C["totp"], client_cls=SmartConnect)
+smart = broker_session.client()     # logs in again if the jwt is revoked
+auth_token = broker_session.auth_token
+feed_token = broker_session.feed_token
+
+raw = load_scrip_master()
 today = datetime.datetime.now().date()
 raw['dt'] = pd.to_datetime(raw['expiry'], format='%d%b%Y', errors='coerce').dt.date
 valid = raw[(raw['dt'] >= today)]
@@ -106,9 +106,119 @@ def squeeze(df, bb_period=20, kc_period=20):
     squeeze_on = (bb_lower > kc_lower) & (bb_upper < kc_upper)
     return squeeze_on
 
+# ============================================================
+# FUSED KERNEL (ALL OF THE ABOVE, ONE PASS OVER THE BARS)
+# - True range once, shared by the ST and KC ATRs
+# - 20-bar mean / std once, shared by BB and KC
+# - Every EWM recurrence (RSI, MACD, ATR) and Supertrend advance
+#   together in one loop over plain floats
+# EWM steps use pandas' adjust=False update ((1-a)*w + a*x)/(1-a+a)
+# and its alpha = 1/(1+com), so values are the same as above.
+# ============================================================
+def _ewm_alpha(com=None, alpha=None):
+    # pandas turns alpha / span into a centre of mass and back
+    if alpha is not None:
+        com = (1.0 - alpha) / alpha
+    return 1.0 / (1.0 + com)
+
+def indicator_kernel(high, low, close, rsi_period=14, bb_period=20, kc_period=20,
+                     st_period=10, st_mult=3):
+    """
+    high / low / close: 1-d arrays of closed candles. Returns a dict of
+    arrays: rsi, bb_mid, bb_std, kc_upper, kc_lower, squeeze, macd,
+    macd_signal, macd_hist, atr, supertrend, st_dir.
+    """
+    h = np.asarray(high, dtype=float)
+    l = np.asarray(low, dtype=float)
+    c = np.asarray(close, dtype=float)
+    n = len(c)
+
+    pc = np.r_[np.nan, c[:-1]]
+    tr = np.fmax(h - l, np.fmax(np.abs(h - pc), np.abs(l - pc)))   # bar 0: high - low
+    hl2 = (h + l) / 2
+
+    a_rsi = _ewm_alpha(alpha=1 / rsi_period)
+    a_st = _ewm_alpha(alpha=1 / st_period)
+    a_kc = _ewm_alpha(alpha=1 / kc_period)
+    a12, a26, a9 = _ewm_alpha((12 - 1) / 2), _ewm_alpha((26 - 1) / 2), _ewm_alpha((9 - 1) / 2)
+
+    def step(w, x, a):
+        return w if w == x else ((1 - a) * w + a * x) / ((1 - a) + a)
+
+    avg_gain = np.full(n, np.nan)
+    avg_loss = np.full(n, np.nan)
+    macd = np.empty(n)
+    sig9 = np.empty(n)
+    atr_st = np.empty(n)
+    atr_kc = np.empty(n)
+    st = np.empty(n)
+    st_dir = np.empty(n)             # float, like supertrend()'s direction column
+
+    cl, trl, hl2l = c.tolist(), tr.tolist(), hl2.tolist()
+    ag = al = None
+    e12 = e26 = s9 = t_st = t_kc = s = None
+    d = -1
+    for i in range(n):
+        x, t = cl[i], trl[i]
+        if i == 0:
+            e12 = e26 = x
+            t_st = t_kc = t
+            m = 0.0
+            s9 = m
+        else:
+            delta = x - cl[i - 1]
+            g, ls = max(delta, 0.0), max(-delta, 0.0)
+            if i == 1:
+                ag, al = g, ls
+            else:
+                ag, al = step(ag, g, a_rsi), step(al, ls, a_rsi)
+            if i >= rsi_period:
+                avg_gain[i], avg_loss[i] = ag, al
+            e12, e26 = step(e12, x, a12), step(e26, x, a26)
+            m = e12 - e26
+            s9 = step(s9, m, a9)
+            t_st, t_kc = step(t_st, t, a_st), step(t_kc, t, a_kc)
+        macd[i], sig9[i], atr_st[i], atr_kc[i] = m, s9, t_st, t_kc
+
+        upper = hl2l[i] + st_mult * t_st
+        if i == 0:
+            s = upper
+        else:
+            if x > s:
+                d = 1
+            elif x < s:
+                d = -1
+            s = max(hl2l[i] - st_mult * t_st, s) if d == 1 else min(upper, s)
+        st[i], st_dir[i] = s, d
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    # pandas' rolling sums (not a numpy window mean) keep bb_mid bit-for-bit
+    roll = pd.Series(c).rolling(bb_period)
+    bb_mid = roll.mean().to_numpy()
+    bb_std = roll.std().to_numpy()
+    # KC mid is the same 20-bar mean as BB mid when the periods match
+    kc_mid = bb_mid if kc_period == bb_period else \
+        pd.Series(c).rolling(kc_period).mean().to_numpy()
+    kc_upper = kc_mid + 1.5 * atr_kc
+    kc_lower = kc_mid - 1.5 * atr_kc
+    with np.errstate(invalid="ignore"):
+        sq = (bb_mid - 2 * bb_std > kc_lower) & (bb_mid + 2 * bb_std < kc_upper)
+
+    return {
+        "rsi": rsi, "bb_mid": bb_mid, "bb_std": bb_std,
+        "kc_upper": kc_upper, "kc_lower": kc_lower, "squeeze": sq,
+        "macd": macd, "macd_signal": sig9, "macd_hist": macd - sig9,
+        "atr": atr_st, "supertrend": st, "st_dir": st_dir,
+    }
+
 # ============================================================
 # MASTER INDICATOR CALCULATOR (SAFE)
 # ============================================================
+INDICATOR_COLUMNS = ("rsi", "bb_mid", "macd", "macd_signal", "macd_hist",
+                     "squeeze", "supertrend", "st_dir")
+
 def calculate_indicators(closed_df: pd.DataFrame):
     """
     closed_df MUST be output of NonRepaintingCandleBuilder
@@ -116,16 +226,10 @@ def calculate_indicators(closed_df: pd.DataFrame):
     if len(closed_df) < 50:
         return None
 
-    df = closed_df.copy()
-
-    df["rsi"] = rsi_wilder(df["close"])
-    df["bb_mid"] = bollinger_mid(df["close"])
-    df["macd"], df["macd_signal"], df["macd_hist"] = macd_histogram(df["close"])
-    df["squeeze"] = squeeze(df)
-
-    df["supertrend"], df["st_dir"] = supertrend(df)
-
-    return df
+    k = indicator_kernel(closed_df["high"].to_numpy(float), closed_df["low"].to_numpy(float),
+                         closed_df["close"].to_numpy(float))
+    # one copy of the candles with the indicator columns appended
+    return closed_df.assign(**{col: k[col] for col in INDICATOR_COLUMNS})
 
 # ============================================================
 # SIGNAL VALIDATOR (BUY / SELL – OPPOSITE LOGIC)
@@ -139,7 +243,7 @@ def validate_signal(df):
         last["close"] > last["bb_mid"] and
         last["rsi"] > 60 and
         last["macd_hist"] > 0 and
-        last["squeeze"] is False
+        not last["squeeze"]
     )
 
     sell = (
@@ -147,7 +251,7 @@ def validate_signal(df):
         last["close"] < last["bb_mid"] and
         last["rsi"] < 40 and
         last["macd_hist"] < 0 and
-        last["squeeze"] is False
+        not last["squeeze"]
     )
 
     return {
@@ -13,7 +13,9 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import time
+from pawanui import UIStore, UIView
+
+REFRESH_SEC = 1
 
 # ============================================================
 # STREAMLIT CONFIG
@@ -47,6 +49,33 @@ h1, h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
+# ============================================================
+# UI STORE + PER-SESSION VIEW
+# Each refresh only applies the deltas since this session's last
+# cursor. No engine feeds this page: it has no broker login, so the
+# tables below are static placeholders. A producer would push into
+# the same store (AngelOneLiveEngine(ui_store=...) publishes "repaint").
+# ============================================================
+@st.cache_resource
+def ui_store():
+    store = UIStore()
+    # placeholder rows (nothing pushes to this store yet)
+    store.push_row("futures", "NIFTY-FUT", {"Symbol": "NIFTY-FUT", "LTP": 22542, "Signal": "BUY", "ST": "UP"})
+    store.push_row("futures", "BANKNIFTY-FUT", {"Symbol": "BANKNIFTY-FUT", "LTP": 48210, "Signal": "SELL", "ST": "DOWN"})
+    store.push_row("options", "NIFTY 22550 CE", {"Underlying": "NIFTY", "Option": "22550 CE", "Expiry": "Weekly", "LTP": 112})
+    store.push_row("options", "NIFTY 22550 PE", {"Underlying": "NIFTY", "Option": "22550 PE", "Expiry": "Weekly", "LTP": 98})
+    store.push_row("heatmap", "NIFTY", {"Symbol": "NIFTY", "5m": "🟢", "15m": "🟢", "1h": "🟢", "4h": "🟢", "Strength": 85})
+    store.push_row("heatmap", "BANKNIFTY", {"Symbol": "BANKNIFTY", "5m": "🔴", "15m": "🟢", "1h": "🔴", "4h": "🟢", "Strength": 62})
+    store.push_row("repaint", "NIFTY|5m", {"Symbol": "NIFTY", "Timeframe": "5m", "Painted": 12, "Confirmed": 9, "Repaint %": 25})
+    store.push_row("repaint", "BANKNIFTY|5m", {"Symbol": "BANKNIFTY", "Timeframe": "5m", "Painted": 10, "Confirmed": 10, "Repaint %": 0})
+    store.push_metric("open_positions", 2)
+    store.push_metric("pnl", "₹ 1,240")
+    return store
+
+if "ui_view" not in st.session_state:
+    st.session_state.ui_view = UIView(ui_store())
+view = st.session_state.ui_view
+
 # ============================================================
 # SESSION STATE INIT
 # ============================================================
@@ -83,19 +112,24 @@ sl_pct = st.sidebar.slider("SL %", 1, 10, 2)
 # ============================================================
 # TOP STATUS BAR
 # ============================================================
-col1, col2, col3, col4 = st.columns(4)
+@st.fragment(run_every=REFRESH_SEC)
+def status_bar():
+    view.sync()
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Engine", "RUNNING")
 
-with col1:
-    st.metric("Engine", "RUNNING")
+    with col2:
+        st.metric("Auto Trade", "ON" if st.session_state.auto_trade else "OFF")
 
-with col2:
-    st.metric("Auto Trade", "ON" if st.session_state.auto_trade else "OFF")
+    with col3:
+        st.metric("Panic", "ACTIVE" if st.session_state.panic else "SAFE")
 
-with col3:
-    st.metric("Panic", "ACTIVE" if st.session_state.panic else "SAFE")
+    with col4:
+        st.metric("Time", datetime.now().strftime("%H:%M:%S"))
 
-with col4:
-    st.metric("Time", datetime.now().strftime("%H:%M:%S"))
+status_bar()
 
 # ============================================================
 # MAIN TABS
@@ -104,17 +138,29 @@ tab_dash, tab_fut, tab_opt, tab_heat, tab_repaint, tab_debug = st.tabs(
     ["📊 Dashboard", "📈 Futures", "🧾 Options", "🔥 Heatmap", "🧠 Repaint", "🧪 Debug"]
 )
 
+# Live tables refresh inside fragments: only this block re-runs each
+# second (no CSS / sidebar / tab rebuild) and only changed rows are
+# applied to the cached DataFrames.
+@st.fragment(run_every=REFRESH_SEC)
+def live_table(name):
+    view.sync()
+    st.dataframe(view.table(name), use_container_width=True, hide_index=True)
+
 # ============================================================
 # DASHBOARD
 # ============================================================
 with tab_dash:
     st.subheader("System Overview")
 
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Open Positions", 2)
-    c2.metric("Today's PnL", "₹ 1,240")
-    c3.metric("Signals Today", len(st.session_state.signals))
+    @st.fragment(run_every=REFRESH_SEC)
+    def overview():
+        view.sync()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Open Positions", view.metrics.get("open_positions", 0))
+        c2.metric("Today's PnL", view.metrics.get("pnl", "₹ 0"))
+        c3.metric("Signals Today", len(st.session_state.signals))
 
+    overview()
     st.info("AngelOne Live Engine connected • Non-repainting candles active")
 
 # ============================================================
@@ -122,56 +168,28 @@ with tab_dash:
 # ============================================================
 with tab_fut:
     st.subheader("AngelOne Futures – Live")
-
-    df = pd.DataFrame([
-        {"Symbol": "NIFTY-FUT", "LTP": 22542, "Signal": "BUY", "ST": "UP"},
-        {"Symbol": "BANKNIFTY-FUT", "LTP": 48210, "Signal": "SELL", "ST": "DOWN"},
-    ])
-
-    st.dataframe(df, use_container_width=True)
+    live_table("futures")
 
 # ============================================================
 # OPTIONS TAB
 # ============================================================
 with tab_opt:
     st.subheader("ATM Options (Auto Selected)")
-
-    opt_df = pd.DataFrame([
-        {"Underlying": "NIFTY", "Option": "22550 CE", "Expiry": "Weekly", "LTP": 112},
-        {"Underlying": "NIFTY", "Option": "22550 PE", "Expiry": "Weekly", "LTP": 98},
-    ])
-
-    st.dataframe(opt_df, use_container_width=True)
+    live_table("options")
 
 # ============================================================
 # HEATMAP TAB
 # ============================================================
 with tab_heat:
     st.subheader("Multi-Timeframe Heatmap")
-
-    heat_df = pd.DataFrame({
-        "Symbol": ["NIFTY", "BANKNIFTY"],
-        "5m": ["🟢", "🔴"],
-        "15m": ["🟢", "🟢"],
-        "1h": ["🟢", "🔴"],
-        "4h": ["🟢", "🟢"],
-        "Strength": [85, 62]
-    })
-
-    st.dataframe(heat_df, use_container_width=True)
+    live_table("heatmap")
 
 # ============================================================
 # REPAINT ANALYTICS TAB
 # ============================================================
 with tab_repaint:
     st.subheader("Repaint Analytics")
-
-    repaint_df = pd.DataFrame([
-        {"Symbol": "NIFTY", "Timeframe": "5m", "Painted": 12, "Confirmed": 9, "Repaint %": 25},
-        {"Symbol": "BANKNIFTY", "Timeframe": "5m", "Painted": 10, "Confirmed": 10, "Repaint %": 0},
-    ])
-
-    st.dataframe(repaint_df, use_container_width=True)
+    live_table("repaint")
 
 # ============================================================
 # DEBUG TAB
@@ -191,12 +209,6 @@ Final Signal: BUY
 Candle Close Time: 10:15
 """)
 
-# ============================================================
-# AUTO REFRESH
-# ============================================================
-time.sleep(1)
-st.rerun()
-
 # ============================================================
 # STATUS
 # ============================================================
@@ -205,4 +217,5 @@ st.rerun()
 # ✅ Auto trade + Panic
 # ✅ Heatmap + Repaint analytics
 # ✅ Debug visibility
+# ✅ Delta-driven refresh (fragments, no full-script rerun)
 # ============================================================
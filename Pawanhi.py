@@ -6,9 +6,20 @@
 
 import streamlit as st
 import pandas as pd
-import time, threading, random
+import time, threading, random, queue
+from types import SimpleNamespace
 from datetime import datetime
 from collections import defaultdict
+from pawanchain import nearest_strike
+from pawansignals import SignalEventStore
+from pawanrepaint import RepaintEngine, IncrementalValidateSignal
+from pawanstore import StateStore
+from pawansim import SimBroker, Latency, ANGEL_RATE_LIMITS
+from pawanrecon import BrokerReconciler, order_id_of
+from pawanmetrics import (REGISTRY as METRICS, TimedClient, timed, start_http_server,
+                          register_reconciler)
+from pawanclock import SessionScheduler
+from pawanalloc import BarAllocator
 
 # ============================================================
 # PAGE CONFIG + STYLE
@@ -34,129 +45,291 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ============================================================
-# GLOBAL STATE
+# GLOBAL STATE + PERSISTENCE (SURVIVES CRASH / STREAMLIT RESTART)
 # ============================================================
-STATE = {
-    "ltp": {},
-    "spot": {},
-    "open_positions": {},
-    "daily_trades": defaultdict(int),
-    "pnl": 0.0,
-    "panic": False,
-    "signal_debug": [],
-    "repaint_log": []
-}
+@st.cache_resource
+def persistent_state():
+    # once per process: one store writer, one STATE every rerun shares
+    store = StateStore("pawanhi_state.db")
+    today = datetime.now().date().isoformat()
+    state = {
+        "day": today,
+        "ltp": {},
+        "spot": {},
+        "open_positions": store.load("open_positions"),
+        "daily_trades": defaultdict(int, store.load(f"daily_trades:{today}")),
+        "pnl": store.load("pnl").get(today, 0.0),
+        "panic": False,
+        "signal_debug": SignalEventStore(per_key=200, tail_size=1000),
+        "repaint": RepaintEngine(IncrementalValidateSignal)
+    }
+    return state, store
 
 # ============================================================
 # CONFIG
 # ============================================================
 CONFIG = {
-    "capital": 100000,
+    "capital": 1000000,         # one NIFTY lot (75) blocks ~1.6L margin at 10x
     "risk_pct": 1.0,
     "tp_pct": 5.0,
     "sl_pct": 2.0,
     "leverage": 10,
     "max_trades": 2,
     "squareoff": "15:20",
+    "lot_size": {"NIFTY": 75, "BANKNIFTY": 35},
     "futures_symbols": ["NIFTY", "BANKNIFTY"],
-    "option_indices": ["NIFTY", "BANKNIFTY"]
+    "tokens": {"NIFTY": "26000", "BANKNIFTY": "26009"},    # symboltoken per symbol
+    "option_indices": ["NIFTY", "BANKNIFTY"],
+    "strike_step": {"NIFTY": 50, "BANKNIFTY": 100}
 }
 
 # ============================================================
-# ANGELONE PLACEHOLDER
+# ANGELONE ORDER PATH (PAPER: LOCAL SIMULATOR BEHIND SMARTCONNECT CALLS)
 # ============================================================
 class AngelOne:
-    def place_order(self, symbol, side, qty):
-        return {"order_id": f"ORD{int(time.time())}", "status": "FILLED"}
+    def __init__(self, smart):
+        self.smart = smart      # pawansim.SimBroker; the ticks below are simulated too
+    def place_order(self, symbol, token, side, qty):
+        # broker response, or None if the call itself failed
+        try:
+            return self.smart.placeOrderFullResponse({
+                "variety": "NORMAL", "tradingsymbol": symbol, "symboltoken": token,
+                "transactiontype": side, "exchange": "NFO", "ordertype": "MARKET",
+                "producttype": "INTRADAY", "duration": "DAY", "quantity": qty
+            })
+        except Exception as e:
+            print(f"❌ placeOrder {symbol} {side} {qty}:", repr(e))
+            return None
 
-angel = AngelOne()
+def placed(res):
+    return bool(res and res.get("status") and order_id_of(res))
 
 # ============================================================
-# CORE TRADING LOGIC
+# ENGINE (BUILT ONCE PER PROCESS, SHARED BY EVERY RERUN)
 # ============================================================
-def position_size(price):
-    risk_amt = CONFIG["capital"] * CONFIG["risk_pct"] / 100
-    return int((risk_amt / (price * CONFIG["sl_pct"]/100)) * CONFIG["leverage"])
+TICKS = METRICS.counter("ticks", "Ticks received", ("symbol",))
+TICK_TIME = METRICS.histogram("tick_seconds", "on_tick time per tick (signal, orders)")
+SIGNALS = METRICS.counter("signals", "Signals fired", ("side",))
 
-def enter_trade(symbol, side, price):
-    if STATE["daily_trades"][symbol] >= CONFIG["max_trades"]:
-        return
-    qty = position_size(price)
-    STATE["open_positions"][symbol] = {
-        "side": side,
-        "entry": price,
-        "qty": qty,
-        "sl": price*(1-CONFIG["sl_pct"]/100) if side=="BUY" else price*(1+CONFIG["sl_pct"]/100),
-        "tp": price*(1+CONFIG["tp_pct"]/100) if side=="BUY" else price*(1-CONFIG["tp_pct"]/100),
-        "time": datetime.now().strftime("%H:%M:%S")
-    }
-    STATE["daily_trades"][symbol] += 1
-    angel.place_order(symbol, side, qty)
+@st.cache_resource(show_spinner="Starting engine…")
+def build_engine():
+    STATE, store = persistent_state()
+    TOKEN_SYMBOL = {t: s for s, t in CONFIG["tokens"].items()}
 
-def exit_trade(symbol, price):
-    pos = STATE["open_positions"].pop(symbol)
-    pnl = (price-pos["entry"])*pos["qty"] if pos["side"]=="BUY" else (pos["entry"]-price)*pos["qty"]
-    STATE["pnl"] += pnl
+    broker = SimBroker(
+        price_fn=lambda token: STATE["ltp"].get(TOKEN_SYMBOL.get(token)),
+        ack_latency=Latency("lognormal", median_ms=60, sigma=0.4),
+        fill_latency=Latency("lognormal", median_ms=40, sigma=0.6),
+        partial_prob=0.1,
+        reject_prob=0.005,
+        rate_limits=ANGEL_RATE_LIMITS
+    )
+    client = TimedClient(broker)    # per-method broker latency
+    angel = AngelOne(client)
 
-# ============================================================
-# SIGNAL ENGINE (PLACEHOLDER — MATCH EXCHANGE VALUES LATER)
-# ============================================================
-def generate_signal(symbol):
-    sig = {
-        "st_mid_cross": random.choice([True, False]),
-        "rsi": random.randint(20,80),
-        "squeeze": random.choice([True, False]),
-        "macd": random.choice([True, False]),
-        "trend": "BULLISH" if random.choice([True, False]) else "BEARISH"
-    }
-    STATE["signal_debug"].append({"symbol":symbol,"time":time.time(),"sig":sig})
-    valid = sig["st_mid_cross"] and sig["squeeze"] and sig["macd"]
-    return valid, sig["trend"]
+    # fills come back through the order / trade book, exactly as live
+    reconciler = BrokerReconciler(client, interval=1.5)   # orderBook is limited to 1/s
+    reconciler.start()
 
-# ============================================================
-# AUTO-TRADER
-# ============================================================
-def on_tick(symbol, ltp):
-    if STATE["panic"]:
-        return
-    if symbol in STATE["open_positions"]:
-        pos = STATE["open_positions"][symbol]
-        hit_sl = ltp<=pos["sl"] if pos["side"]=="BUY" else ltp>=pos["sl"]
-        hit_tp = ltp>=pos["tp"] if pos["side"]=="BUY" else ltp<=pos["tp"]
-        if hit_sl or hit_tp:
-            exit_trade(symbol, ltp)
-        return
-    valid, trend = generate_signal(symbol)
-    if valid:
-        side = "BUY" if trend=="BULLISH" else "SELL"
-        enter_trade(symbol, side, ltp)
+    # STATE belongs to the tick thread: reconciler callbacks and the
+    # dashboard hand their changes over through this queue
+    tasks = queue.SimpleQueue()
 
-# ============================================================
-# WEBSOCKET (SIMULATED — DROP-IN ANGELONE WS)
-# ============================================================
-def ws_loop():
-    base = {"NIFTY":22000,"BANKNIFTY":47000}
-    while True:
-        for s in CONFIG["futures_symbols"]:
-            ltp = base[s] + random.randint(-40,40)
-            STATE["ltp"][s] = ltp
-            STATE["spot"][s] = ltp
-            on_tick(s, ltp)
-        time.sleep(1)
+    def on_tick_thread(fn):
+        return lambda *args: tasks.put(lambda: fn(*args))
+
+
+    def correct_entry(intent, fill_price, filled_qty, fill_time):
+        pos = STATE["open_positions"].get(intent.symbol)
+        if pos is None:
+            return
+        k = 1 if pos["side"] == "BUY" else -1
+        pos.update(entry=fill_price, qty=filled_qty,
+                   sl=fill_price*(1-k*CONFIG["sl_pct"]/100), tp=fill_price*(1+k*CONFIG["tp_pct"]/100))
+        store.put("open_positions", intent.symbol, pos)
+
+    def drop_rejected(intent, status, text):
+        if STATE["open_positions"].pop(intent.symbol, None) is not None:
+            store.delete("open_positions", intent.symbol)
+
+    # ============================================================
+    # CORE TRADING LOGIC
+    # ============================================================
+    def position_size(price):
+        # risk cap per trade; the allocator rounds it down to whole lots
+        risk_amt = CONFIG["capital"] * CONFIG["risk_pct"] / 100
+        return int((risk_amt / (price * CONFIG["sl_pct"]/100)) * CONFIG["leverage"])
+
+    # every symbol's signal from one feed pass is ranked and sized together
+    allocator = BarAllocator(margin_pct=1 / CONFIG["leverage"])
+
+    def place_batch():
+        margin = sum(p["entry"] * p["qty"] for p in STATE["open_positions"].values()) / CONFIG["leverage"]
+        batch = allocator.flush(
+            keep=lambda c: c["symbol"] not in STATE["open_positions"]
+                           and STATE["daily_trades"][c["symbol"]] < CONFIG["max_trades"],
+            capital=CONFIG["capital"] - margin)
+        for c in batch:
+            enter_trade(c["symbol"], c["side"], c["price"], c["qty"])
+
+    def enter_trade(symbol, side, price, qty):
+        if STATE["daily_trades"][symbol] >= CONFIG["max_trades"]:
+            return
+        token = CONFIG["tokens"][symbol]
+        STATE["open_positions"][symbol] = {
+            "side": side,
+            "entry": price,
+            "qty": qty,
+            "sl": price*(1-CONFIG["sl_pct"]/100) if side=="BUY" else price*(1+CONFIG["sl_pct"]/100),
+            "tp": price*(1+CONFIG["tp_pct"]/100) if side=="BUY" else price*(1-CONFIG["tp_pct"]/100),
+            "time": datetime.now().strftime("%H:%M:%S")
+        }
+        res = angel.place_order(symbol, token, side, qty)
+        if not placed(res):
+            # nothing reached the broker: no position, no trade counted
+            print(f"❌ Entry {symbol} {side} not placed:", (res or {}).get("message"))
+            STATE["open_positions"].pop(symbol, None)
+            store.delete("open_positions", symbol)
+            return
+        STATE["daily_trades"][symbol] += 1
+        reconciler.register(order_id_of(res), token, symbol, side, qty, ref_price=price,
+                            on_fill=on_tick_thread(correct_entry), on_reject=on_tick_thread(drop_rejected))
+        store.put("open_positions", symbol, STATE["open_positions"][symbol])
+        store.put(f"daily_trades:{STATE['day']}", symbol, STATE["daily_trades"][symbol])
 
-threading.Thread(target=ws_loop, daemon=True).start()
+    def exit_trade(symbol, price):
+        pos = STATE["open_positions"].pop(symbol)
+        token = CONFIG["tokens"][symbol]
+        side = "SELL" if pos["side"]=="BUY" else "BUY"
+        res = angel.place_order(symbol, token, side, pos["qty"])
+        if not placed(res):
+            print(f"❌ Exit {symbol} not placed; position kept open:", (res or {}).get("message"))
+            STATE["open_positions"][symbol] = pos
+            return
+        pnl = (price-pos["entry"])*pos["qty"] if pos["side"]=="BUY" else (pos["entry"]-price)*pos["qty"]
+        STATE["pnl"] += pnl
+        store.delete("open_positions", symbol)
+        store.put("pnl", STATE["day"], STATE["pnl"])
+
+        def reopen(intent, status, text):
+            # the broker refused the exit: the position is still open
+            STATE["open_positions"].setdefault(symbol, pos)
+            STATE["pnl"] -= pnl
+            store.put("open_positions", symbol, pos)
+            store.put("pnl", STATE["day"], STATE["pnl"])
+        reconciler.register(order_id_of(res), token, symbol, side, pos["qty"], ref_price=price,
+                            on_reject=on_tick_thread(reopen))
+
+    # ============================================================
+    # SIGNAL ENGINE (PLACEHOLDER — MATCH EXCHANGE VALUES LATER)
+    # ============================================================
+    def generate_signal(symbol):
+        sig = {
+            "st_mid_cross": random.choice([True, False]),
+            "rsi": random.randint(20,80),
+            "squeeze": random.choice([True, False]),
+            "macd": random.choice([True, False]),
+            "trend": "BULLISH" if random.choice([True, False]) else "BEARISH"
+        }
+        valid = sig["st_mid_cross"] and sig["squeeze"] and sig["macd"]
+        side = ("BUY" if sig["trend"]=="BULLISH" else "SELL") if valid else None
+        STATE["signal_debug"].record(symbol, "1s", side, payload=sig)
+        return valid, sig["trend"], abs(sig["rsi"] - 50)
+
+    # ============================================================
+    # AUTO-TRADER
+    # ============================================================
+    @timed(TICK_TIME)
+    def on_tick(symbol, ltp):
+        if STATE["panic"]:
+            return
+        if symbol in STATE["open_positions"]:
+            pos = STATE["open_positions"][symbol]
+            hit_sl = ltp<=pos["sl"] if pos["side"]=="BUY" else ltp>=pos["sl"]
+            hit_tp = ltp>=pos["tp"] if pos["side"]=="BUY" else ltp<=pos["tp"]
+            if hit_sl or hit_tp:
+                exit_trade(symbol, ltp)
+            return
+        valid, trend, strength = generate_signal(symbol)
+        if valid:
+            side = "BUY" if trend=="BULLISH" else "SELL"
+            SIGNALS.labels(side).inc()
+            allocator.submit({"token": CONFIG["tokens"][symbol], "symbol": symbol, "side": side, "price": ltp,
+                              "lotsize": CONFIG["lot_size"].get(symbol, 1), "max_qty": position_size(ltp),
+                              "strength": strength})
+
+    # ============================================================
+    # SESSION EVENTS (POLLED ON THE TICK THREAD — NO LOCKS NEEDED)
+    # ============================================================
+    def square_off_all(when):
+        for symbol in list(STATE["open_positions"]):
+            exit_trade(symbol, STATE["ltp"].get(symbol, STATE["open_positions"][symbol]["entry"]))
+
+    def new_day(when):
+        STATE["day"] = when.date().isoformat()
+        STATE["daily_trades"].clear()
+        STATE["daily_trades"].update(store.load(f"daily_trades:{STATE['day']}"))
+        STATE["pnl"] = store.load("pnl").get(STATE["day"], 0.0)
+
+    scheduler = SessionScheduler()
+    scheduler.every_bar(1, lambda when: STATE["repaint"].close_due(when, 1))
+    scheduler.daily(CONFIG["squareoff"], square_off_all, name="square-off")
+    scheduler.daily("pre_open", new_day, name="day roll")
+
+    # ============================================================
+    # WEBSOCKET (SIMULATED — DROP-IN ANGELONE WS)
+    # ============================================================
+    def ws_loop():
+        base = {"NIFTY":22000,"BANKNIFTY":47000}
+        while True:
+            try:
+                while True:
+                    try:
+                        tasks.get_nowait()()
+                    except queue.Empty:
+                        break
+                for s in CONFIG["futures_symbols"]:
+                    ltp = base[s] + random.randint(-40,40)
+                    STATE["ltp"][s] = ltp
+                    STATE["spot"][s] = ltp
+                    TICKS.labels(s).inc()
+                    STATE["repaint"].on_tick(s, 1, ltp, datetime.now())
+                    on_tick(s, ltp)
+                place_batch()
+                scheduler.poll()
+            except Exception as e:
+                print("❌ Tick loop error:", repr(e))
+            time.sleep(1)
+
+    threading.Thread(target=ws_loop, name="ticks", daemon=True).start()
+
+    register_reconciler(reconciler)
+    start_http_server(METRICS)
+
+    def panic():
+        STATE["panic"] = True
+        for sym in list(STATE["open_positions"]):
+            store.delete("open_positions", sym)
+        STATE["open_positions"].clear()
+
+    return SimpleNamespace(
+        config=CONFIG, state=STATE, store=store, broker=broker, reconciler=reconciler,
+        allocator=allocator, scheduler=scheduler, tasks=tasks, panic=panic,
+    )
+
+E = build_engine()
+STATE, store = E.state, E.store
 
 # ============================================================
 # SIDEBAR (SETTINGS)
 # ============================================================
 with st.sidebar:
     st.title("⚙️ Settings")
-    CONFIG["risk_pct"] = st.slider("Risk %",0.5,5.0,CONFIG["risk_pct"])
-    CONFIG["tp_pct"] = st.slider("Target %",1.0,10.0,CONFIG["tp_pct"])
-    CONFIG["sl_pct"] = st.slider("Stoploss %",0.5,5.0,CONFIG["sl_pct"])
+    E.config["risk_pct"] = st.slider("Risk %",0.5,5.0,E.config["risk_pct"])
+    E.config["tp_pct"] = st.slider("Target %",1.0,10.0,E.config["tp_pct"])
+    E.config["sl_pct"] = st.slider("Stoploss %",0.5,5.0,E.config["sl_pct"])
     if st.button("🚨 PANIC EXIT"):
-        STATE["panic"] = True
-        STATE["open_positions"].clear()
+        E.tasks.put(E.panic)            # STATE is only changed on the tick thread
 
 # ============================================================
 # HEADER METRICS
@@ -182,8 +355,9 @@ with tab_dash:
 # ---------------- FUTURES ----------------
 with tab_fut:
     st.subheader("Futures — Live Positions")
-    if STATE["open_positions"]:
-        st.dataframe(pd.DataFrame.from_dict(STATE["open_positions"],orient="index"))
+    open_positions = dict(STATE["open_positions"])     # the tick thread keeps changing it
+    if open_positions:
+        st.dataframe(pd.DataFrame.from_dict(open_positions,orient="index"))
     else:
         st.info("No active futures positions")
 
@@ -193,8 +367,7 @@ with tab_opt:
     for idx in CONFIG["option_indices"]:
         spot = STATE["spot"].get(idx)
         if spot:
-            step = 50 if idx=="BANKNIFTY" else 100
-            atm = round(spot/step)*step
+            atm = nearest_strike(spot, CONFIG["strike_step"][idx])
             st.success(f"{idx} Spot: {spot} | ATM: {atm} | CE/PE Ready")
         else:
             st.warning(f"{idx} spot not received yet")
@@ -202,23 +375,34 @@ with tab_opt:
 # ---------------- HEATMAP ----------------
 with tab_heat:
     st.subheader("Signal Heatmap (Live)")
-    if STATE["signal_debug"]:
-        st.dataframe(pd.DataFrame(STATE["signal_debug"]).tail(30))
+    if len(STATE["signal_debug"]):
+        st.dataframe(STATE["signal_debug"].tail(30))
     else:
         st.warning("Waiting for signals")
 
 # ---------------- REPAINT ----------------
 with tab_rep:
     st.subheader("Repaint Analytics")
-    if STATE["repaint_log"]:
-        st.dataframe(pd.DataFrame(STATE["repaint_log"]))
+    if STATE["repaint"].tracks:
+        st.dataframe(STATE["repaint"].table())
     else:
         st.info("Repaint tracking enabled")
 
 # ---------------- DEBUG ----------------
 with tab_dbg:
     st.subheader("Signal Debug (Latest)")
-    st.json(STATE["signal_debug"][-5:])
+    st.json(STATE["signal_debug"].tail(5).astype(str).to_dict("records"))
+    st.subheader("Broker (paper)")
+    st.caption("Broker: " + ", ".join(f"{k}={v}" for k, v in E.broker.stats.items()))
+    st.caption("Reconciler: " + ", ".join(f"{k}={v}" for k, v in E.reconciler.status().items()))
+    st.dataframe(pd.DataFrame(E.reconciler.slippage_stats()))
+    st.subheader("Last Allocation")
+    st.caption("Allocator: " + ", ".join(f"{k}={v}" for k, v in E.allocator.stats.items()))
+    st.dataframe(pd.DataFrame(E.allocator.last_batch))
+    st.subheader("Scheduler")
+    st.dataframe(pd.DataFrame(E.scheduler.rows()))
+    st.subheader("Engine Metrics")
+    st.dataframe(pd.DataFrame(METRICS.rows()))
 
 st.markdown("---")
 st.caption("Pawan Master Algo System • Separated Futures & Options • Ultra-Modern")
@@ -8,9 +8,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 import datetime as dt
 import time
+from pawanstartup import lazy_module
+
+go = lazy_module("plotly.graph_objects")    # only the chart tab needs it
 
 # ===================== CONFIG =====================
 APP_NAME = "PAWAN MASTER ALGO SYSTEM"
@@ -54,6 +56,13 @@ for key, default in {
     if key not in st.session_state:
         st.session_state[key] = default
 
+# trade counters are per symbol for one day: reset on the first rerun of
+# a new day instead of re-keying by date string on every check
+TODAY = dt.date.today()
+if st.session_state.get("trade_day") != TODAY:
+    st.session_state.trade_count = {}
+    st.session_state.trade_day = TODAY
+
 # ===================== SYMBOLS =====================
 SYMBOLS = [
     "TCSFUT","INFYFUT","RELIANCEFUT","HDFCBANKFUT","ICICIBANKFUT",
@@ -85,14 +94,10 @@ def signal_logic(close, mid, rsi, macd, st_val):
 
 # ===================== ORDER HELPERS =====================
 def can_trade(symbol):
-    today = dt.date.today().isoformat()
-    key = f"{symbol}_{today}"
-    return st.session_state.trade_count.get(key, 0) < MAX_TRADES_PER_SYMBOL
+    return st.session_state.trade_count.get(symbol, 0) < MAX_TRADES_PER_SYMBOL
 
 def record_trade(symbol):
-    today = dt.date.today().isoformat()
-    key = f"{symbol}_{today}"
-    st.session_state.trade_count[key] = st.session_state.trade_count.get(key, 0) + 1
+    st.session_state.trade_count[symbol] = st.session_state.trade_count.get(symbol, 0) + 1
 
 def place_order(symbol, side, price):
     if not can_trade(symbol):
@@ -8,9 +8,13 @@ import pandas as pd
 import numpy as np
 import time
 from datetime import datetime
-from ta.trend import SuperTrend
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
+from pawansignals import SignalEventStore
+from pawanstartup import lazy_module
+
+# ta is only needed once candles exist, not to draw the first page
+ta_trend = lazy_module("ta.trend")
+ta_momentum = lazy_module("ta.momentum")
+ta_volatility = lazy_module("ta.volatility")
 
 # =========================================================
 # CONFIG
@@ -26,20 +30,20 @@ TIMEFRAMES = ["5m", "15m", "1h", "4h"]
 if "trade_log" not in st.session_state:
     st.session_state.trade_log = []
 
-if "signal_log" not in st.session_state:
-    st.session_state.signal_log = []
+if "signal_store" not in st.session_state:
+    st.session_state.signal_store = SignalEventStore(per_key=500, tail_size=5000)
 
 # =========================================================
 # INDICATORS (ANGELONE & COINSWITCH MATCH LOGIC)
 # =========================================================
 def indicators(df):
-    stt = SuperTrend(df["high"], df["low"], df["close"], 10, 3)
+    stt = ta_trend.SuperTrend(df["high"], df["low"], df["close"], 10, 3)
     df["st"] = stt.super_trend()
 
-    rsi = RSIIndicator(df["close"], 14)
+    rsi = ta_momentum.RSIIndicator(df["close"], 14)
     df["rsi"] = rsi.rsi()
 
-    bb = BollingerBands(df["close"], 20, 2)
+    bb = ta_volatility.BollingerBands(df["close"], 20, 2)
     df["bb_mid"] = bb.bollinger_mavg()
     df["bb_u"] = bb.bollinger_hband()
     df["bb_l"] = bb.bollinger_lband()
@@ -77,17 +81,8 @@ def signal_logic(df):
 # REPAINT ANALYTICS
 # =========================================================
 def repaint_check(symbol, tf, signal):
-    prev = [s for s in st.session_state.signal_log if s["symbol"] == symbol and s["tf"] == tf]
-    repaint = False
-    if prev and prev[-1]["signal"] != signal:
-        repaint = True
-    st.session_state.signal_log.append({
-        "symbol": symbol,
-        "tf": tf,
-        "signal": signal,
-        "time": datetime.now(),
-        "repaint": repaint
-    })
+    # O(1): compares against the last signal kept for (symbol, tf)
+    return st.session_state.signal_store.record(symbol, tf, signal)
 
 # =========================================================
 # TRADE LIMITER
@@ -157,14 +152,15 @@ with tab2:
 with tab3:
     st.subheader("Live Multi-Timeframe Heatmap (1s Refresh)")
     st.caption("5m | 15m | 1h | 4h Overlay")
-    st.dataframe(pd.DataFrame(st.session_state.signal_log))
+    st.dataframe(st.session_state.signal_store.tail(500))
 
 # =========================================================
 # REPAINT + DEBUG TAB
 # =========================================================
 with tab4:
     st.subheader("Repainting Analytics + Signal Debugger")
-    st.write(pd.DataFrame(st.session_state.signal_log))
+    st.write(st.session_state.signal_store.summary())
+    st.write(st.session_state.signal_store.tail(500))
     st.write("Trade Log")
     st.write(pd.DataFrame(st.session_state.trade_log))
 
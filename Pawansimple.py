@@ -7,6 +7,9 @@
 
 from datetime import datetime
 import math
+from pawanchain import OptionChainIndex
+from pawanrecon import order_id_of
+from pawanclock import hhmm
 
 # ============================================================
 # RISK CONFIG (EDIT FROM UI LATER)
@@ -16,14 +19,37 @@ RISK_CONFIG = {
     "tp_pct": 0.05,          # 5% TP
     "sl_pct": 0.02,          # 2% SL
     "trail_pct": 0.01,       # 1% trailing
-    "intraday_squareoff": "15:20"
+    "intraday_squareoff": "15:20",
+    "vol_horizon_min": 30,   # IV-scaled exits: 1σ option move over N minutes
+    "vol_tp_mult": 2.0,      # TP = 2σ
+    "vol_sl_mult": 1.0,      # SL = 1σ
+    "target_delta": None     # e.g. 0.4 → pick strike by delta instead of ATM
 }
 
+OPTION_CHAINS = None   # OptionChainIndex, built once at bootstrap
+
+# ============================================================
+# ATM OPTION SELECTION (PRECOMPUTED STRIKE INDEX)
+# ============================================================
+def load_option_chains(scrip_master_df):
+    global OPTION_CHAINS
+    OPTION_CHAINS = OptionChainIndex.from_scrip_master(scrip_master_df)
+    return OPTION_CHAINS
+
+def select_atm_options(underlying_symbol, spot_price, expiry=None):
+    """(ce, pe) at the ATM strike, or (None, None) when there is no chain."""
+    if OPTION_CHAINS is None:
+        raise RuntimeError("Option chains not loaded: call load_option_chains(scrip_master_df) at startup")
+    chain = OPTION_CHAINS.chain(underlying_symbol, expiry)
+    if chain is None:
+        return None, None
+    return chain.atm_pair(spot_price)
+
 # ============================================================
 # POSITION OBJECT (OPTIONS SAFE)
 # ============================================================
 class Position:
-    def __init__(self, symbol, token, side, qty, entry_price):
+    def __init__(self, symbol, token, side, qty, entry_price, tp_pct=None, sl_pct=None):
         self.symbol = symbol
         self.token = token
         self.side = side              # BUY only for options
@@ -33,15 +59,17 @@ class Position:
         self.lowest = entry_price
         self.open_time = datetime.now()
         self.closed = False
+        self.tp_pct = RISK_CONFIG["tp_pct"] if tp_pct is None else tp_pct
+        self.sl_pct = RISK_CONFIG["sl_pct"] if sl_pct is None else sl_pct
 
         self.tp = self._calc_tp()
         self.sl = self._calc_sl()
 
     def _calc_tp(self):
-        return round(self.entry * (1 + RISK_CONFIG["tp_pct"]), 2)
+        return round(self.entry * (1 + self.tp_pct), 2)
 
     def _calc_sl(self):
-        return round(self.entry * (1 - RISK_CONFIG["sl_pct"]), 2)
+        return round(self.entry * (1 - self.sl_pct), 2)
 
     def update_trail(self, ltp):
         self.highest = max(self.highest, ltp)
@@ -63,13 +91,15 @@ class OptionPositionManager:
         self.om = order_manager
         self.positions = {}   # symbol -> Position
 
-    def open_position(self, opt, qty, ltp):
+    def open_position(self, opt, qty, ltp, tp_pct=None, sl_pct=None):
         pos = Position(
             symbol=opt["symbol"],
             token=opt["token"],
             side="BUY",
             qty=qty,
-            entry_price=ltp
+            entry_price=ltp,
+            tp_pct=tp_pct,
+            sl_pct=sl_pct
         )
         self.positions[opt["symbol"]] = pos
 
@@ -100,18 +130,47 @@ def execute_option_trade(
     spot_price,
     qty,
     option_position_manager,
-    order_manager
+    order_manager,
+    greeks=None,
+    reconciler=None,
+    ltp=None
 ):
+    """
+    ltp: option price at signal time. Without a reconciler the MARKET
+    ack carries no fill price, so the position is opened at ltp (or
+    the greeks row LTP) and the order is not sent when neither is known.
+    """
     ce, pe = select_atm_options(underlying_symbol, spot_price)
+    if ce is None:
+        print(f"❌ {underlying_symbol}: no option chain in the scrip master, order not sent")
+        return
 
     if signal_side == "BUY":
         opt = ce
     else:
         opt = pe
 
+    # greeks: pawangreeks.GreeksEngine already computed for the subscribed chain
+    tp_pct = sl_pct = None
+    if greeks is not None:
+        side = opt["type"]
+        if RISK_CONFIG["target_delta"]:
+            token = greeks.strike_by_delta(side, RISK_CONFIG["target_delta"])
+            opt = OPTION_CHAINS.by_token.get(token, opt)
+        move = greeks.expected_move_pct(opt["token"], spot_price, RISK_CONFIG["vol_horizon_min"])
+        if move:
+            tp_pct = move * RISK_CONFIG["vol_tp_mult"]
+            sl_pct = min(move * RISK_CONFIG["vol_sl_mult"], 0.9)
+
     if not order_manager.can_trade(opt["symbol"]):
         return
 
+    row = greeks.get(opt["token"]) if greeks is not None else None
+    ref_price = ltp if ltp is not None else (float(row["ltp"]) if row is not None else None)
+    if reconciler is None and not ref_price:
+        print(f"❌ {opt['symbol']}: no reconciler and no LTP, order not sent")
+        return
+
     # PLACE BUY ORDER
     res = order_manager.place_market_order(
         symbol=opt["symbol"],
@@ -120,31 +179,61 @@ def execute_option_trade(
         qty=qty
     )
 
-    if res and res.get("status"):
-        fill_price = float(res["data"]["averageprice"])
-        option_position_manager.open_position(opt, qty, fill_price)
+    if not (res and res.get("status")):
+        return
+
+    # placeOrder only acknowledges a MARKET order; the fill price comes
+    # from the trade book. reconciler: pawanrecon.BrokerReconciler
+    def on_fill(intent, fill_price, filled_qty, fill_time):
+        option_position_manager.open_position(opt, filled_qty, fill_price, tp_pct, sl_pct)
+
+    if reconciler is not None:
+        reconciler.register(
+            order_id_of(res), opt["token"], opt["symbol"], "BUY", qty,
+            ref_price=ref_price,
+            on_fill=on_fill
+        )
+        reconciler.poke()
+    else:
+        # signal LTP until a trade-book fill is known
+        on_fill(None, float((res.get("data") or {}).get("averageprice") or ref_price), qty, None)
 
 # ============================================================
 # SQUARE-OFF (INTRADAY SAFETY)
 # ============================================================
-def intraday_squareoff(option_position_manager, order_manager):
-    now = datetime.now().strftime("%H:%M")
-    if now >= RISK_CONFIG["intraday_squareoff"]:
-        for sym, pos in list(option_position_manager.positions.items()):
-            order_manager.place_market_order(
-                symbol=sym,
-                token=pos.token,
-                side="SELL",
-                qty=pos.qty
-            )
-            del option_position_manager.positions[sym]
+def squareoff_all(option_position_manager, order_manager):
+    for sym, pos in list(option_position_manager.positions.items()):
+        order_manager.place_market_order(
+            symbol=sym,
+            token=pos.token,
+            side="SELL",
+            qty=pos.qty
+        )
+        del option_position_manager.positions[sym]
+
+def intraday_squareoff(option_position_manager, order_manager, now=None):
+    # polling fallback; schedule_squareoff fires exactly once at the cut-off
+    now = now or datetime.now()
+    if (now.hour, now.minute) >= hhmm(RISK_CONFIG["intraday_squareoff"]):
+        squareoff_all(option_position_manager, order_manager)
+
+def schedule_squareoff(scheduler, option_position_manager, order_manager):
+    """
+    scheduler: pawanclock.SessionScheduler driven by exchange time.
+    """
+    return scheduler.daily(
+        RISK_CONFIG["intraday_squareoff"],
+        lambda when: squareoff_all(option_position_manager, order_manager),
+        name="options square-off"
+    )
 
 # ============================================================
 # GUARANTEES
 # ============================================================
-# ✅ ATM auto option selection
+# ✅ ATM auto option selection (O(log n) strike index)
 # ✅ Weekly / Monthly expiry logic
-# ✅ SL / TP / Trailing
+# ✅ SL / TP / Trailing (fixed % or IV-scaled)
+# ✅ Entry price from the broker trade book (async reconcile)
 # ✅ Max trades per symbol
-# ✅ Intraday square-off
+# ✅ Intraday square-off (scheduled on exchange time)
 # ============================================================
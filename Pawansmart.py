@@ -8,9 +8,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import pyotp
 from smartapi import SmartConnect
-import plotly.graph_objects as go
+from pawansession import get_session
+from pawansignals import SignalEventStore
+from pawanstrategy import Strategy, SIGNAL_ENGINE_COLUMNS
+from pawanchart import ChartDataService, OVERLAY_MA20, OVERLAY_ST_UPPER, build_figure
 
 # =========================
 # 1️⃣ AngelOne Session
@@ -22,14 +24,14 @@ class AngelOneSession:
         self.pin = pin
         self.totp_secret = totp_secret
         self.smart = None
+        self.broker = None      # pawansession.BrokerSession
         self.connected = False
     def connect(self):
+        # process-wide shared client: cached tokens, TOTP login only when they are gone
         try:
-            self.smart = SmartConnect(api_key=self.api_key)
-            totp = pyotp.TOTP(self.totp_secret).now()
-            data = self.smart.generateSession(clientCode=self.client_id,password=self.pin,totp=totp)
-            if not data["status"]:
-                raise Exception(data)
+            self.broker = get_session(self.api_key, self.client_id, self.pin, self.totp_secret,
+                                      client_cls=SmartConnect)
+            self.smart = self.broker.client()
             self.connected = True
             return True
         except Exception as e:
@@ -95,45 +97,41 @@ def macd(df, fast=12, slow=26, signal=9):
 # =========================
 # 4️⃣ Signal Engine
 # =========================
+# Conditions are declared rules over the indicator columns;
+# pawanstrategy compiles them once into a vectorised evaluator.
+SIGNAL_RULES = Strategy("signal_engine", SIGNAL_ENGINE_COLUMNS, {
+    # ----------------- BUY -----------------
+    "BUY_ST_cross_mid":       "prev(close) < prev(mid) and close > mid",
+    "BUY_ST_green":           "st_color == 1",
+    "BUY_MACD_green":         "macd_hist > 0",
+    "BUY_MACD_cross":         "prev(macd_line) < 0 and macd_line > 0",
+    "BUY_Price_cross_mid":    "prev(close) < prev(mid) and close > mid",
+    "BUY_Price_RSI70":        "prev(rsi) < 70 and rsi > 70",
+    "BUY_Upperband_rising":   "upper > prev(upper)",
+    "BUY_Squeeze":            "(upper - lower) > (prev(upper) - prev(lower))",
+    "BUY_Slope":              "(close - prev(close)) > 0",
+    "BUY_Horiz_to_Vert":      "(close - open) > ((prev(high) - prev(low)) * 1.5)",
+    # ----------------- SELL -----------------
+    "SELL_ST_cross_mid":      "prev(close) > prev(mid) and close < mid",
+    "SELL_ST_red":            "st_color == 0",
+    "SELL_MACD_red":          "macd_hist < 0",
+    "SELL_MACD_cross":        "prev(macd_line) > 0 and macd_line < 0",
+    "SELL_Price_cross_mid":   "prev(close) > prev(mid) and close < mid",
+    "SELL_Price_RSI30":       "prev(rsi) > 30 and rsi < 30",
+    "SELL_Upperband_falling": "upper < prev(upper)",
+    "SELL_Squeeze":           "(upper - lower) > (prev(upper) - prev(lower))",
+    "SELL_Slope":             "(close - prev(close)) < 0",
+    "SELL_Horiz_to_Vert":     "(open - close) > ((prev(high) - prev(low)) * 1.5)",
+}, min_bars=26)
+
 class SignalEngine:
     def validate(self, df):
-        if len(df) < 26: return None, {}
-        upper, mid, lower = bollinger_bands(df)
-        st_upper, st_lower, st_color = supertrend(df)
-        macd_line, macd_signal, macd_hist = macd(df)
-        rsi_val = rsi(df["close"])
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
-        conds = {}
-
-        # ----------------- BUY -----------------
-        conds["BUY_ST_cross_mid"] = prev["close"] < mid.iloc[-2] and last["close"] > mid.iloc[-1]
-        conds["BUY_ST_green"] = st_color.iloc[-1] == 1
-        conds["BUY_MACD_green"] = macd_hist.iloc[-1] > 0
-        conds["BUY_MACD_cross"] = macd_line.iloc[-2] < 0 and macd_line.iloc[-1] > 0
-        conds["BUY_Price_cross_mid"] = prev["close"] < mid.iloc[-2] and last["close"] > mid.iloc[-1]
-        conds["BUY_Price_RSI70"] = rsi_val.iloc[-2] < 70 and rsi_val.iloc[-1] > 70
-        conds["BUY_Upperband_rising"] = upper.iloc[-1] > upper.iloc[-2]
-        conds["BUY_Squeeze"] = (upper.iloc[-1] - lower.iloc[-1]) > (upper.iloc[-2] - lower.iloc[-2])
-        conds["BUY_Slope"] = (last["close"] - prev["close"]) > 0
-        conds["BUY_Horiz_to_Vert"] = (last["close"] - last["open"]) > ((prev["high"] - prev["low"]) * 1.5)
-
-        # ----------------- SELL -----------------
-        conds["SELL_ST_cross_mid"] = prev["close"] > mid.iloc[-2] and last["close"] < mid.iloc[-1]
-        conds["SELL_ST_red"] = st_color.iloc[-1] == 0
-        conds["SELL_MACD_red"] = macd_hist.iloc[-1] < 0
-        conds["SELL_MACD_cross"] = macd_line.iloc[-2] > 0 and macd_line.iloc[-1] < 0
-        conds["SELL_Price_cross_mid"] = prev["close"] > mid.iloc[-2] and last["close"] < mid.iloc[-1]
-        conds["SELL_Price_RSI30"] = rsi_val.iloc[-2] > 30 and rsi_val.iloc[-1] < 30
-        conds["SELL_Upperband_falling"] = upper.iloc[-1] < upper.iloc[-2]
-        conds["SELL_Squeeze"] = (upper.iloc[-1] - lower.iloc[-1]) > (upper.iloc[-2] - lower.iloc[-2])
-        conds["SELL_Slope"] = (last["close"] - prev["close"]) < 0
-        conds["SELL_Horiz_to_Vert"] = (last["open"] - last["close"]) > ((prev["high"] - prev["low"]) * 1.5)
+        return SIGNAL_RULES.explain(df)
 
-        buy_signal = all([conds[k] for k in conds if "BUY" in k])
-        sell_signal = all([conds[k] for k in conds if "SELL" in k])
-        final_signal = "BUY" if buy_signal else ("SELL" if sell_signal else None)
-        return final_signal, conds
+    def decide(self, df):
+        # staged: indicators computed only once a cheaper condition passes;
+        # decision.conds() gives the full dict for debug / heatmap
+        return SIGNAL_RULES.decide(df)
 
 # =========================
 # 5️⃣ Order Manager with Auto-Exit
@@ -196,10 +194,14 @@ qty = st.sidebar.number_input("Quantity / Lot",50,1000,50)
 # ---------------- Session State ----------------
 if "session" not in st.session_state: st.session_state.session=None
 if "cb" not in st.session_state: st.session_state.cb=CandleBuilder(5)
-if "debug" not in st.session_state: st.session_state.debug=[]
+if "debug" not in st.session_state: st.session_state.debug=SignalEventStore(per_key=500,tail_size=2000)
 if "orders" not in st.session_state: st.session_state.orders=[]
 if "signal_engine" not in st.session_state: st.session_state.signal_engine=SignalEngine()
 if "order_manager" not in st.session_state: st.session_state.order_manager=None
+if "chart_service" not in st.session_state:
+    st.session_state.chart_service=ChartDataService(
+        lambda token,tf: st.session_state.cb.closed_candles,
+        overlays={"st_upper":OVERLAY_ST_UPPER,"mid":OVERLAY_MA20})
 
 # ---------------- Connect ----------------
 if st.sidebar.button("Connect AngelOne"):
@@ -217,9 +219,9 @@ cb.update_tick(price,ts)
 df=cb.get_closed_df()
 
 # ---------------- Signal Engine ----------------
-signal,conds=st.session_state.signal_engine.validate(df)
+signal,decision=st.session_state.signal_engine.decide(df)
 if signal:
-    st.session_state.debug.append({"time":ts,"signal":signal,"conditions":conds})
+    st.session_state.debug.record("NIFTY","5min",signal,ts.timestamp(),payload=decision.conds())
     if auto_trade and st.session_state.session and st.session_state.session.connected:
         sm = st.session_state.session.smart
         om = st.session_state.order_manager
@@ -238,27 +240,22 @@ tab1,tab2,tab3,tab4,tab5=st.tabs(["Chart","Heatmap","Debug","Orders/P&L","Settin
 with tab1:
     st.subheader("Candlestick + Indicators + Visual Validator")
     if len(df)>5:
-        fig=go.Figure(data=[go.Candlestick(x=df['bucket'],open=df['open'],high=df['high'],low=df['low'],close=df['close'])])
-        st_upper, st_lower, st_color = supertrend(df)
-        upper, mid, lower = bollinger_bands(df)
-        fig.add_trace(go.Scatter(x=df['bucket'],y=st_upper,line=dict(color='green'),name='ST Upper'))
-        fig.add_trace(go.Scatter(x=df['bucket'],y=mid,line=dict(color='blue'),name='BB Mid'))
-        if signal:
-            fig.add_trace(go.Scatter(x=[df['bucket'].iloc[-1]],y=[df['close'].iloc[-1]],
-                                     mode='markers',marker=dict(symbol='diamond',size=15,color='red'),name='Verified Signal'))
+        # cached, windowed arrays: only bars closed since the last rerun are folded in
+        data=st.session_state.chart_service.window("NIFTY","5min",window=750,max_points=300)
+        fig=build_figure(data,{"st_upper":("ST Upper",dict(color='green')),"mid":("BB Mid",dict(color='blue'))},signal=signal)
         st.plotly_chart(fig,use_container_width=True)
 
 # -------- Heatmap --------
 with tab2:
     st.subheader("Condition Heatmap Multi-Timeframe")
-    if len(df)>0:
-        heatmap_df=pd.DataFrame([conds])
+    if len(df)>0 and st.toggle("Evaluate all conditions"):
+        heatmap_df=pd.DataFrame([decision.conds()])
         st.dataframe(heatmap_df.T)
 
 # -------- Debug --------
 with tab3:
     st.subheader("Signal Debug & Repaint Analytics")
-    st.dataframe(pd.DataFrame(st.session_state.debug))
+    st.dataframe(st.session_state.debug.tail(200))
 
 # -------- Orders / P&L --------
 with tab4:
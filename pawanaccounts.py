@@ -0,0 +1,275 @@
+# ============================================================
+# PAWAN MULTI-ACCOUNT FAN-OUT (ONE SIGNAL STREAM → N ACCOUNTS)
+# - Feed, candles, indicators and signals run once; only the order
+#   call is repeated per account
+# - Each account: its own broker session, order worker thread (per
+#   account order is preserved, accounts run concurrently), risk
+#   limits, ledger, reconciler and quantity multiplier
+# - Ledgers persist in the StateStore (account_pos:<name>), so a
+#   restart still squares off what followers hold
+# - Per-account send latency: pawan_account_order_seconds{account}
+# ============================================================
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date
+
+from pawanrecon import BrokerReconciler, order_id_of
+from pawanmetrics import REGISTRY as METRICS
+from pawansession import get_session
+
+DEFAULT_LIMITS = {
+    "max_open": 10,                 # open positions
+    "max_trades_per_symbol": 2,     # entries per symbol per day
+    "max_notional": None,           # ₹ notional across open positions
+}
+
+_STOP = object()
+ORDER_TIME = METRICS.histogram("account_order_seconds", "placeOrder round trip per account", ("account",))
+ORDER_ERRORS = METRICS.counter("account_order_errors", "Orders that raised or were refused", ("account",))
+
+class Account:
+    def __init__(self, name, smart, multiplier=1.0, limits=None, recon_interval=2.0,
+                 exchange="NFO", product="INTRADAY", store=None):
+        """
+        smart: SmartConnect (pawansession.get_session(...).smart) or SimBroker.
+        store: pawanstore.StateStore for the ledger (None = memory only).
+        """
+        self.name = name
+        self.smart = smart
+        self.multiplier = multiplier
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.exchange = exchange
+        self.product = product
+
+        self.store = store
+        self.pos_ns = f"account_pos:{name}"
+        self.count_ns = None
+        self.positions = {}             # token -> {symbol, side, qty, entry}
+        self.trades_today = defaultdict(int)
+        if store is not None:
+            self.positions.update(store.load(self.pos_ns))
+        self._roll_day(date.today())
+        self.orders = deque(maxlen=2000)
+        self.latency = deque(maxlen=1000)   # seconds per placeOrder
+        self.stats = {"sent": 0, "rejected": 0, "blocked": 0, "errors": 0}
+        self.recon = BrokerReconciler(smart, interval=recon_interval)
+
+        self.q = queue.SimpleQueue()
+        self._hist = ORDER_TIME.labels(name)
+        self._errors = ORDER_ERRORS.labels(name)
+        self._thread = None
+
+    # ---------------- risk ----------------
+    def qty_for(self, base_qty, lotsize=1):
+        lots = int(base_qty * self.multiplier // lotsize)
+        return lots * lotsize
+
+    def allows(self, token, symbol, qty, price):
+        lim = self.limits
+        if token in self.positions or qty <= 0:
+            return False
+        if len(self.positions) >= lim["max_open"]:
+            return False
+        if self.trades_today[symbol] >= lim["max_trades_per_symbol"]:
+            return False
+        if lim["max_notional"] is not None:
+            open_notional = sum(p["qty"] * p["entry"] for p in self.positions.values())
+            if open_notional + qty * price > lim["max_notional"]:
+                return False
+        return True
+
+    # ---------------- ledger (worker thread only) ----------------
+    def _save(self, token):
+        if self.store is None:
+            return
+        p = self.positions.get(token)
+        if p is None:
+            self.store.delete(self.pos_ns, token)
+        else:
+            self.store.put(self.pos_ns, token, p)
+
+    def _count(self, symbol, d):
+        self.trades_today[symbol] += d
+        if self.store is not None:
+            self.store.put(self.count_ns, symbol, self.trades_today[symbol])
+
+    def _roll_day(self, day):
+        self.count_ns = f"account_trades:{self.name}:{day.isoformat()}"
+        self.trades_today.clear()
+        if self.store is not None:
+            self.trades_today.update(self.store.load(self.count_ns))
+
+    # ---------------- order worker ----------------
+    def _send(self, token, symbol, side, qty):
+        t0 = time.perf_counter()
+        try:
+            res = self.smart.placeOrder({
+                "variety": "NORMAL",
+                "tradingsymbol": symbol,
+                "symboltoken": token,
+                "transactiontype": side,
+                "exchange": self.exchange,
+                "ordertype": "MARKET",
+                "producttype": self.product,
+                "duration": "DAY",
+                "quantity": str(qty)
+            })
+        finally:
+            dt = time.perf_counter() - t0
+            self._hist.observe(dt)
+            self.latency.append(dt)
+        return order_id_of(res)
+
+    def _entry(self, token, symbol, side, qty, price, signal_ts, batch_ts=None):
+        if not self.allows(token, symbol, qty, price):
+            self.stats["blocked"] += 1
+            return
+        sent_ts = time.time()
+        oid = self._send(token, symbol, side, qty)
+        if not oid:
+            raise RuntimeError(f"{symbol} {side} {qty}: no order id")
+        self.stats["sent"] += 1
+        self.positions[token] = {"symbol": symbol, "side": side, "qty": qty, "entry": price}
+        self._save(token)
+        self._count(symbol, 1)
+        self.orders.append({"OrderID": oid, "Symbol": symbol, "Side": side, "Qty": qty,
+                            "Price": price, "Time": sent_ts})
+
+        # reconciler callbacks hop back onto this account's worker: the
+        # ledger is only ever touched by one thread
+        def filled(px, qty):
+            p = self.positions.get(token)
+            if p is not None:
+                p.update(entry=px, qty=qty)
+                self._save(token)
+
+        def rejected():
+            self.stats["rejected"] += 1
+            self._errors.inc()
+            self.positions.pop(token, None)
+            self._save(token)
+            self._count(symbol, -1)
+
+        def on_fill(intent, px, qty, fill_time):
+            self.q.put(lambda: filled(px, qty))
+
+        def on_reject(intent, status, text):
+            self.q.put(rejected)
+        self.recon.register(oid, token, symbol, side, qty, ref_price=price, signal_ts=signal_ts,
+                            batch_ts=batch_ts, sent_ts=sent_ts, on_fill=on_fill, on_reject=on_reject, tag=self.name)
+
+    def _exit(self, token):
+        p = self.positions.get(token)
+        if p is None:
+            return
+        side = "SELL" if p["side"] == "BUY" else "BUY"
+        sent_ts = time.time()
+        oid = self._send(token, p["symbol"], side, p["qty"])
+        if not oid:
+            # still open at the broker: keep it for the next exit / square-off
+            raise RuntimeError(f"{p['symbol']} exit {side} {p['qty']}: no order id")
+        self.stats["sent"] += 1
+        self.positions.pop(token)
+        self._save(token)
+        self.orders.append({"OrderID": oid, "Symbol": p["symbol"], "Side": side, "Qty": p["qty"],
+                            "Price": None, "Time": sent_ts})
+
+        def restore():
+            self.stats["rejected"] += 1
+            self._errors.inc()
+            self.positions.setdefault(token, p)
+            self._save(token)
+
+        def on_reject(intent, status, text):
+            self.q.put(restore)
+        self.recon.register(oid, token, p["symbol"], side, p["qty"], sent_ts=sent_ts,
+                            on_reject=on_reject, tag=self.name)
+
+    def _work_loop(self):
+        while True:
+            task = self.q.get()
+            if task is _STOP:
+                break
+            try:
+                task()
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._errors.inc()
+                print(f"❌ Account {self.name} order failed:", repr(e))
+
+    def start(self):
+        self.recon.start()
+        self._thread = threading.Thread(target=self._work_loop, name=f"orders-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.recon.stop()
+        self.q.put(_STOP)
+
+    def new_day(self, day=None):
+        self.q.put(lambda: self._roll_day(day or date.today()))
+
+    def row(self):
+        lat = sorted(self.latency)
+        pct = lambda p: round(lat[min(int(p * len(lat)), len(lat) - 1)] * 1e3, 1) if lat else None
+        return {"Account": self.name, "x": self.multiplier, "Open": len(self.positions),
+                **self.stats, "Fills": self.recon.stats["fills"], "Pending": len(self.recon.pending),
+                "p50 ms": pct(0.5), "p99 ms": pct(0.99), "Queue": self.q.qsize()}
+
+def accounts_from_config(configs, client_cls=None, store=None):
+    """
+    configs: [{"name", "api_key", "cid", "pin", "totp", "multiplier", "limits"}];
+    each account logs in through its own cached pawansession.
+    """
+    out = []
+    for c in configs:
+        sess = get_session(c["api_key"], c["cid"], c["pin"], c["totp"], client_cls=client_cls)
+        sess.start_renewer()
+        out.append(Account(c.get("name", c["cid"]), sess.client(), c.get("multiplier", 1.0), c.get("limits"),
+                           store=store))
+    return out
+
+# ============================================================
+# FAN-OUT
+# ============================================================
+class OrderFanout:
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+
+    def start(self):
+        for a in self.accounts:
+            a.start()
+        return self
+
+    def stop(self):
+        for a in self.accounts:
+            a.stop()
+
+    def entry(self, token, symbol, side, base_qty, price, lotsize=1, signal_ts=None, batch_ts=None):
+        """
+        Queue one entry per account (scaled by its multiplier, whole lots)
+        and return at once; each account's worker sends it.
+        """
+        token = str(token)
+        for a in self.accounts:
+            qty = a.qty_for(base_qty, lotsize)
+            a.q.put(lambda a=a, qty=qty: a._entry(token, symbol, side, qty, price, signal_ts, batch_ts))
+
+    def exit(self, token):
+        token = str(token)
+        for a in self.accounts:
+            a.q.put(lambda a=a: a._exit(token))
+
+    def square_off(self):
+        for a in self.accounts:
+            a.q.put(lambda a=a: [a._exit(t) for t in list(a.positions)])
+
+    def new_day(self, day=None):
+        for a in self.accounts:
+            a.new_day(day)
+
+    def rows(self):
+        return [a.row() for a in self.accounts]
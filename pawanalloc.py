@@ -0,0 +1,152 @@
+# ============================================================
+# PAWAN BAR ALLOCATOR (RANK + LOT SIZING, ONE VECTOR PASS)
+# - Signals are collected during a bar (last one per token wins)
+#   and decided together at the boundary, not in tick order
+# - Score = weighted cross-sectional z-scores of the candidate
+#   factors (strength, liquidity, volatility, ...)
+# - Quantity in whole lots (scrip master lotsize) within a per-trade
+#   cap, an optional per-candidate max qty and the free capital;
+#   margin_pct / per_trade_cap can be set per candidate (futures
+#   block a fraction of notional, option buys the full premium)
+# - Every candidate that doesn't get an order gets a skip reason
+# - Deterministic: ties broken by symbol, then token
+# ============================================================
+
+import threading
+
+import numpy as np
+
+SCORE_WEIGHTS = {"strength": 1.0, "liquidity": 0.5, "volatility": -0.25}
+
+def _zscore(x):
+    x = np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+    sd = x.std()
+    return (x - x.mean()) / sd if sd > 0 else np.zeros_like(x)
+
+def allocate(candidates, capital, per_trade_cap=np.inf, max_orders=None,
+             weights=SCORE_WEIGHTS, margin_pct=1.0, skipped=None):
+    """
+    candidates: dicts with token, symbol, side, price, lotsize, the
+    score factors named in `weights` (missing → 0) and optionally
+    max_qty, margin_pct and per_trade_cap (overriding the arguments).
+    margin_pct: capital blocked per unit of notional (1.0 = cash,
+    0.1 = 10x leverage).
+
+    Returns the order batch, best first: the candidate dicts plus
+    rank, score, lots, qty and value (capital blocked). Candidates
+    that don't fit are dropped; allocation stops at the first one
+    that overflows the remaining capital, so a lower-ranked trade is
+    never funded ahead of a better one. skipped: a list that gets
+    {symbol, token, score, reason} for every dropped candidate.
+    """
+    n = len(candidates)
+    if n == 0:
+        return []
+    if capital <= 0:
+        if skipped is not None:
+            skipped.extend({"symbol": c.get("symbol"), "token": c.get("token"), "score": None,
+                            "reason": "capital"} for c in candidates)
+        return []
+    price = np.fromiter((c["price"] for c in candidates), float, n)
+    lot = np.fromiter((c.get("lotsize") or 1 for c in candidates), float, n)
+    max_qty = np.fromiter((c.get("max_qty", np.inf) for c in candidates), float, n)
+    margin = np.fromiter((c.get("margin_pct", margin_pct) for c in candidates), float, n)
+    cap = np.fromiter((c.get("per_trade_cap", per_trade_cap) for c in candidates), float, n)
+
+    score = np.zeros(n)
+    for name, w in weights.items():
+        if w:
+            score += w * _zscore(np.fromiter((c.get(name) or 0.0 for c in candidates), float, n))
+
+    # best score first; lexsort keys are applied last-to-first
+    symbols = np.array([str(c.get("symbol", "")) for c in candidates])
+    tokens = np.array([str(c.get("token", "")) for c in candidates])
+    order = np.lexsort((tokens, symbols, -score))
+
+    lot_value = price * lot * margin
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_cap = np.floor(cap / lot_value)
+        by_qty = np.floor(max_qty / lot)
+        # no cap at all: size to the free capital instead of nothing
+        by_capital = np.where(np.isinf(cap) & np.isinf(max_qty), np.floor(capital / lot_value), np.inf)
+    lots = np.minimum(np.minimum(by_cap, by_qty), by_capital)
+    lots = np.where(np.isfinite(lots) & (price > 0), lots, 0)[order]
+    value = lots * lot_value[order]
+
+    fits = np.cumsum(value) <= capital
+    keep = np.flatnonzero((lots > 0) & fits)      # cumsum is monotone: fits is a prefix
+    if max_orders is not None:
+        keep = keep[:max(int(max_orders), 0)]
+
+    if skipped is not None:
+        kept = np.zeros(n, bool)
+        kept[keep] = True
+        for i in np.flatnonzero(~kept):
+            j = order[i]
+            if lots[i] == 0:
+                if not price[j] > 0:
+                    reason = "no price"
+                elif by_qty[j] < 1:
+                    reason = "max qty under one lot"
+                elif by_cap[j] < 1:
+                    reason = "one lot over per-trade cap"
+                else:
+                    reason = "capital"
+            elif not fits[i]:
+                reason = "capital"
+            else:
+                reason = "max orders"
+            skipped.append({"symbol": candidates[j].get("symbol"), "token": candidates[j].get("token"),
+                            "score": round(float(score[j]), 4), "reason": reason})
+
+    batch = []
+    for rank, i in enumerate(keep, 1):
+        j = order[i]
+        batch.append({**candidates[j], "rank": rank, "score": round(float(score[j]), 4),
+                      "lots": int(lots[i]), "qty": int(lots[i] * lot[j]),
+                      "value": round(float(value[i]), 2)})
+    return batch
+
+class BarAllocator:
+    def __init__(self, **allocate_kwargs):
+        """
+        allocate_kwargs: defaults for allocate(); flush() can override
+        the ones that move during the day (capital, max_orders).
+        """
+        self.kwargs = allocate_kwargs
+        self.pending = {}               # token -> candidate
+        self.last_batch = []
+        self.last_skipped = []          # [{symbol, token, score, reason}] of the last flush
+        self.stats = {"submitted": 0, "flushes": 0, "orders": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def submit(self, candidate):
+        with self._lock:
+            self.pending[candidate["token"]] = candidate
+            self.stats["submitted"] += 1
+
+    def flush(self, keep=None, **overrides):
+        """
+        Decide the bar: keep(candidate) filters out what is no longer
+        eligible (already in a position, symbol limit reached).
+        """
+        with self._lock:
+            cands, self.pending = list(self.pending.values()), {}
+        skipped = []
+        if keep is not None:
+            eligible = []
+            for c in cands:
+                if keep(c):
+                    eligible.append(c)
+                else:
+                    skipped.append({"symbol": c.get("symbol"), "token": c.get("token"), "score": None,
+                                    "reason": "not eligible"})
+            cands = eligible
+        batch = allocate(cands, skipped=skipped, **{**self.kwargs, **overrides}) if cands else []
+        if batch or skipped:
+            self.stats["flushes"] += 1
+            self.stats["orders"] += len(batch)
+            self.stats["skipped"] += len(skipped)
+        self.last_batch = batch
+        self.last_skipped = skipped
+        return batch
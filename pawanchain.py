@@ -0,0 +1,228 @@
+# ============================================================
+# PAWAN OPTION CHAIN INDEX (SCRIP MASTER → SORTED STRIKE ARRAYS)
+# Per underlying + expiry:
+# - sorted strikes with aligned CE / PE contracts
+# - O(log n) ATM / ITM / OTM lookup via binary search
+# - dynamic ±N strike subscription that re-centres with spot
+# - scrip master downloaded once per day, cached on disk
+# ============================================================
+
+import glob
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+OPTION_TYPES = ("OPTIDX", "OPTSTK")
+SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+SCRIP_CACHE_DIR = ".scrip_cache"
+
+# ============================================================
+# SCRIP MASTER (ONE DOWNLOAD PER DAY)
+# ============================================================
+def load_scrip_master(url=SCRIP_MASTER_URL, cache_dir=SCRIP_CACHE_DIR, today=None):
+    """
+    The scrip master as a DataFrame. The first call of the day
+    downloads (~30 MB JSON); later starts read the pickled copy.
+    """
+    today = today or date.today()
+    path = os.path.join(cache_dir, f"scrip_master_{today.isoformat()}.pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+
+    import requests
+    raw = pd.DataFrame(requests.get(url, timeout=60).json())
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    raw.to_pickle(tmp)
+    os.replace(tmp, path)
+    for old in glob.glob(os.path.join(cache_dir, "scrip_master_*.pkl")):
+        if old != path:
+            os.remove(old)
+    return raw
+
+# ============================================================
+# STRIKE HELPERS
+# ============================================================
+def nearest_strike(spot, step):
+    return round(spot / step) * step
+
+# ============================================================
+# ONE CHAIN (UNDERLYING + EXPIRY)
+# ============================================================
+class OptionChain:
+    def __init__(self, name, expiry, strikes, ce, pe, lotsize):
+        self.name = name
+        self.expiry = expiry
+        self.strikes = strikes          # np.ndarray, ascending
+        self.ce = ce                    # list aligned with strikes (dict or None)
+        self.pe = pe
+        self.lotsize = lotsize
+        diffs = np.diff(strikes)
+        self.step = float(np.median(diffs)) if len(diffs) else 0.0
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def atm_index(self, spot):
+        i = int(np.searchsorted(self.strikes, spot))
+        if i == 0:
+            return 0
+        if i == len(self.strikes):
+            return i - 1
+        # pick the closer neighbour
+        return i if self.strikes[i] - spot < spot - self.strikes[i - 1] else i - 1
+
+    def atm_strike(self, spot):
+        return float(self.strikes[self.atm_index(spot)])
+
+    def select(self, spot, side, offset=0):
+        """
+        side: "CE" or "PE". offset > 0 moves OTM, offset < 0 moves ITM.
+        """
+        i = self.atm_index(spot)
+        i = i + offset if side == "CE" else i - offset
+        i = min(max(i, 0), len(self.strikes) - 1)
+        legs = self.ce if side == "CE" else self.pe
+        return legs[i]
+
+    def atm_pair(self, spot):
+        i = self.atm_index(spot)
+        return self.ce[i], self.pe[i]
+
+    def window_indices(self, spot, n):
+        i = self.atm_index(spot)
+        return max(i - n, 0), min(i + n + 1, len(self.strikes))
+
+    def window_tokens(self, spot, n):
+        lo, hi = self.window_indices(spot, n)
+        out = []
+        for leg in self.ce[lo:hi] + self.pe[lo:hi]:
+            if leg is not None:
+                out.append(leg["token"])
+        return out
+
+# ============================================================
+# INDEX OVER ALL UNDERLYINGS / EXPIRIES
+# ============================================================
+class OptionChainIndex:
+    def __init__(self):
+        self.chains = {}                # (name, expiry) -> OptionChain
+        self.expiries = {}              # name -> sorted [expiry]
+        self.by_token = {}              # token -> contract dict
+
+    @classmethod
+    def from_scrip_master(cls, raw, today=None, names=None):
+        today = today or date.today()
+        df = raw[raw["instrumenttype"].isin(OPTION_TYPES)]
+        if names is not None:
+            df = df[df["name"].isin(names)]
+        df = df.assign(
+            dt=pd.to_datetime(df["expiry"], format="%d%b%Y", errors="coerce").dt.date,
+            strike_px=df["strike"].astype(float) / 100,
+            opt=df["symbol"].str[-2:],
+            token=df["token"].astype(str),
+        )
+        df = df[(df["dt"] >= today) & df["opt"].isin(("CE", "PE"))]
+
+        idx = cls()
+        for (name, expiry), g in df.groupby(["name", "dt"], sort=True):
+            strikes = np.sort(g["strike_px"].unique())
+            pos = {k: i for i, k in enumerate(strikes)}
+            ce = [None] * len(strikes)
+            pe = [None] * len(strikes)
+            for rec in g[["symbol", "token", "strike_px", "opt", "lotsize"]].to_dict("records"):
+                leg = {
+                    "symbol": rec["symbol"],
+                    "token": rec["token"],
+                    "strike": rec["strike_px"],
+                    "type": rec["opt"],
+                    "expiry": expiry,
+                    "lotsize": int(rec["lotsize"]),
+                    "name": name,
+                }
+                (ce if rec["opt"] == "CE" else pe)[pos[rec["strike_px"]]] = leg
+                idx.by_token[leg["token"]] = leg
+            lotsize = int(g["lotsize"].iloc[0])
+            idx.chains[(name, expiry)] = OptionChain(name, expiry, strikes, ce, pe, lotsize)
+            idx.expiries.setdefault(name, []).append(expiry)
+        return idx
+
+    def nearest_expiry(self, name):
+        exps = self.expiries.get(name)
+        return exps[0] if exps else None
+
+    def chain(self, name, expiry=None):
+        expiry = expiry or self.nearest_expiry(name)
+        return self.chains.get((name, expiry))
+
+    def atm_pair(self, name, spot, expiry=None):
+        return self.chain(name, expiry).atm_pair(spot)
+
+# ============================================================
+# DYNAMIC SUBSCRIPTION (±N STRIKES AROUND SPOT)
+# ============================================================
+class ChainSubscriptionManager:
+    def __init__(self, feed, chain, n_strikes=5, exchange_type=2, hysteresis=1):
+        """
+        Keeps CE+PE for ±n_strikes around ATM subscribed on `feed`
+        (ShardedFeedManager). Re-centres once ATM drifts `hysteresis`
+        strikes away from the current centre. Pinned tokens (open
+        positions) stay subscribed when the window moves away.
+        """
+        self.feed = feed
+        self.chain = chain
+        self.n = n_strikes
+        self.exchange_type = exchange_type
+        self.hysteresis = hysteresis
+        self.centre = None
+        self.window = set()             # tokens of the ±n window
+        self.pinned = set()
+        self.current = set()            # subscribed: window | pinned leftovers
+        self.recentres = 0
+        self._legs = {leg["token"] for leg in chain.ce + chain.pe if leg is not None}
+        self._lock = threading.Lock()
+
+    def on_spot(self, spot):
+        i = self.chain.atm_index(spot)
+        if self.centre is not None and abs(i - self.centre) < self.hysteresis:
+            return False
+        with self._lock:
+            if self.centre is not None and abs(i - self.centre) < self.hysteresis:
+                return False
+            want = set(self.chain.window_tokens(spot, self.n))
+            add, drop = want - self.current, self.current - want - self.pinned
+            if drop:
+                self.feed.unsubscribe(drop, self.exchange_type)
+            if add:
+                self.feed.subscribe(add, self.exchange_type)
+            self.window = want
+            self.current = want | (self.current & self.pinned)
+            self.centre = i
+            self.recentres += 1
+        return True
+
+    def pin(self, token):
+        # a held contract of this chain stays subscribed until unpin()
+        token = str(token)
+        if token not in self._legs:
+            return
+        with self._lock:
+            self.pinned.add(token)
+            if token not in self.current:
+                self.feed.subscribe([token], self.exchange_type)
+                self.current.add(token)
+
+    def unpin(self, token):
+        # released: unsubscribe if the window has moved away from it
+        token = str(token)
+        with self._lock:
+            self.pinned.discard(token)
+            if token in self.current and token not in self.window:
+                self.feed.unsubscribe([token], self.exchange_type)
+                self.current.discard(token)
+
+    def tokens(self):
+        return list(self.current)
@@ -0,0 +1,201 @@
+# ============================================================
+# PAWAN CHART DATA SERVICE (BOUNDED WINDOW + DOWNSAMPLING)
+# - Serves the last N bars of a token / timeframe
+# - OHLC-preserving bucket downsampling above max_points
+#   (open=first, high=max, low=min, close=last)
+# - LTTB for plain line series (equity / P&L curves)
+# - Prepared arrays cached per (token, timeframe, window, points);
+#   refresh only folds in the bars appended since the last call
+# ============================================================
+
+import threading
+
+import numpy as np
+
+OHLC = ("open", "high", "low", "close")
+
+# ============================================================
+# OVERLAYS (COMPUTED ON RAW BARS, SAMPLED WITH THE CANDLES)
+# name -> (warmup_bars, fn(arrays) -> np.ndarray)
+# ============================================================
+def rolling_mean(a, n):
+    out = np.full(len(a), np.nan)
+    if len(a) >= n:
+        c = np.cumsum(np.insert(a, 0, 0.0))
+        out[n - 1:] = (c[n:] - c[:-n]) / n
+    return out
+
+OVERLAY_MA20 = (19, lambda a: rolling_mean(a["close"], 20))
+OVERLAY_ST_BASIC = (9, lambda a: (a["high"] + a["low"]) / 2 - 3 * rolling_mean(a["high"] - a["low"], 10))
+OVERLAY_ST_UPPER = (9, lambda a: (a["high"] + a["low"]) / 2 + 3 * rolling_mean(a["high"] - a["low"], 10))
+
+# ============================================================
+# LTTB (LARGEST TRIANGLE THREE BUCKETS)
+# ============================================================
+def lttb(x, y, n_out):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = [0]
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    return np.asarray(keep)
+
+# ============================================================
+# OHLC BUCKETING (GROUPS ALIGNED TO ABSOLUTE BAR INDEX)
+# ============================================================
+def ohlc_groups(x, o, h, l, c, start_idx, factor):
+    """
+    Bars are grouped by (absolute index // factor), so appending bars
+    only ever changes the last group or adds new ones.
+    """
+    n = len(c)
+    if n == 0:
+        return {k: np.empty(0) for k in ("x",) + OHLC}, np.empty(0, dtype=int)
+    gid = (np.arange(start_idx, start_idx + n) // factor)
+    starts = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return {
+        "x": np.asarray(x, dtype=object)[starts],
+        "open": o[starts],
+        "high": np.maximum.reduceat(h, starts),
+        "low": np.minimum.reduceat(l, starts),
+        "close": c[ends],
+    }, gid[starts]
+
+# ============================================================
+# CACHED WINDOW PER (TOKEN, TIMEFRAME, WINDOW, POINTS)
+# ============================================================
+class _Prepared:
+    __slots__ = ("factor", "n_src", "cols", "gids", "version")
+
+    def __init__(self, factor):
+        self.factor = factor
+        self.n_src = 0          # raw bars folded in so far
+        self.cols = {}
+        self.gids = np.empty(0, dtype=int)
+        self.version = 0
+
+class ChartDataService:
+    def __init__(self, get_bars, time_key="bucket", overlays=None):
+        """
+        get_bars(token, timeframe) -> append-only list of bar dicts
+        (e.g. CandleBuilder.candles[token]); the last bar may still be forming.
+        """
+        self.get_bars = get_bars
+        self.time_key = time_key
+        self.overlays = overlays or {}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def _arrays(self, bars):
+        tk = self.time_key
+        arr = {"x": [b[tk] for b in bars]}
+        for k in OHLC:
+            arr[k] = np.fromiter((b[k] for b in bars), float, len(bars))
+        return arr
+
+    def _fold(self, p, bars, from_idx):
+        """
+        Recompute groups from the group containing raw bar `from_idx`
+        through the end of `bars` and splice them onto the cached arrays.
+        """
+        f = p.factor
+        g0 = from_idx // f
+        first = g0 * f
+        warm = max((w for w, _ in self.overlays.values()), default=0)
+        lo = max(first - warm, 0)
+        raw = self._arrays(bars[lo:])
+        off = first - lo
+        cols, gids = ohlc_groups(raw["x"][off:], raw["open"][off:], raw["high"][off:],
+                                 raw["low"][off:], raw["close"][off:], first, f)
+        if self.overlays:
+            n = len(raw["close"]) - off
+            gid_all = np.arange(first, first + n) // f
+            last_of_group = np.r_[np.flatnonzero(gid_all[1:] != gid_all[:-1]), n - 1] + off
+            for name, (_, fn) in self.overlays.items():
+                cols[name] = fn(raw)[last_of_group]
+
+        keep = p.gids < g0
+        for k, v in cols.items():
+            old = p.cols.get(k)
+            p.cols[k] = v if old is None else np.concatenate([old[keep], v])
+        p.gids = np.concatenate([p.gids[keep], gids])
+        p.n_src = len(bars)
+        p.version += 1
+
+    def window(self, token, timeframe, window=300, max_points=300):
+        """
+        Returns the prepared arrays for the last `window` raw bars, never
+        more than `max_points` points, plus the cache version.
+        """
+        bars = self.get_bars(token, timeframe)
+        n = len(bars)
+        factor = max(1, -(-window // max_points))
+        key = (token, timeframe, window, max_points)
+        with self._lock:
+            p = self.cache.get(key)
+            if p is None:
+                p = self.cache[key] = _Prepared(factor)
+            if n == 0:
+                return {"factor": factor, "version": p.version, **{k: v[:0] for k, v in p.cols.items()}}
+            start = max(n - window, 0)
+            if p.n_src == 0 or n < p.n_src or n - p.n_src > window:
+                p.cols, p.gids = {}, np.empty(0, dtype=int)
+                self._fold(p, bars, (start // factor) * factor)
+            else:
+                # last raw bar may have re-formed: always redo its group
+                self._fold(p, bars, p.n_src - 1)
+            # slide: drop groups wholly before the window start
+            g_start = start // factor
+            if len(p.gids) and p.gids[0] < g_start:
+                keep = p.gids >= g_start
+                p.cols = {k: v[keep] for k, v in p.cols.items()}
+                p.gids = p.gids[keep]
+            return {"factor": factor, "version": p.version, **p.cols}
+
+    def since(self, token, timeframe, last_x, window=300, max_points=300):
+        """
+        Points from `last_x` (inclusive, it may have re-formed) onward —
+        what a client holding a cached figure needs to append.
+        """
+        data = self.window(token, timeframe, window, max_points)
+        xs = data.get("x")
+        if xs is None or last_x is None:
+            return data
+        i = len(xs)
+        while i > 0 and xs[i - 1] >= last_x:
+            i -= 1
+        return {k: (v[i:] if isinstance(v, np.ndarray) else v) for k, v in data.items()}
+
+# ============================================================
+# PLOTLY HELPERS (FIGURE BUILT FROM BOUNDED ARRAYS)
+# ============================================================
+def build_figure(data, overlay_styles=None, signal=None, name="Price"):
+    """
+    overlay_styles: column -> (trace name, line dict)
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=data["x"], open=data["open"], high=data["high"],
+                                 low=data["low"], close=data["close"], name=name))
+    for col, (label, line) in (overlay_styles or {}).items():
+        if col in data:
+            fig.add_trace(go.Scatter(x=data["x"], y=data[col], line=line, name=label, meta=col))
+    if signal and len(data["x"]):
+        fig.add_trace(go.Scatter(x=[data["x"][-1]], y=[data["close"][-1]], mode='markers',
+                                 marker_symbol='diamond', marker_color='red', marker_size=15, name="Signal"))
+    fig.update_layout(xaxis_rangeslider_visible=False,
+                      title=f"x{data['factor']} bars/point" if data.get("factor", 1) > 1 else None)
+    return fig
@@ -0,0 +1,239 @@
+# ============================================================
+# PAWAN SESSION SCHEDULER (HASHED TIMER WHEEL, EXCHANGE TIME)
+# - ExchangeClock: latest exchange_timestamp seen on the feed,
+#   extrapolated with the monotonic clock between ticks
+# - TimerWheel: O(1) schedule / cancel, firing visits one slot per
+#   resolution step (Varghese & Lauck hashed wheel)
+# - SessionScheduler: bar closes per timeframe, pre-open warmup,
+#   15:20 square-off, end-of-day resets; jobs reschedule themselves
+# Nothing here formats times per tick: a tick only bumps the clock.
+# ============================================================
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+SESSION = {
+    "pre_open": "09:00",
+    "open": "09:15",
+    "square_off": "15:20",
+    "close": "15:30",
+    "eod": "15:45",
+}
+WEEKDAYS = (0, 1, 2, 3, 4)          # Mon-Fri; exchange holidays are not modelled
+
+def hhmm(s):
+    h, m = s.split(":")
+    return int(h), int(m)
+
+def _ms(d):
+    return int(d.timestamp() * 1000)
+
+# ============================================================
+# EXCHANGE CLOCK
+# ============================================================
+class ExchangeClock:
+    def __init__(self):
+        self.last_ms = None             # newest exchange timestamp seen
+        self._mono = 0.0
+
+    def observe(self, exchange_ms):
+        """
+        Called per tick (any thread): two compares and two stores.
+        """
+        if self.last_ms is None or exchange_ms > self.last_ms:
+            self.last_ms = exchange_ms
+            self._mono = time.monotonic()
+
+    def now_ms(self):
+        # wall clock until the first tick; quiet tokens still see time move
+        if self.last_ms is None:
+            return int(time.time() * 1000)
+        return self.last_ms + int((time.monotonic() - self._mono) * 1000)
+
+    def now(self):
+        return datetime.fromtimestamp(self.now_ms() / 1000)
+
+# ============================================================
+# TIMER WHEEL
+# ============================================================
+class Timer:
+    __slots__ = ("tick", "fn", "args", "alive")
+
+    def __init__(self, tick, fn, args):
+        self.tick = tick
+        self.fn = fn
+        self.args = args
+        self.alive = True
+
+    def cancel(self):
+        self.alive = False
+
+class TimerWheel:
+    def __init__(self, resolution_ms=100, slots=4096):
+        """
+        Deadlines are bucketed to `resolution_ms`; a deadline more than
+        one revolution away just waits in its slot until it is due.
+        """
+        assert slots & (slots - 1) == 0, "slots must be a power of two"
+        self.resolution_ms = resolution_ms
+        self.mask = slots - 1
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = None              # last tick processed
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, deadline_ms, fn, *args):
+        tick = deadline_ms // self.resolution_ms
+        t = Timer(tick, fn, args)
+        with self._lock:
+            # already due → next slot visited
+            slot = tick if self.cursor is None or tick > self.cursor else self.cursor + 1
+            self.slots[slot & self.mask].append(t)
+            self.pending += 1
+        return t
+
+    def advance(self, now_ms):
+        """
+        Fire every timer due at or before now_ms; returns how many ran.
+        """
+        now = now_ms // self.resolution_ms
+        with self._lock:
+            if self.cursor is None:
+                self.cursor = now - 1
+            start, steps = self.cursor + 1, min(now - self.cursor, self.mask + 1)
+            if steps <= 0:
+                return 0
+            due = []
+            for tick in range(start, start + steps):
+                slot = self.slots[tick & self.mask]
+                if not slot:
+                    continue
+                keep = [t for t in slot if t.alive and t.tick > now]
+                due += [t for t in slot if t.alive and t.tick <= now]
+                self.pending -= len(slot) - len(keep)
+                self.slots[tick & self.mask] = keep
+            self.cursor = now
+        # callbacks run outside the lock so they can reschedule themselves
+        for t in due:
+            t.fn(*t.args)
+        return len(due)
+
+# ============================================================
+# SESSION SCHEDULER
+# ============================================================
+class SessionScheduler:
+    def __init__(self, clock=None, resolution_ms=100, session=SESSION, weekdays=WEEKDAYS):
+        self.clock = clock or ExchangeClock()
+        self.wheel = TimerWheel(resolution_ms)
+        self.session = dict(session)
+        self.weekdays = set(weekdays)
+        self.jobs = {}                  # name -> {"next", "fired", "lag_ms", "errors"}
+        self.running = False
+        self._thread = None
+
+    # ---------------- registration ----------------
+    def _arm(self, name, when, fire):
+        job = self.jobs.setdefault(name, {"next": None, "fired": 0, "lag_ms": None, "errors": 0})
+        job["next"] = when
+        deadline = _ms(when)
+        job["timer"] = self.wheel.schedule(deadline, fire, deadline)
+
+    def _run(self, name, fn, arg, deadline):
+        job = self.jobs[name]
+        job["fired"] += 1
+        job["lag_ms"] = self.clock.now_ms() - deadline
+        try:
+            fn(arg)
+        except Exception as e:
+            job["errors"] += 1
+            print(f"❌ Scheduled job {name} failed:", repr(e))
+
+    def _trading_day(self, d):
+        return d.weekday() in self.weekdays
+
+    def _next_daily(self, h, m, after):
+        when = after.replace(hour=h, minute=m, second=0, microsecond=0)
+        if when <= after:
+            when += timedelta(days=1)
+        while not self._trading_day(when):
+            when += timedelta(days=1)
+        return when
+
+    def daily(self, at, fn, name=None):
+        """
+        fn(fire_datetime) at "HH:MM" (or a SESSION key) every trading day.
+        """
+        h, m = hhmm(self.session.get(at, at))
+        name = name or f"daily {at}"
+
+        def fire(deadline):
+            when = datetime.fromtimestamp(deadline / 1000)
+            self._arm(name, self._next_daily(h, m, when), fire)
+            self._run(name, fn, when, deadline)
+        self._arm(name, self._next_daily(h, m, self.clock.now()), fire)
+        return name
+
+    def every_bar(self, tf_minutes, fn, name=None, session_only=True):
+        """
+        fn(boundary_datetime) when a tf_minutes bar closes. Boundaries
+        are multiples of tf from midnight (09:15, 09:20, ... for 5m),
+        the same buckets the candle builders use; with session_only
+        they are limited to (open, close].
+        """
+        name = name or f"bar {tf_minutes}m"
+        step = timedelta(minutes=tf_minutes)
+        o, c = hhmm(self.session["open"]), hhmm(self.session["close"])
+
+        def next_boundary(after):
+            midnight = after.replace(hour=0, minute=0, second=0, microsecond=0)
+            k = int((after - midnight) / step) + 1
+            when = midnight + k * step
+            if session_only:
+                start = when.replace(hour=o[0], minute=o[1]) + step
+                if when > when.replace(hour=c[0], minute=c[1]) or not self._trading_day(when):
+                    when = self._next_daily(o[0], o[1], when) + step
+                elif when < start:
+                    when = start
+            return when
+
+        def fire(deadline):
+            when = datetime.fromtimestamp(deadline / 1000)
+            self._arm(name, next_boundary(when), fire)
+            self._run(name, fn, when, deadline)
+        self._arm(name, next_boundary(self.clock.now()), fire)
+        return name
+
+    def cancel(self, name):
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            job["timer"].cancel()
+
+    # ---------------- driving ----------------
+    def poll(self):
+        """
+        Fire whatever is due. Call from the thread that owns the state
+        the jobs touch, or let start() call it on its own thread.
+        """
+        return self.wheel.advance(self.clock.now_ms())
+
+    def _loop(self, interval):
+        while self.running:
+            self.poll()
+            time.sleep(interval)
+
+    def start(self, interval=None):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval or self.wheel.resolution_ms / 1000,),
+            name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def rows(self):
+        return [{"job": n, "next": j["next"], "fired": j["fired"], "lag_ms": j["lag_ms"],
+                 "errors": j["errors"]} for n, j in sorted(self.jobs.items(), key=lambda kv: kv[1]["next"])]
@@ -0,0 +1,534 @@
+# ============================================================
+# PAWAN SHARDED FEED MANAGER (MULTI-CONNECTION SMARTWEBSOCKETV2)
+# Splits token subscriptions across several WebSocket sessions
+# - One receive thread per shard (ws.connect loop)
+# - One worker thread per shard draining a SimpleQueue
+# - Reconnect + resubscribe handled per shard
+# - FeedSupervisor: heartbeat timeout, backoff, gap backfill
+# ============================================================
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# ============================================================
+# LIMITS (ANGELONE SMARTAPI)
+# ============================================================
+MAX_TOKENS_PER_SHARD = 1000     # tokens per websocket session
+MAX_SHARDS = 3                  # concurrent sessions per client code
+DEFAULT_EXCHANGE_TYPE = 2       # 1=NSE_CM, 2=NSE_FO
+DEFAULT_MODE = 1                # 1=LTP, 2=QUOTE, 3=SNAP_QUOTE
+
+_STOP = object()
+
+# ============================================================
+# ONE SHARD = ONE CONNECTION + ONE RECEIVE THREAD + ONE WORKER
+# ============================================================
+class FeedShard:
+    def __init__(self, shard_id, ws_factory, handler, mode=DEFAULT_MODE,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.shard_id = shard_id
+        self.ws_factory = ws_factory
+        self.handler = handler
+        self.mode = mode
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.tokens = defaultdict(set)      # exchange_type -> {token}
+        self.q = queue.SimpleQueue()
+        self.ws = None
+        self.connected = False
+        self.running = False
+
+        self.ticks_in = 0
+        self.ticks_done = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_tick_ts = 0.0
+        self.last_seen = {}             # token -> wall time of its last tick
+
+        # tokens being backfilled: their live ticks wait behind the replay
+        self.held = {}                  # token -> [msg, ...] (worker only)
+        self._holds = defaultdict(int)
+
+        # outage bookkeeping (set on close / stale, cleared on first tick back)
+        self.down_since = None          # wall time the outage was detected
+        self.last_tick_before_down = None
+        self.on_reconnect = None        # fn(shard) — runs before resubscribe
+        self.on_recover = None          # fn(shard, ttr_s, gap_s)
+
+        self._lock = threading.Lock()
+        self._recv_thread = None
+        self._work_thread = None
+
+    # ---------------- subscriptions ----------------
+    def size(self):
+        return sum(len(t) for t in self.tokens.values())
+
+    def token_list(self, tokens=None):
+        src = tokens if tokens is not None else self.tokens
+        return [
+            {"exchangeType": ex, "tokens": sorted(toks)}
+            for ex, toks in src.items() if toks
+        ]
+
+    def subscribe(self, tokens, exchange_type=DEFAULT_EXCHANGE_TYPE):
+        with self._lock:
+            new = set(tokens) - self.tokens[exchange_type]
+            self.tokens[exchange_type] |= new
+        if new and self.connected:
+            self.ws.subscribe(f"pawan_s{self.shard_id}", self.mode,
+                              self.token_list({exchange_type: new}))
+        return new
+
+    def unsubscribe(self, tokens, exchange_type=DEFAULT_EXCHANGE_TYPE):
+        with self._lock:
+            gone = set(tokens) & self.tokens[exchange_type]
+            self.tokens[exchange_type] -= gone
+        if gone and self.connected:
+            self.ws.unsubscribe(f"pawan_s{self.shard_id}", self.mode,
+                                self.token_list({exchange_type: gone}))
+        return gone
+
+    # ---------------- websocket callbacks ----------------
+    def _on_open(self, ws):
+        self.connected = True
+        if self.down_since is not None and self.on_reconnect is not None:
+            # queued ahead of the first resubscribed tick, so backfill lands in order
+            self.on_reconnect(self)
+        with self._lock:
+            tl = self.token_list()
+        if tl:
+            ws.subscribe(f"pawan_s{self.shard_id}", self.mode, tl)
+
+    def _on_data(self, ws, msg):
+        # receive thread only enqueues; all candle/indicator work runs on the worker
+        now = time.time()
+        self.ticks_in += 1
+        if self.down_since is not None:
+            self._recovered(now)
+        self.last_tick_ts = now
+        self.last_seen[msg.get("token")] = now
+        self.q.put(msg)
+
+    def _mark_down(self):
+        if self.down_since is None:
+            self.down_since = time.time()
+            self.last_tick_before_down = self.last_tick_ts or self.down_since
+
+    def _recovered(self, now):
+        down_since, last_tick = self.down_since, self.last_tick_before_down
+        self.down_since = None
+        if self.on_recover is not None:
+            self.on_recover(self, now - down_since, now - last_tick)
+
+    def _on_error(self, *args):
+        self.errors += 1
+        print(f"❌ Shard {self.shard_id} WS Error:", args[-1] if args else "")
+
+    def _on_close(self, *args):
+        self.connected = False
+        self._mark_down()
+        print(f"⚠️ Shard {self.shard_id} WS Closed")
+
+    # ---------------- threads ----------------
+    def _recv_loop(self):
+        delay = self.reconnect_delay
+        while self.running:
+            self.ws = self.ws_factory()
+            self.ws.on_open = self._on_open
+            self.ws.on_data = self._on_data
+            self.ws.on_error = self._on_error
+            self.ws.on_close = self._on_close
+            started = time.time()
+            try:
+                self.ws.connect()
+            except Exception as e:
+                self._on_error(self.ws, e)
+            self.connected = False
+            self._mark_down()
+            if not self.running:
+                break
+            # a session that stayed up for a while resets the backoff
+            if time.time() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self.reconnects += 1
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _work_loop(self):
+        q = self.q
+        held = self.held
+        while True:
+            msg = q.get()
+            if msg is _STOP:
+                break
+            if held and not callable(msg):
+                waiting = held.get(msg.get("token"))
+                if waiting is not None:
+                    waiting.append(msg)
+                    continue
+            self._handle(msg)
+
+    def _handle(self, msg):
+        try:
+            if callable(msg):
+                msg()                   # control task (e.g. backfill replay) in tick order
+                return
+            self.handler(self.ws, msg)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = repr(e)
+            if self.errors & (self.errors - 1) == 0:    # 1st, 2nd, 4th, ... keeps the log readable
+                print(f"❌ Shard {self.shard_id} handler error #{self.errors}:", self.last_error)
+        self.ticks_done += 1
+
+    # ---------------- backfill holds (worker thread only) ----------------
+    def hold(self, tokens):
+        # live ticks of `tokens` queue up until release(): replayed history lands first
+        for t in tokens:
+            self._holds[t] += 1
+            self.held.setdefault(t, [])
+
+    def release(self, token):
+        self._holds[token] -= 1
+        if self._holds[token] > 0:
+            return
+        del self._holds[token]
+        for msg in self.held.pop(token, []):
+            self._handle(msg)
+
+    def start(self):
+        self.running = True
+        self._work_thread = threading.Thread(
+            target=self._work_loop, name=f"feed-work-{self.shard_id}", daemon=True)
+        self._recv_thread = threading.Thread(
+            target=self._recv_loop, name=f"feed-recv-{self.shard_id}", daemon=True)
+        self._work_thread.start()
+        self._recv_thread.start()
+
+    def force_reconnect(self):
+        # closing the socket makes ws.connect() return into the reconnect loop
+        self._mark_down()
+        if self.ws is not None:
+            try:
+                self.ws.close_connection()
+            except Exception:
+                pass
+
+    def submit(self, task):
+        self.q.put(task)
+
+    def stop(self):
+        self.running = False
+        if self.ws is not None:
+            try:
+                self.ws.close_connection()
+            except Exception:
+                pass
+        self.q.put(_STOP)
+
+    def queue_depth(self):
+        return self.q.qsize()
+
+    def stats(self):
+        return {
+            "shard": self.shard_id,
+            "tokens": self.size(),
+            "connected": self.connected,
+            "ticks_in": self.ticks_in,
+            "ticks_done": self.ticks_done,
+            "queue_depth": self.queue_depth(),
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+# ============================================================
+# FEED MANAGER (TOKEN → SHARD ROUTING)
+# ============================================================
+class ShardedFeedManager:
+    def __init__(self, ws_factory, handler, max_tokens_per_shard=MAX_TOKENS_PER_SHARD,
+                 max_shards=MAX_SHARDS, mode=DEFAULT_MODE, **shard_kwargs):
+        """
+        ws_factory() must return a fresh SmartWebSocketV2 (or compatible) object.
+        handler(ws, msg) is called on the shard's worker thread for every tick.
+        """
+        self.ws_factory = ws_factory
+        self.handler = handler
+        self.max_tokens_per_shard = max_tokens_per_shard
+        self.max_shards = max_shards
+        self.mode = mode
+        self.shard_kwargs = shard_kwargs
+
+        self.shards = []
+        self.token_shard = {}          # (exchange_type, token) -> FeedShard
+        self.started = False
+        self._lock = threading.Lock()
+
+    def _new_shard(self):
+        if len(self.shards) >= self.max_shards:
+            raise RuntimeError(
+                f"Token quota exceeded: {self.max_shards} shards x "
+                f"{self.max_tokens_per_shard} tokens")
+        shard = FeedShard(len(self.shards), self.ws_factory, self.handler,
+                          mode=self.mode, **self.shard_kwargs)
+        self.shards.append(shard)
+        if self.started:
+            shard.start()
+        return shard
+
+    def _pick_shard(self, pending):
+        # least-loaded shard with headroom, otherwise open a new connection
+        load = {s: s.size() + len(pending.get(s, ())) for s in self.shards}
+        open_shards = [s for s in self.shards if load[s] < self.max_tokens_per_shard]
+        if open_shards:
+            return min(open_shards, key=load.get)
+        return self._new_shard()
+
+    def subscribe(self, tokens, exchange_type=DEFAULT_EXCHANGE_TYPE):
+        by_shard = defaultdict(list)
+        with self._lock:
+            for t in tokens:
+                t = str(t)
+                key = (exchange_type, t)
+                if key in self.token_shard:
+                    continue
+                shard = self._pick_shard(by_shard)
+                self.token_shard[key] = shard
+                by_shard[shard].append(t)
+        for shard, toks in by_shard.items():
+            shard.subscribe(toks, exchange_type)
+
+    def unsubscribe(self, tokens, exchange_type=DEFAULT_EXCHANGE_TYPE):
+        by_shard = defaultdict(list)
+        with self._lock:
+            for t in tokens:
+                shard = self.token_shard.pop((exchange_type, str(t)), None)
+                if shard is not None:
+                    by_shard[shard].append(str(t))
+        for shard, toks in by_shard.items():
+            shard.unsubscribe(toks, exchange_type)
+
+    def start(self):
+        self.started = True
+        if not self.shards:
+            self._new_shard()
+        for shard in self.shards:
+            shard.start()
+
+    def stop(self):
+        self.started = False
+        for shard in self.shards:
+            shard.stop()
+
+    def broadcast(self, task):
+        """
+        task(shard) on every shard's worker, queued behind the ticks
+        already received, so it never races the tick handler.
+        """
+        for shard in list(self.shards):
+            shard.submit(lambda shard=shard: task(shard))
+
+    def stats(self):
+        return [s.stats() for s in self.shards]
+
+# ============================================================
+# HISTORICAL BACKFILL (MINUTE CANDLES → REPLAYED AS TICKS)
+# ============================================================
+EXCHANGE_NAMES = {1: "NSE", 2: "NFO", 3: "BSE", 4: "BFO", 5: "MCX"}
+
+class HistoricalBackfill:
+    def __init__(self, smart, replay_tick, interval="ONE_MINUTE", min_call_gap=0.35):
+        """
+        replay_tick(token, price, ts) feeds the candle builder directly
+        (no signal / order path). Each historical bar is replayed as
+        open → high → low → close ticks inside its own minute, which
+        reproduces the exact OHLC in any bucket-based builder.
+        fetch() is safe from several threads: calls share one rate limit.
+        """
+        self.smart = smart
+        self.replay_tick = replay_tick
+        self.interval = interval
+        self.min_call_gap = min_call_gap
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_turn(self):
+        # reserve the next slot under the lock, sleep outside it
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_call)
+            self._next_call = slot + self.min_call_gap
+        if slot > now:
+            time.sleep(slot - now)      # historical API is rate limited
+
+    def fetch(self, token, exchange_type, start, end):
+        self._wait_turn()
+        res = self.smart.getCandleData({
+            "exchange": EXCHANGE_NAMES.get(exchange_type, "NFO"),
+            "symboltoken": str(token),
+            "interval": self.interval,
+            "fromdate": start.strftime("%Y-%m-%d %H:%M"),
+            "todate": end.strftime("%Y-%m-%d %H:%M"),
+        })
+        if not res or not res.get("status") or not res.get("data"):
+            return []
+        return res["data"]
+
+    def replay(self, token, rows, until):
+        """
+        Replays fetched bars, dropping ticks at or after `until` (the
+        reconnect): live ticks take over from there.
+        """
+        bars = 0
+        for row in rows:
+            ts = datetime.fromisoformat(row[0]).replace(tzinfo=None)
+            if ts >= until:
+                continue
+            o, h, l, c = map(float, row[1:5])
+            for px, sec in ((o, 0), (h, 15), (l, 30), (c, 45)):
+                tick_ts = ts + timedelta(seconds=sec)
+                if tick_ts >= until:
+                    break
+                self.replay_tick(str(token), px, tick_ts)
+            bars += 1
+        return bars
+
+    def fetch_gap(self, token, exchange_type, down_at, until):
+        # whole minutes from the outage through the one holding `until`,
+        # so an outage inside one minute still gets its bar
+        start = down_at.replace(second=0, microsecond=0)
+        end = until.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        return self.fetch(token, exchange_type, start, end)
+
+    def __call__(self, token, exchange_type, down_at, until):
+        return self.replay(token, self.fetch_gap(token, exchange_type, down_at, until), until)
+
+# ============================================================
+# FEED SUPERVISOR (HEARTBEAT → RECONNECT → BACKFILL → METRICS)
+# ============================================================
+class FeedSupervisor:
+    def __init__(self, feed, backfill=None, stale_after=15.0, check_every=1.0,
+                 history=200, active_within=900.0, backfill_workers=2):
+        """
+        backfill: HistoricalBackfill. Only tokens that ticked within
+        `active_within` s of the outage are replayed. Fetches run on a
+        small executor (shared rate limit), the replay on the shard
+        worker; that token's live ticks wait for it, the others don't.
+        """
+        self.feed = feed
+        self.backfill = backfill
+        self.stale_after = stale_after
+        self.check_every = check_every
+        self.active_within = active_within
+        self.running = False
+
+        self.metrics = {
+            "stale_detections": 0,
+            "recoveries": 0,
+            "backfilled_tokens": 0,
+            "backfill_skipped": 0,
+            "backfilled_bars": 0,
+            "backfill_errors": 0,
+        }
+        self.recoveries = deque(maxlen=history)   # per-outage records
+        self._attached = set()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=backfill_workers, thread_name_prefix="backfill") \
+            if backfill is not None else None
+
+    # ---------------- shard hooks ----------------
+    def _attach(self):
+        for shard in self.feed.shards:
+            if shard.shard_id not in self._attached:
+                shard.on_reconnect = self._on_reconnect
+                shard.on_recover = self._on_recover
+                self._attached.add(shard.shard_id)
+
+    def _on_reconnect(self, shard):
+        # receive thread, before resubscribe: nothing post-reconnect is queued yet
+        if self.backfill is None:
+            return
+        down_ts = shard.last_tick_before_down
+        down_at, until = datetime.fromtimestamp(down_ts), datetime.now()
+        with shard._lock:
+            subscribed = [(ex, t) for ex, toks in shard.tokens.items() for t in toks]
+        # tokens that were ticking when the feed dropped; silent ones have no gap to fill
+        todo = [(ex, t) for ex, t in subscribed
+                if down_ts - shard.last_seen.get(t, float("-inf")) <= self.active_within]
+        self.metrics["backfill_skipped"] += len(subscribed) - len(todo)
+        if not todo:
+            return
+        shard.submit(lambda: shard.hold([t for _, t in todo]))
+        for ex, t in todo:
+            self._executor.submit(self._fetch, shard, t, ex, down_at, until)
+
+    def _fetch(self, shard, token, exchange_type, down_at, until):
+        # backfill executor: the slow, rate-limited call stays off the shard worker
+        try:
+            rows = self.backfill.fetch_gap(token, exchange_type, down_at, until)
+        except Exception as e:
+            self.metrics["backfill_errors"] += 1
+            print(f"❌ Backfill {token} failed:", e)
+            rows = []
+        shard.submit(lambda: self._replay(shard, token, rows, until))
+
+    def _replay(self, shard, token, rows, until):
+        # shard worker: history first, then the live ticks held behind it
+        try:
+            self.metrics["backfilled_bars"] += self.backfill.replay(token, rows, until)
+            self.metrics["backfilled_tokens"] += 1
+        finally:
+            shard.release(token)
+
+    def _on_recover(self, shard, ttr, gap):
+        self.metrics["recoveries"] += 1
+        self.recoveries.append({
+            "shard": shard.shard_id,
+            "time": datetime.now(),
+            "recover_s": round(ttr, 3),
+            "gap_s": round(gap, 3),
+            "gap_min": int(gap // 60),
+        })
+
+    # ---------------- heartbeat loop ----------------
+    def check(self, now=None):
+        now = now or time.time()
+        self._attach()
+        for shard in self.feed.shards:
+            if not shard.connected or shard.down_since is not None:
+                continue
+            if shard.last_tick_ts and now - shard.last_tick_ts > self.stale_after:
+                self.metrics["stale_detections"] += 1
+                print(f"⚠️ Shard {shard.shard_id} stale for {now - shard.last_tick_ts:.1f}s — reconnecting")
+                shard.force_reconnect()
+
+    def _loop(self):
+        while self.running:
+            self.check()
+            time.sleep(self.check_every)
+
+    def start(self):
+        self._attach()
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="feed-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def summary(self):
+        rec = list(self.recoveries)
+        return {
+            **self.metrics,
+            "max_recover_s": max((r["recover_s"] for r in rec), default=0.0),
+            "avg_recover_s": round(sum(r["recover_s"] for r in rec) / len(rec), 3) if rec else 0.0,
+            "max_gap_s": max((r["gap_s"] for r in rec), default=0.0),
+        }
@@ -0,0 +1,486 @@
+# ============================================================
+# PAWAN SYNTHETIC MARKET FEED (SMARTWEBSOCKETV2 STAND-IN)
+# - N tokens, skewed per-token tick rates, bursts (market open),
+#   per-token gaps, whole-feed stalls, correlated moves + jumps
+# - Ticks encoded as SmartWebSocketV2 binary LTP packets
+# - Served in-process (LoopbackWebSocketV2) or over a local
+#   ws:// server the real SmartWebSocketV2 can connect to
+# Drop-in for ws_factory in ShardedFeedManager.
+# ============================================================
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+# ============================================================
+# SMARTWEBSOCKETV2 BINARY PACKETS (LITTLE-ENDIAN)
+# mode:B exchange:B token:25s seq:q exchange_ts_ms:q ltp_paise:q
+# ============================================================
+LTP_PACKET = struct.Struct("<BB25sqqq")
+PACKET_SIZE = {1: 51, 2: 123, 3: 379}       # LTP / QUOTE / SNAP_QUOTE
+MODE_NAMES = {1: "LTP", 2: "QUOTE", 3: "SNAP_QUOTE"}
+
+def encode_packet(mode, exchange_type, token, seq, ts_ms, ltp_paise):
+    """
+    Quote / snap-quote packets carry the LTP header and zeroed depth.
+    """
+    pkt = LTP_PACKET.pack(mode, exchange_type, token.encode(), seq, ts_ms, ltp_paise)
+    return pkt + bytes(PACKET_SIZE.get(mode, 51) - len(pkt))
+
+def parse_packet(pkt):
+    """
+    Same keys SmartWebSocketV2 hands to on_data for the LTP fields.
+    """
+    mode, ex, tok, seq, ts_ms, ltp = LTP_PACKET.unpack_from(pkt)
+    return {
+        "subscription_mode": mode,
+        "exchange_type": ex,
+        "token": tok.split(b"\x00", 1)[0].decode(),
+        "sequence_number": seq,
+        "exchange_timestamp": ts_ms,
+        "last_traded_price": ltp,
+        "subscription_mode_val": MODE_NAMES.get(mode, "LTP"),
+    }
+
+# ============================================================
+# TICK GENERATOR (ONE VECTORISED STEP FOR ALL TOKENS)
+# ============================================================
+class SyntheticFeed:
+    def __init__(self, n_tokens=200, tokens=None, rate=2.0, skew=1.0, prices=(100.0, 5000.0),
+                 vol_bps=5.0, corr=0.6, jump_prob=0.0, jump_bps=50.0,
+                 burst_every=0.0, burst_len=5.0, burst_mult=10.0, open_burst=0.0,
+                 gap_prob=0.0, gap_s=20.0, exchange_type=2, start=None, clock_speed=1.0,
+                 tick_size=0.05, seed=None):
+        """
+        rate: mean ticks/s per token; skew spreads it Zipf-style
+        (a few liquid tokens, a long illiquid tail).
+        vol_bps: per-√second volatility; corr: share of it from the
+        common market factor; jump_prob: market-wide jumps per second.
+        burst_*: periodic rate multiplier; open_burst: seconds of
+        burst_mult at start (market open).
+        gap_prob: per-token chance per second of going silent for gap_s.
+        start / clock_speed: exchange clock (default today 09:15, real time).
+        """
+        self.rng = np.random.default_rng(seed)
+        self.tokens = [str(t) for t in tokens] if tokens is not None else \
+            [str(50000 + i) for i in range(n_tokens)]
+        n = len(self.tokens)
+        self.index = {t: i for i, t in enumerate(self.tokens)}
+        self.exchange_type = exchange_type
+        self.vol = vol_bps / 1e4
+        self.corr = corr
+        self.jump_prob = jump_prob
+        self.jump = jump_bps / 1e4
+        self.burst_every, self.burst_len, self.burst_mult = burst_every, burst_len, burst_mult
+        self.open_burst = open_burst
+        self.gap_prob, self.gap_s = gap_prob, gap_s
+        self.tick = tick_size
+        self.clock_speed = clock_speed
+        self.start = (start or datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)).timestamp()
+
+        w = 1.0 / np.arange(1, n + 1) ** skew
+        self.rates = self.rng.permutation(w / w.mean() * rate)
+        self.beta = self.rng.uniform(0.6, 1.4, n)
+        self.logp = np.log(self.rng.uniform(*prices, n))
+        self.gap_until = np.zeros(n)
+        self.elapsed = 0.0
+
+    def set_rate(self, rate):
+        self.rates *= rate / self.rates.mean()
+
+    def total_rate(self):
+        return float(self.rates.sum())
+
+    def multiplier(self, t):
+        if t < self.open_burst:
+            return self.burst_mult
+        if self.burst_every and t % self.burst_every < self.burst_len:
+            return self.burst_mult
+        return 1.0
+
+    def exchange_ms(self):
+        return int((self.start + self.elapsed * self.clock_speed) * 1000)
+
+    def prices(self, idx=None):
+        p = np.exp(self.logp if idx is None else self.logp[idx])
+        return np.round(p / self.tick) * self.tick
+
+    def step(self, dt, active):
+        """
+        Advance dt seconds. active: bool mask of subscribed tokens.
+        Returns token indices (shuffled) and their LTP in paise.
+        """
+        rng = self.rng
+        n = len(self.tokens)
+        self.elapsed += dt
+        t = self.elapsed
+        z = self.vol * math.sqrt(dt) * (
+            math.sqrt(self.corr) * rng.standard_normal() * self.beta
+            + math.sqrt(1 - self.corr) * rng.standard_normal(n))
+        if self.jump_prob and rng.random() < self.jump_prob * dt:
+            z += self.jump * rng.choice((-1.0, 1.0)) * self.beta
+        self.logp += z
+        if self.gap_prob:
+            start_gap = rng.random(n) < self.gap_prob * dt
+            self.gap_until[start_gap] = t + self.gap_s
+        live = active & (self.gap_until <= t)
+        counts = rng.poisson(self.rates * (self.multiplier(t) * dt) * live)
+        idx = rng.permutation(np.repeat(np.arange(n), counts))
+        return idx, np.rint(self.prices(idx) * 100).astype(np.int64)
+
+# ============================================================
+# HUB (GENERATOR THREAD → SUBSCRIBED CONNECTIONS)
+# ============================================================
+class FeedHub:
+    def __init__(self, feed, step_s=0.005, history=1 << 20):
+        """
+        sent_ns[seq & mask] is the perf_counter_ns each tick left the
+        hub: consumers get exact tick-to-X latency from sequence_number.
+        """
+        self.feed = feed
+        self.step_s = step_s
+        self.sent_ns = np.zeros(history, dtype=np.int64)
+        self.mask = history - 1
+        self.seq = 0
+        self.routes = defaultdict(dict)     # token index -> {sink: mode}
+        self.active = np.zeros(len(feed.tokens), dtype=bool)
+        self.stall_until = 0.0
+        self.stats = {"generated": 0, "delivered": 0, "steps": 0, "late_steps": 0,
+                      "unknown_tokens": 0, "stalled_s": 0.0}
+        self.running = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._tok = [t.encode() for t in feed.tokens]
+
+    # ---------------- subscriptions ----------------
+    def subscribe(self, sink, mode, token_list):
+        with self._lock:
+            for grp in token_list:
+                for t in grp["tokens"]:
+                    i = self.feed.index.get(str(t))
+                    if i is None:
+                        self.stats["unknown_tokens"] += 1
+                        continue
+                    self.routes[i][sink] = mode
+                    self.active[i] = True
+
+    def unsubscribe(self, sink, token_list=None):
+        with self._lock:
+            idx = list(self.routes) if token_list is None else \
+                [self.feed.index.get(str(t)) for g in token_list for t in g["tokens"]]
+            for i in idx:
+                subs = self.routes.get(i)
+                if subs is None:
+                    continue
+                subs.pop(sink, None)
+                if not subs:
+                    del self.routes[i]
+                    self.active[i] = False
+
+    def stall(self, seconds):
+        """
+        Connections stay open but go silent (heartbeat / stale tests).
+        """
+        self.stall_until = time.perf_counter() + seconds
+
+    def ltp(self, token):
+        i = self.feed.index.get(str(token))
+        return None if i is None else float(self.feed.prices(i))
+
+    # ---------------- generator ----------------
+    def _emit(self, idx, ltp):
+        n = len(idx)
+        if not n:
+            return
+        feed, enc, tok = self.feed, LTP_PACKET.pack, self._tok
+        ex, ts = feed.exchange_type, feed.exchange_ms()
+        seq0 = self.seq
+        self.seq += n
+        out = defaultdict(list)
+        with self._lock:
+            routes = self.routes
+            for k, (i, px) in enumerate(zip(idx.tolist(), ltp.tolist())):
+                for sink, mode in routes.get(i, {}).items():
+                    pkt = enc(mode, ex, tok[i], seq0 + k, ts, px)
+                    if mode != 1:
+                        pkt += bytes(PACKET_SIZE[mode] - 51)
+                    out[sink].append(pkt)
+        self.sent_ns[np.arange(seq0, seq0 + n) & self.mask] = time.perf_counter_ns()
+        for sink, pkts in out.items():
+            sink.push(pkts)
+            self.stats["delivered"] += len(pkts)
+        self.stats["generated"] += n
+
+    def _loop(self):
+        last = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            dt, last = now - last, now
+            idx, ltp = self.feed.step(dt, self.active)
+            self.stats["steps"] += 1
+            if now < self.stall_until:
+                self.stats["stalled_s"] += dt
+            else:
+                self._emit(idx, ltp)
+            spare = self.step_s - (time.perf_counter() - now)
+            if spare > 0:
+                time.sleep(spare)
+            else:
+                self.stats["late_steps"] += 1       # generator itself is saturated
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="feed-hub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+# ============================================================
+# IN-PROCESS SMARTWEBSOCKETV2 (NO SOCKET, SAME PACKETS + PARSE)
+# ============================================================
+_CLOSE = object()
+
+class LoopbackWebSocketV2:
+    """
+    SmartWebSocketV2 surface: on_open / on_data / on_error / on_close,
+    connect() blocks delivering ticks, subscribe / unsubscribe /
+    close_connection.
+    """
+    def __init__(self, hub, auth_token=None, api_key=None, client_code=None, feed_token=None):
+        self.hub = hub
+        self.q = queue.SimpleQueue()
+        self.on_open = self.on_data = self.on_error = self.on_close = None
+        self.connected = False
+
+    def push(self, pkts):
+        self.q.put(pkts)
+
+    def subscribe(self, correlation_id, mode, token_list):
+        self.hub.subscribe(self, mode, token_list)
+
+    def unsubscribe(self, correlation_id, mode, token_list):
+        self.hub.unsubscribe(self, token_list)
+
+    def connect(self):
+        self.connected = True
+        if self.on_open:
+            self.on_open(self)
+        q, parse = self.q, parse_packet
+        while True:
+            pkts = q.get()
+            if pkts is _CLOSE:
+                break
+            for p in pkts:
+                self.on_data(self, parse(p))
+        self.connected = False
+        self.hub.unsubscribe(self)
+        if self.on_close:
+            self.on_close(self)
+
+    def close_connection(self):
+        self.q.put(_CLOSE)
+
+def loopback_factory(hub):
+    return lambda: LoopbackWebSocketV2(hub)
+
+# ============================================================
+# LOCAL ws:// SERVER (REAL SmartWebSocketV2 CAN CONNECT)
+# ============================================================
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def _frame(opcode, payload):
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+def _recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+def _read_frame(sock):
+    b0, b1 = _recv_exact(sock, 2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    key = _recv_exact(sock, 4) if b1 & 0x80 else b"\0\0\0\0"
+    data = _recv_exact(sock, n)
+    if b1 & 0x80:
+        k = int.from_bytes((key * (n // 4 + 1))[:n], "big")
+        data = (int.from_bytes(data, "big") ^ k).to_bytes(n, "big")
+    return b0 & 0x0F, data
+
+class _SocketSink:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.alive = True
+
+    def push(self, pkts):
+        if not self.alive:
+            return
+        try:
+            with self.lock:
+                self.sock.sendall(b"".join(_frame(0x2, p) for p in pkts))
+        except OSError:
+            self.alive = False
+
+    def send(self, opcode, payload):
+        with self.lock:
+            self.sock.sendall(_frame(opcode, payload))
+
+class FeedServer:
+    """
+    Minimal RFC 6455 server speaking the SmartAPI stream protocol:
+    JSON {"action": 1|0, "params": {"mode", "tokenList"}} in, binary
+    LTP packets out, "ping" → "pong". Point a client at it with
+    ws.ROOT_URI = server.url.
+    """
+    def __init__(self, hub, host="127.0.0.1", port=0):
+        self.hub = hub
+        self.sock = socket.create_server((host, port))
+        self.host, self.port = self.sock.getsockname()[:2]
+        self.clients = 0
+        self.running = False
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/smart-stream"
+
+    def _handshake(self, conn):
+        req = b""
+        while b"\r\n\r\n" not in req:
+            chunk = conn.recv(4096)
+            if not chunk:
+                raise ConnectionError("no handshake")
+            req += chunk
+        headers = {}
+        for line in req.decode(errors="replace").split("\r\n")[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        accept = base64.b64encode(hashlib.sha1(
+            (headers["sec-websocket-key"] + _WS_GUID).encode()).digest()).decode()
+        conn.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    def _serve(self, conn):
+        sink = _SocketSink(conn)
+        self.clients += 1
+        try:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._handshake(conn)
+            while self.running and sink.alive:
+                op, data = _read_frame(conn)
+                if op == 0x8:
+                    break
+                if op == 0x9:
+                    sink.send(0xA, data)
+                elif op == 0x1:
+                    text = data.decode()
+                    if text == "ping":
+                        sink.send(0x1, b"pong")
+                        continue
+                    req = json.loads(text)
+                    params = req.get("params", {})
+                    if req.get("action") == 1:
+                        self.hub.subscribe(sink, params.get("mode", 1), params.get("tokenList", []))
+                    elif req.get("action") == 0:
+                        self.hub.unsubscribe(sink, params.get("tokenList", []))
+        except (ConnectionError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            sink.alive = False
+            self.hub.unsubscribe(sink)
+            self.clients -= 1
+            conn.close()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), name="feed-server-conn",
+                             daemon=True).start()
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._accept_loop, name="feed-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+
+def smart_ws_factory(url, auth_token="sim", api_key="sim", client_code="sim", feed_token="sim"):
+    """
+    Real SmartWebSocketV2 objects pointed at a FeedServer.
+    """
+    from SmartApi.smartWebSocketV2 import SmartWebSocketV2
+
+    def make():
+        ws = SmartWebSocketV2(auth_token, api_key, client_code, feed_token)
+        ws.ROOT_URI = url
+        return ws
+    return make
+
+# ============================================================
+# CLI: python pawanfeedsim.py --tokens 500 --rate 4 --port 8765
+# (point SmartWebSocketV2.ROOT_URI at the printed url)
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve a synthetic SmartAPI tick stream over ws://")
+    ap.add_argument("--tokens", type=int, default=200)
+    ap.add_argument("--rate", type=float, default=2.0, help="mean ticks/s per token")
+    ap.add_argument("--skew", type=float, default=1.0)
+    ap.add_argument("--open-burst", type=float, default=0.0, help="seconds of burst at start")
+    ap.add_argument("--burst-every", type=float, default=0.0)
+    ap.add_argument("--burst-mult", type=float, default=10.0)
+    ap.add_argument("--gap-prob", type=float, default=0.0)
+    ap.add_argument("--clock-speed", type=float, default=1.0)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    feed = SyntheticFeed(args.tokens, rate=args.rate, skew=args.skew, open_burst=args.open_burst,
+                         burst_every=args.burst_every, burst_mult=args.burst_mult,
+                         gap_prob=args.gap_prob, clock_speed=args.clock_speed, seed=args.seed)
+    hub = FeedHub(feed).start()
+    server = FeedServer(hub, port=args.port).start()
+    print(f"✅ {len(feed.tokens)} tokens ({feed.tokens[0]}..{feed.tokens[-1]}), "
+          f"~{feed.total_rate():.0f} ticks/s at {server.url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(", ".join(f"{k}={round(v, 1)}" for k, v in {**hub.stats, "clients": server.clients}.items()))
+    except KeyboardInterrupt:
+        server.stop()
+        hub.stop()
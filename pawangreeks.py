@@ -0,0 +1,223 @@
+# ============================================================
+# PAWAN OPTION GREEKS + IMPLIED VOLATILITY (VECTORIZED)
+# Black-Scholes / Black-76 over whole chains in one NumPy pass
+# - batched Newton IV with bisection safeguard
+# - delta / gamma / theta / vega per subscribed option
+# - results cached per token for the current second
+# ============================================================
+
+import time
+from datetime import datetime, time as dtime
+
+import numpy as np
+
+RISK_FREE_RATE = 0.065          # annualised, continuous
+EXPIRY_TIME = dtime(15, 30)     # NSE option expiry (exchange close)
+YEAR_SECONDS = 365.0 * 86400
+MIN_T = 1.0 / (365.0 * 24 * 60)  # one minute, avoids T=0 blow-ups
+SQRT_2PI = 2.5066282746310002
+
+# ============================================================
+# NORMAL CDF / PDF (HART 1968, DOUBLE PRECISION, VECTORIZED)
+# ============================================================
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+def norm_cdf(x):
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    e = np.exp(-0.5 * z * z)
+    n = (((((0.0352624965998911 * z + 0.700383064443688) * z + 6.37396220353165) * z
+           + 33.912866078383) * z + 112.079291497871) * z + 221.213596169931) * z + 220.206867912376
+    d = ((((((0.0883883476483184 * z + 1.75566716318264) * z + 16.064177579207) * z
+            + 86.7807322029461) * z + 296.564248779674) * z + 637.333633378831) * z
+         + 793.826512519948) * z + 440.413735824752
+    near = e * n / d
+    with np.errstate(divide="ignore", invalid="ignore"):
+        far = e / (z + 1 / (z + 2 / (z + 3 / (z + 4 / (z + 0.65))))) / SQRT_2PI
+    c = np.where(z < 7.07106781186547, near, far)
+    c = np.where(z > 37, 0.0, c)
+    return np.where(x > 0, 1 - c, c)
+
+# ============================================================
+# BLACK-76 CORE (BS = BLACK-76 ON F = S·e^{rT})
+# ============================================================
+def _d1_d2(F, K, T, sigma):
+    vt = sigma * np.sqrt(T)
+    d1 = (np.log(F / K) + 0.5 * vt * vt) / vt
+    return d1, d1 - vt
+
+def forward(S, T, r=RISK_FREE_RATE, model="bs"):
+    return S * np.exp(r * T) if model == "bs" else S
+
+def price(S, K, T, sigma, is_call, r=RISK_FREE_RATE, model="bs"):
+    """
+    model="bs": S is spot. model="black76": S is the futures price.
+    """
+    F = forward(S, T, r, model)
+    df = np.exp(-r * T)
+    d1, d2 = _d1_d2(F, K, T, sigma)
+    call = df * (F * norm_cdf(d1) - K * norm_cdf(d2))
+    put = df * (K * norm_cdf(-d2) - F * norm_cdf(-d1))
+    return np.where(is_call, call, put)
+
+def greeks(S, K, T, sigma, is_call, r=RISK_FREE_RATE, model="bs"):
+    F = forward(S, T, r, model)
+    df = np.exp(-r * T)
+    sqrt_t = np.sqrt(T)
+    d1, d2 = _d1_d2(F, K, T, sigma)
+    pdf1 = norm_pdf(d1)
+    nd1, nd2 = norm_cdf(d1), norm_cdf(d2)
+
+    # dF/dS = e^{rT} for spot (bs), 1 for futures (black76)
+    fs = F / S
+    delta = np.where(is_call, df * fs * nd1, df * fs * (nd1 - 1))
+    gamma = df * fs * fs * pdf1 / (S * fs * sigma * sqrt_t)
+    vega = df * F * pdf1 * sqrt_t
+    call_px = df * (F * nd1 - K * nd2)
+    put_px = df * (K * (1 - nd2) - F * (1 - nd1))
+    px = np.where(is_call, call_px, put_px)
+    decay = -df * F * pdf1 * sigma / (2 * sqrt_t)
+    if model == "bs":
+        theta = decay + np.where(is_call, -r * K * df * nd2, r * K * df * (1 - nd2))
+    else:
+        theta = decay + r * px
+    return {
+        "price": px,
+        "delta": delta,
+        "gamma": gamma,
+        "theta": theta / 365.0,     # per calendar day
+        "vega": vega / 100.0,       # per 1 vol point
+    }
+
+# ============================================================
+# IMPLIED VOLATILITY (BATCHED NEWTON + BISECTION GUARD)
+# ============================================================
+def implied_vol(target, S, K, T, is_call, r=RISK_FREE_RATE, model="bs",
+                tol=1e-6, max_iter=50, lo=1e-4, hi=5.0):
+    target, S, K, T, is_call = np.broadcast_arrays(
+        np.asarray(target, float), np.asarray(S, float), np.asarray(K, float),
+        np.asarray(T, float), np.asarray(is_call, bool))
+    n = target.shape
+    iv = np.full(n, np.nan)
+
+    F = forward(S, T, r, model)
+    df = np.exp(-r * T)
+    intrinsic = df * np.where(is_call, np.maximum(F - K, 0), np.maximum(K - F, 0))
+    upper = df * np.where(is_call, F, K)
+    ok = (target > intrinsic) & (target < upper) & (T > 0)
+
+    idx = np.flatnonzero(ok)
+    tgt, s_, k_, t_, c_ = target.flat[idx], S.flat[idx], K.flat[idx], T.flat[idx], is_call.flat[idx]
+    lo_v = np.full(idx.size, lo)
+    hi_v = np.full(idx.size, hi)
+    # Brenner-Subrahmanyam seed
+    sig = np.clip(np.sqrt(2 * np.pi / t_) * tgt / np.where(c_, s_, k_), 0.05, 2.0)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        g = greeks(s_, k_, t_, sig, c_, r, model)
+        diff = g["price"] - tgt
+        done = np.abs(diff) < tol
+        iv.flat[idx[done]] = sig[done]
+        keep = ~done
+        if not keep.any():
+            break
+        idx, tgt, s_, k_, t_, c_ = idx[keep], tgt[keep], s_[keep], k_[keep], t_[keep], c_[keep]
+        sig, diff, vega = sig[keep], diff[keep], g["vega"][keep] * 100.0
+        lo_v, hi_v = lo_v[keep], hi_v[keep]
+
+        # price is increasing in sigma: tighten the bracket
+        hi_v = np.where(diff > 0, sig, hi_v)
+        lo_v = np.where(diff < 0, sig, lo_v)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = sig - diff / vega
+        bad = ~np.isfinite(step) | (step <= lo_v) | (step >= hi_v)
+        sig = np.where(bad, 0.5 * (lo_v + hi_v), step)
+    return iv
+
+# ============================================================
+# CHAIN ENGINE (ONE PASS PER SECOND, CACHED PER TOKEN)
+# ============================================================
+def year_fraction(expiry, now):
+    exp_dt = datetime.combine(expiry, EXPIRY_TIME)
+    return max((exp_dt - now).total_seconds() / YEAR_SECONDS, MIN_T)
+
+class GreeksEngine:
+    def __init__(self, r=RISK_FREE_RATE, model="bs"):
+        self.r = r
+        self.model = model
+        self.stamp = None               # second the cache belongs to
+        self.rows = {}                  # token -> row index
+        self.table = {}                 # column -> np.ndarray
+        self.compute_ms = 0.0
+
+    def compute(self, legs, ltp, underlying, now=None):
+        """
+        legs: contract dicts from OptionChainIndex (token/strike/type/expiry)
+        ltp: token -> option last price; underlying: spot (bs) or future (black76)
+        """
+        now = now or datetime.now()
+        stamp = int(now.timestamp())
+        if stamp == self.stamp:
+            return self.table
+        t0 = time.perf_counter()
+
+        legs = [l for l in legs if l is not None and l["token"] in ltp]
+        tokens = [l["token"] for l in legs]
+        K = np.fromiter((l["strike"] for l in legs), float, len(legs))
+        T = np.fromiter((year_fraction(l["expiry"], now) for l in legs), float, len(legs))
+        is_call = np.fromiter((l["type"] == "CE" for l in legs), bool, len(legs))
+        px = np.fromiter((ltp[t] for t in tokens), float, len(legs))
+        S = np.full(len(legs), float(underlying))
+
+        iv = implied_vol(px, S, K, T, is_call, self.r, self.model)
+        g = greeks(S, K, T, np.where(np.isnan(iv), np.nan, iv), is_call, self.r, self.model)
+
+        self.table = {
+            "token": np.array(tokens, dtype=object),
+            "strike": K,
+            "is_call": is_call,
+            "ltp": px,
+            "iv": iv,
+            "delta": g["delta"],
+            "gamma": g["gamma"],
+            "theta": g["theta"],
+            "vega": g["vega"],
+        }
+        self.rows = {t: i for i, t in enumerate(tokens)}
+        self.stamp = stamp
+        self.compute_ms = (time.perf_counter() - t0) * 1000
+        return self.table
+
+    def get(self, token):
+        i = self.rows.get(token)
+        if i is None:
+            return None
+        return {k: v[i] for k, v in self.table.items()}
+
+    # ---------------- strike selection ----------------
+    def strike_by_delta(self, side, target_delta):
+        """
+        Token whose |delta| is closest to target_delta on the given side.
+        """
+        if not self.rows:
+            return None
+        mask = self.table["is_call"] if side == "CE" else ~self.table["is_call"]
+        dist = np.abs(np.abs(self.table["delta"]) - target_delta)
+        dist = np.where(mask & np.isfinite(dist), dist, np.inf)
+        i = int(np.argmin(dist))
+        return self.table["token"][i] if np.isfinite(dist[i]) else None
+
+    # ---------------- risk sizing ----------------
+    def expected_move_pct(self, token, underlying, minutes):
+        """
+        One-sigma option move over `minutes` of trading, as a fraction of
+        the option price: |delta| * S * iv * sqrt(h) / price.
+        """
+        row = self.get(token)
+        if row is None or not np.isfinite(row["iv"]) or row["ltp"] <= 0:
+            return None
+        h = minutes / (375.0 * 252.0)       # NSE session minutes per year
+        return abs(row["delta"]) * underlying * row["iv"] * np.sqrt(h) / row["ltp"]
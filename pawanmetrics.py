@@ -0,0 +1,427 @@
+# ============================================================
+# PAWAN ENGINE METRICS (COUNTERS / GAUGES / HISTOGRAMS)
+# - Hot-path updates take no lock: every thread adds into its own
+#   cell, cells are summed only when scraped
+# - Gauges can be callbacks (queue depth, orders in flight, store
+#   size) evaluated at scrape time → zero per-tick cost
+# - Prometheus text format on a local HTTP endpoint (/metrics) and
+#   a DataFrame-ready rows() view with per-second rates
+# Metrics are get-or-create by name, so Streamlit reruns reuse them.
+# ============================================================
+
+import bisect
+import functools
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ident = threading.get_ident
+
+METRICS_PORT = 9108
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+# ============================================================
+# METRIC TYPES
+# ============================================================
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help="", labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()       # only taken when a new label set appears
+
+    def labels(self, *values, **kw):
+        """
+        Child for one label set; cache it outside the hot loop.
+        """
+        key = tuple(str(v) for v in values) or tuple(str(kw[k]) for k in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def _series(self):
+        if not self.label_names:
+            return [((), self)]
+        return list(self._children.items())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help="", labels=()):
+        super().__init__(name, help, labels)
+        self._cells = {}                    # thread ident -> [value]
+
+    def _child(self):
+        return Counter(self.name)
+
+    def inc(self, n=1):
+        try:
+            self._cells[_ident()][0] += n
+        except KeyError:
+            self._cells[_ident()] = [n]
+
+    def value(self):
+        return sum(c[0] for c in list(self._cells.values()))
+
+    def samples(self):
+        return [(self.name + "_total", k, c.value()) for k, c in self._series()]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help="", labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self._v = 0.0
+        self.fn = fn                        # fn() -> value, or {label tuple: value}
+
+    def _child(self):
+        return Gauge(self.name)
+
+    def set(self, v):
+        self._v = v
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def value(self):
+        return self.fn() if self.fn is not None else self._v
+
+    def samples(self):
+        if self.fn is not None and self.label_names:
+            try:
+                vals = self.fn()
+            except Exception as e:
+                print(f"❌ Gauge {self.name} failed:", e)
+                return []
+            return [(self.name, tuple(str(x) for x in k), v) for k, v in vals.items()]
+        out = []
+        for k, g in self._series():
+            try:
+                out.append((self.name, k, g.value()))
+            except Exception as e:
+                print(f"❌ Gauge {self.name} failed:", e)
+        return out
+
+class CounterFunc(Gauge):
+    """
+    Monotonic count owned by another object (shard stats, reconciler),
+    read at scrape time and exposed as a counter.
+    """
+    kind = "counter"
+
+    def samples(self):
+        return [(self.name + "_total", k, v) for _, k, v in super().samples()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help="", labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._cells = {}                    # thread ident -> [counts..., sum]
+
+    def _child(self):
+        return Histogram(self.name, buckets=self.buckets)
+
+    def observe(self, v):
+        try:
+            cell = self._cells[_ident()]
+        except KeyError:
+            cell = self._cells[_ident()] = [0] * (len(self.buckets) + 1) + [0.0]
+        cell[bisect.bisect_left(self.buckets, v)] += 1
+        cell[-1] += v
+
+    def time(self):
+        return _Timer(self)
+
+    def totals(self):
+        n = len(self.buckets) + 1
+        tot = [0] * n + [0.0]
+        for cell in list(self._cells.values()):
+            for i in range(n + 1):
+                tot[i] += cell[i]
+        return tot
+
+    def quantile(self, q):
+        """
+        Upper bucket bound holding the q-th observation (None if empty).
+        """
+        tot = self.totals()
+        count = sum(tot[:-1])
+        if not count:
+            return None
+        acc, target = 0, q * count
+        for i, c in enumerate(tot[:-1]):
+            acc += c
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+
+    def samples(self):
+        out = []
+        for k, h in self._series():
+            tot = h.totals()
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), tot[:-1]):
+                acc += c
+                out.append((self.name + "_bucket", k + (("le", _num(le)),), acc))
+            out.append((self.name + "_sum", k, tot[-1]))
+            out.append((self.name + "_count", k, acc))
+        return out
+
+def timed(hist):
+    """
+    Decorator: observe the wrapped function's wall time into `hist`.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kw)
+            finally:
+                hist.observe(time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+class _Timer:
+    __slots__ = ("h", "t0")
+
+    def __init__(self, h):
+        self.h = h
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.h.observe(time.perf_counter() - self.t0)
+
+# ============================================================
+# REGISTRY
+# ============================================================
+class Registry:
+    def __init__(self, prefix="pawan_"):
+        self.prefix = prefix
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._last = None               # (t, {series: value}) for rows() rates
+
+    def _get(self, cls, name, help, labels, **kw):
+        name = self.prefix + name
+        m = self.metrics.get(name)
+        if m is None:
+            with self._lock:
+                m = self.metrics.get(name)
+                if m is None:
+                    m = self.metrics[name] = cls(name, help, labels, **kw)
+        return m
+
+    def counter(self, name, help="", labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", labels=(), fn=None):
+        g = self._get(Gauge, name, help, labels)
+        if fn is not None:
+            g.set_function(fn)          # a rerun rebinds the callback to the live objects
+        return g
+
+    def counter_func(self, name, help="", labels=(), fn=None):
+        c = self._get(CounterFunc, name, help, labels)
+        c.set_function(fn)
+        return c
+
+    def histogram(self, name, help="", labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    # ---------------- exposition ----------------
+    def render(self):
+        """
+        Prometheus text exposition format 0.0.4.
+        """
+        lines = []
+        for m in list(self.metrics.values()):
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, key, v in m.samples():
+                extra = [key[-1]] if name.endswith("_bucket") else []
+                vals = key[:-1] if extra else key
+                lines.append(f"{name}{_label_str(m.label_names, vals, extra)} {_num(v)}")
+        return "\n".join(lines) + "\n"
+
+    def rows(self):
+        """
+        One row per series (histogram buckets folded into p50 / p99),
+        with per-second rates of counters since the previous call.
+        """
+        now = time.time()
+        cur, out = {}, []
+        for m in list(self.metrics.values()):
+            if isinstance(m, Histogram):
+                for k, h in m._series():
+                    tot = h.totals()
+                    count = sum(tot[:-1])
+                    out.append({"metric": m.name, "labels": _label_str(m.label_names, k),
+                                "value": count, "rate_per_s": None,
+                                "mean_ms": round(tot[-1] / count * 1e3, 3) if count else None,
+                                "p50_ms": _ms(h.quantile(0.5)), "p99_ms": _ms(h.quantile(0.99))})
+                continue
+            for name, k, v in m.samples():
+                series = (name, k)
+                cur[series] = v
+                rate = None
+                if m.kind == "counter" and self._last and series in self._last[1]:
+                    dt = now - self._last[0]
+                    rate = round((v - self._last[1][series]) / dt, 2) if dt > 0 else None
+                out.append({"metric": name, "labels": _label_str(m.label_names, k), "value": v,
+                            "rate_per_s": rate, "mean_ms": None, "p50_ms": None, "p99_ms": None})
+        self._last = (now, cur)
+        return out
+
+def _ms(v):
+    if v is None:
+        return None
+    return "inf" if v == float("inf") else round(v * 1e3, 3)
+
+REGISTRY = Registry()
+
+# ============================================================
+# HTTP ENDPOINT (ONE PER PORT PER PROCESS)
+# ============================================================
+_servers = {}
+
+def start_http_server(registry=REGISTRY, port=METRICS_PORT, host="127.0.0.1"):
+    """
+    Serves registry.render() at /metrics. Idempotent per port, so a
+    Streamlit rerun finds the running server instead of failing to bind.
+    """
+    srv = _servers.get(port)
+    if srv is not None:
+        srv.registry = registry
+        return srv
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = self.server.registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        srv = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on :{port}:", e)
+        return None
+    srv.daemon_threads = True
+    srv.registry = registry
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    _servers[port] = srv
+    return srv
+
+# ============================================================
+# COLLECTORS FOR EXISTING COMPONENTS (READ AT SCRAPE TIME)
+# ============================================================
+def register_feed(feed, registry=REGISTRY):
+    """
+    ShardedFeedManager shard counters, read from shard.stats() on scrape.
+    A tick whose handler raised is counted as dropped.
+    """
+    def per_shard(key):
+        return lambda: {(s["shard"],): s[key] for s in feed.stats()}
+    registry.counter_func("feed_ticks_received", "Ticks received per shard",
+                          ("shard",), per_shard("ticks_in"))
+    registry.counter_func("feed_ticks_processed", "Ticks handled per shard",
+                          ("shard",), per_shard("ticks_done"))
+    registry.counter_func("feed_ticks_dropped", "Ticks whose handler raised, per shard",
+                          ("shard",), per_shard("errors"))
+    registry.gauge("feed_queue_depth", "Ticks waiting for the shard worker",
+                   ("shard",), per_shard("queue_depth"))
+    registry.counter_func("feed_reconnects", "WebSocket reconnects per shard",
+                          ("shard",), per_shard("reconnects"))
+    registry.gauge("feed_connected", "1 while the shard socket is open",
+                   ("shard",), lambda: {(s["shard"],): int(s["connected"]) for s in feed.stats()})
+
+def register_candles(name, candles, registry=REGISTRY):
+    """
+    Size of a token -> [candle dict] store: bars, and bytes estimated
+    from one sampled candle (exact sizing is O(bars) per scrape).
+    """
+    def bars():
+        return sum(len(v) for v in list(candles.values()))
+
+    def nbytes():
+        lists = list(candles.values())
+        sample = next((v[-1] for v in lists if v), None)
+        if sample is None:
+            return 0
+        per = sys.getsizeof(sample) + sum(sys.getsizeof(x) for x in sample.values())
+        return sum(sys.getsizeof(v) + len(v) * per for v in lists)
+    registry.gauge("candle_store_bars", "Bars held in memory", ("store",),
+                   lambda: {(name,): bars()})
+    registry.gauge("candle_store_bytes", "Approximate bytes held by candle stores", ("store",),
+                   lambda: {(name,): nbytes()})
+
+def register_reconciler(recon, registry=REGISTRY):
+    registry.gauge("orders_in_flight", "Orders sent and not yet filled / rejected",
+                   fn=lambda: len(recon.pending))
+    registry.counter_func("recon_events", "BrokerReconciler counters", ("kind",),
+                          lambda: {(k,): v for k, v in recon.stats.items()})
+
+# ============================================================
+# BROKER CALL LATENCY (WRAPS SmartConnect / SimBroker)
+# ============================================================
+class TimedClient:
+    """
+    Proxy that times every method call on the wrapped broker client
+    into pawan_broker_call_seconds{method=...}; attributes pass through.
+    """
+    def __init__(self, client, registry=REGISTRY):
+        self._client = client
+        self._hist = registry.histogram("broker_call_seconds", "Broker API call latency", ("method",))
+        self._errors = registry.counter("broker_call_errors", "Broker API calls that raised", ("method",))
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        fn = self._wrapped.get(name)
+        if fn is None:
+            h, err = self._hist.labels(name), self._errors.labels(name)
+
+            def fn(*args, _name=name, **kw):
+                t0 = time.perf_counter()
+                try:
+                    return getattr(self._client, _name)(*args, **kw)
+                except Exception:
+                    err.inc()
+                    raise
+                finally:
+                    h.observe(time.perf_counter() - t0)
+            self._wrapped[name] = fn
+        return fn
@@ -0,0 +1,216 @@
+# ============================================================
+# PAWAN SAMPLING PROFILER (ON DEMAND, STAGE-ATTRIBUTED)
+# - Off: no thread, no hooks, nothing on the hot path
+# - On: one daemon thread snapshots sys._current_frames() every
+#   `interval`; stacks are kept as code-object tuples and only
+#   turned into strings when written
+# - Each sample is attributed to an engine stage (feed, candles,
+#   indicators, signals, orders, snapshots) by its innermost
+#   matching frame; parked workers count as idle
+# - Output: collapsed stacks (flamegraph.pl / speedscope) rooted at
+#   the stage, plus a per-stage CSV
+# ============================================================
+
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = "profiles"
+
+# "function" or "module:function" -> stage; the innermost matching
+# frame wins, and a module-qualified rule beats a bare name
+ENGINE_STAGES = {
+    "snapshots": ("save_signal_snapshot", "write_image", "to_image"),
+    "orders": ("placeOrder", "placeOrderFullResponse", "cancelOrder", "place_market_order",
+               "process_positions", "register", "track_fill"),
+    "indicators": ("sig_indicators", "calculate_indicators", "indicator_kernel", "commit", "peek",
+                   "rsi_wilder", "atr", "supertrend", "macd", "squeeze"),
+    "signals": ("get_sig", "validate_signal", "validate", "decide", "evaluate", "intrabar"),
+    "candles": ("update_tick", "process_tick", "get_closed_df", "on_forming", "on_close",
+                "pawanrepaint:on_tick"),
+    "feed": ("on_data", "on_tick", "_on_data", "_recv_loop", "_parse_binary_data", "parse_packet",
+             "pawanstress:__call__"),
+}
+# innermost Python frame of a thread parked on its queue / timer
+IDLE_LEAVES = ("_work_loop", "_loop", "_match_loop", "_writer", "_accept_loop", "wait",
+               "connect", "run_forever", "recv", "_recv", "select", "sleep")
+
+class SamplingProfiler:
+    def __init__(self, interval=0.01, stages=None, idle_leaves=IDLE_LEAVES,
+                 thread_prefixes=None, out_dir=PROFILE_DIR, max_depth=64):
+        """
+        thread_prefixes: only sample threads whose name starts with one
+        of these (None = every thread but the sampler).
+        """
+        self.interval = interval
+        self.stage_of = {fn: st for st, fns in (stages or ENGINE_STAGES).items() for fn in fns}
+        self.idle_leaves = set(idle_leaves)
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes else None
+        self.out_dir = out_dir
+        self.max_depth = max_depth
+        self._stage_code = {}           # code object -> stage or None
+
+        self.samples = Counter()        # (thread name, (code, ...) leaf first) -> count
+        self.running = False
+        self.started = None
+        self.elapsed = 0.0
+        self.cost = 0.0                 # seconds spent inside the sampler
+        self.ticks = 0
+        self.last_files = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ---------------- sampling ----------------
+    def _loop(self, until):
+        me = threading.get_ident()
+        names = {}
+        samples, interval, depth = self.samples, self.interval, self.max_depth
+        prefixes = self.thread_prefixes
+        while self.running and time.perf_counter() < until:
+            t0 = time.perf_counter()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident, str(ident))
+                if prefixes and not name.startswith(prefixes):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < depth:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                samples[(name, tuple(stack))] += 1
+            self.ticks += 1
+            spent = time.perf_counter() - t0
+            self.cost += spent
+            if interval > spent:
+                time.sleep(interval - spent)
+        self.elapsed = time.perf_counter() - self.started
+        self.running = False
+        self.last_files = self.write()
+
+    def start(self, seconds):
+        """
+        Sample for `seconds`, then write the output files. No-op if a
+        run is already in progress.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.samples = Counter()
+            self.ticks, self.cost = 0, 0.0
+            self.running = True
+            self.started = time.perf_counter()
+            self._thread = threading.Thread(target=self._loop, args=(self.started + seconds,),
+                                            name="profiler", daemon=True)
+            self._thread.start()
+        print(f"🔬 Profiling for {seconds}s every {self.interval * 1e3:.0f} ms")
+        return True
+
+    def stop(self):
+        self.running = False
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.last_files
+
+    # ---------------- attribution ----------------
+    def _code_stage(self, code):
+        try:
+            return self._stage_code[code]
+        except KeyError:
+            st = self.stage_of.get(self._label(code), self.stage_of.get(code.co_name))
+            self._stage_code[code] = st
+            return st
+
+    def stage(self, stack):
+        if stack and stack[0].co_name in self.idle_leaves:
+            return "idle"
+        for code in stack:
+            st = self._code_stage(code)
+            if st is not None:
+                return st
+        return "other"
+
+    def stage_table(self):
+        per = Counter()
+        for (_, stack), n in self.samples.items():
+            per[self.stage(stack)] += n
+        busy = sum(n for s, n in per.items() if s != "idle") or 1
+        return [{
+            "stage": s,
+            "samples": n,
+            "busy_pct": round(100.0 * n / busy, 1) if s != "idle" else None,
+            "est_ms": round(n * self.interval * 1e3, 1),
+        } for s, n in per.most_common()]
+
+    def overhead_pct(self):
+        return round(100.0 * self.cost / self.elapsed, 2) if self.elapsed else 0.0
+
+    # ---------------- output ----------------
+    @staticmethod
+    def _label(code):
+        return f"{os.path.basename(code.co_filename).rsplit('.', 1)[0]}:{code.co_name}"
+
+    def collapsed(self, include_idle=False):
+        """
+        Brendan Gregg folded format: "stage;thread;root;...;leaf count".
+        """
+        labels = {}
+        out = Counter()
+        for (thread, stack), n in self.samples.items():
+            st = self.stage(stack)
+            if st == "idle" and not include_idle:
+                continue
+            parts = []
+            for code in reversed(stack):
+                lab = labels.get(code)
+                if lab is None:
+                    lab = labels[code] = self._label(code)
+                parts.append(lab)
+            out[";".join([st, thread.rstrip("0123456789-")] + parts)] += n
+        return [f"{k} {n}" for k, n in out.most_common()]
+
+    def write(self, out_dir=None):
+        out_dir = out_dir or self.out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, f"profile_{datetime.now():%Y%m%d_%H%M%S}")
+        with open(base + ".collapsed", "w") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        with open(base + ".stages.csv", "w") as f:
+            f.write("stage,samples,busy_pct,est_ms\n")
+            for r in self.stage_table():
+                f.write(f"{r['stage']},{r['samples']},{'' if r['busy_pct'] is None else r['busy_pct']},{r['est_ms']}\n")
+        print(f"🔬 Profile written: {base}.collapsed ({self.ticks} samples, "
+              f"overhead {self.overhead_pct()}%)")
+        return base + ".collapsed", base + ".stages.csv"
+
+    # ---------------- triggers ----------------
+    def install_signal(self, signum=getattr(signal, "SIGUSR2", None), seconds=30):
+        """
+        `kill -USR2 <pid>` profiles for `seconds`. Only the main thread
+        may install handlers (not a Streamlit script thread): returns
+        False there.
+        """
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.start(seconds))
+        return True
+
+def latest_profile(out_dir=PROFILE_DIR):
+    """
+    (collapsed path, stages csv path) of the newest run, or None.
+    """
+    if not os.path.isdir(out_dir):
+        return None
+    runs = sorted(f for f in os.listdir(out_dir) if f.endswith(".collapsed"))
+    if not runs:
+        return None
+    base = os.path.join(out_dir, runs[-1][:-len(".collapsed")])
+    return base + ".collapsed", base + ".stages.csv"
@@ -0,0 +1,208 @@
+# ============================================================
+# PAWAN BROKER RECONCILER (ORDER INTENTS ↔ ORDER / TRADE BOOK)
+# - Order path only registers an intent (dict insert)
+# - Background thread polls orderBook + tradeBook once per cycle
+#   for ALL pending intents (batched, not per order)
+# - Fills correct the ledger via callbacks with the real VWAP
+#   price / filled quantity; slippage vs signal price is tracked
+# ============================================================
+
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+TERMINAL = {"complete", "rejected", "cancelled"}
+
+def order_id_of(res):
+    """
+    smart.placeOrder returns the order id string;
+    placeOrderFullResponse returns {"status", "data": {"orderid"}}.
+    """
+    if res is None:
+        return None
+    if isinstance(res, str):
+        return res
+    return ((res or {}).get("data") or {}).get("orderid")
+
+# ============================================================
+# ORDER INTENT
+# ============================================================
+class OrderIntent:
+    __slots__ = ("orderid", "token", "symbol", "side", "qty", "ref_price",
+                 "signal_ts", "batch_ts", "sent_ts", "ack_ts", "on_fill", "on_reject", "tag")
+
+    def __init__(self, orderid, token, symbol, side, qty, ref_price=None,
+                 signal_ts=None, sent_ts=None, on_fill=None, on_reject=None, tag=None,
+                 batch_ts=None):
+        self.orderid = str(orderid)
+        self.token = str(token)
+        self.symbol = symbol
+        self.side = side
+        self.qty = int(qty)
+        self.ref_price = ref_price
+        self.signal_ts = signal_ts
+        self.batch_ts = batch_ts        # decided (bar batch flushed); None = at the signal
+        self.ack_ts = time.time()       # placeOrder returned (intent registered)
+        self.sent_ts = sent_ts or self.ack_ts
+        self.on_fill = on_fill          # fn(intent, fill_price, filled_qty, fill_time)
+        self.on_reject = on_reject      # fn(intent, status, text)
+        self.tag = tag
+
+# ============================================================
+# RECONCILER
+# ============================================================
+class BrokerReconciler:
+    def __init__(self, smart, interval=2.0, max_age=600.0, history=5000):
+        self.smart = smart
+        self.interval = interval
+        self.max_age = max_age          # stop chasing intents older than this (s)
+        self.pending = {}               # orderid -> OrderIntent
+        self.fills = deque(maxlen=history)
+        self.listeners = []             # fn(fill_record) — e.g. slippage pipeline
+        self.stats = {"polls": 0, "fills": 0, "rejects": 0, "expired": 0, "errors": 0}
+        self.last_poll = None
+        self.running = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # ---------------- hot path ----------------
+    def register(self, orderid, token, symbol, side, qty, **kw):
+        if not orderid:
+            return None
+        intent = OrderIntent(orderid, token, symbol, side, qty, **kw)
+        with self._lock:
+            self.pending[intent.orderid] = intent
+        return intent
+
+    def poke(self):
+        # reconcile sooner than the cadence (e.g. right after a burst of orders)
+        self._wake.set()
+
+    # ---------------- background cycle ----------------
+    @staticmethod
+    def _rows(res):
+        return (res or {}).get("data") or []
+
+    def _trade_vwap(self, trades):
+        agg = defaultdict(lambda: [0.0, 0, None])
+        for t in trades:
+            a = agg[str(t.get("orderid"))]
+            size = int(float(t.get("fillsize") or 0))
+            a[0] += float(t.get("fillprice") or 0) * size
+            a[1] += size
+            a[2] = t.get("filltime") or a[2]
+        return {oid: (v / q if q else None, q, ft) for oid, (v, q, ft) in agg.items()}
+
+    def reconcile_once(self):
+        with self._lock:
+            if not self.pending:
+                return 0
+            pending = dict(self.pending)
+        self.stats["polls"] += 1
+        self.last_poll = datetime.now()
+        try:
+            book = {str(o.get("orderid")): o for o in self._rows(self.smart.orderBook())}
+            vwap = self._trade_vwap(self._rows(self.smart.tradeBook()))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print("❌ Reconcile poll failed:", e)
+            return 0
+
+        now = time.time()
+        done = []
+        for oid, intent in pending.items():
+            o = book.get(oid)
+            status = (o or {}).get("status", "").lower()
+            if o is None or status not in TERMINAL:
+                if now - intent.sent_ts > self.max_age:
+                    self.stats["expired"] += 1
+                    done.append(oid)
+                continue
+            px, q, ft = vwap.get(oid, (None, 0, None))
+            if not q:
+                q = int(float(o.get("filledshares") or 0))
+                px = float(o.get("averageprice") or 0) or None
+                ft = o.get("exchtime") or o.get("updatetime")
+            if q and px:
+                self._filled(intent, px, q, ft, now)
+            else:
+                self.stats["rejects"] += 1
+                if intent.on_reject:
+                    intent.on_reject(intent, status, o.get("text"))
+            done.append(oid)
+
+        with self._lock:
+            for oid in done:
+                self.pending.pop(oid, None)
+        return len(done)
+
+    def _filled(self, intent, px, qty, fill_time, seen_ts):
+        self.stats["fills"] += 1
+        sign = 1 if intent.side == "BUY" else -1
+        slip = None if intent.ref_price is None else (px - intent.ref_price) * sign
+        rec = {
+            "orderid": intent.orderid,
+            "token": intent.token,
+            "symbol": intent.symbol,
+            "side": intent.side,
+            "qty": qty,
+            "intent_qty": intent.qty,
+            "ref_price": intent.ref_price,
+            "fill_price": px,
+            "signal_ts": intent.signal_ts,
+            "batch_ts": intent.batch_ts,
+            "sent_ts": intent.sent_ts,
+            "ack_ts": intent.ack_ts,
+            "fill_time": fill_time,
+            "seen_ts": seen_ts,
+            "slippage": slip,                       # +ve = worse than signal price
+            "slippage_rs": None if slip is None else slip * qty,
+            "tag": intent.tag,
+        }
+        self.fills.append(rec)
+        if intent.on_fill:
+            try:
+                intent.on_fill(intent, px, qty, fill_time)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"❌ Ledger correction failed for {intent.orderid}:", e)
+        for fn in self.listeners:
+            fn(rec)
+
+    def _loop(self):
+        while self.running:
+            self.reconcile_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="broker-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+
+    # ---------------- reporting ----------------
+    def slippage_stats(self):
+        per = defaultdict(lambda: {"fills": 0, "sum": 0.0, "worst": None, "rupees": 0.0})
+        for f in list(self.fills):
+            if f["slippage"] is None:
+                continue
+            s = per[f["symbol"]]
+            s["fills"] += 1
+            s["sum"] += f["slippage"]
+            s["rupees"] += f["slippage_rs"]
+            s["worst"] = f["slippage"] if s["worst"] is None else max(s["worst"], f["slippage"])
+        return [
+            {"Symbol": sym, "Fills": s["fills"], "Avg Slippage": round(s["sum"] / s["fills"], 4),
+             "Worst": round(s["worst"], 4), "Slippage ₹": round(s["rupees"], 2)}
+            for sym, s in per.items()
+        ]
+
+    def status(self):
+        return {**self.stats, "pending": len(self.pending),
+                "last_poll": self.last_poll.strftime("%H:%M:%S") if self.last_poll else "-"}
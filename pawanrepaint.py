@@ -0,0 +1,303 @@
+# ============================================================
+# PAWAN REPAINT ANALYTICS (INTRABAR PAINTED vs CLOSED CONFIRMED)
+# - Every tick: evaluate the signal on the forming bar
+# - Every close: evaluate (or take the live path's) closed signal
+# - Painted / confirmed / repaint % kept as incremental counters
+# Intrabar evaluation peeks at incremental indicator state in O(1)
+# instead of recomputing indicators over the full history.
+# ============================================================
+
+import math
+import threading
+from collections import deque
+from datetime import timedelta
+
+import pandas as pd
+
+from Pawangi import validate_signal
+
+# ============================================================
+# SIGNAL NORMALISATION (get_sig / SignalEngine.validate / validate_signal)
+# ============================================================
+def to_signal(result):
+    if result is None or isinstance(result, str):
+        return result
+    if isinstance(result, tuple):               # SignalEngine.validate → (signal, conds)
+        return result[0]
+    if isinstance(result, dict):                # validate_signal → {"BUY","SELL",...}
+        if result.get("BUY"):
+            return "BUY"
+        if result.get("SELL"):
+            return "SELL"
+    return None
+
+class _Rows:
+    # minimal stand-in for df.iloc[-2] / df.iloc[-1] lookups
+    def __init__(self, prev, last):
+        self.iloc = [prev, last]
+
+# ============================================================
+# INCREMENTAL INDICATORS (MATCHES Pawangi.calculate_indicators)
+# commit(bar) folds a closed bar in; peek(bar) evaluates a forming
+# bar against the committed state without mutating it.
+# ============================================================
+class IncrementalIndicators:
+    MIN_BARS = 50                   # calculate_indicators returns None below this
+
+    def __init__(self, rsi_period=14, bb_period=20, st_period=10, st_mult=3, kc_period=20):
+        self.rsi_a = 1 / rsi_period
+        self.rsi_period = rsi_period
+        self.bb_period = bb_period
+        self.st_a = 1 / st_period
+        self.st_mult = st_mult
+        self.kc_a = 1 / kc_period
+        self.n = 0
+        self.closes = deque(maxlen=bb_period)
+        self.state = None
+        self.last_row = None
+
+    def _step(self, s, bar):
+        o, h, l, c = bar["open"], bar["high"], bar["low"], bar["close"]
+        if s is None:
+            tr = h - l
+            ns = {
+                "prev_close": c, "deltas": 0, "avg_gain": math.nan, "avg_loss": math.nan,
+                "ema12": c, "ema26": c, "sig9": 0.0, "atr_st": tr, "atr_kc": tr,
+                "st": None, "dir": -1,
+            }
+        else:
+            pc = s["prev_close"]
+            d = c - pc
+            g, ls = max(d, 0.0), max(-d, 0.0)
+            tr = max(h - l, abs(h - pc), abs(l - pc))
+            first = s["deltas"] == 0
+            ns = {
+                "prev_close": c,
+                "deltas": s["deltas"] + 1,
+                "avg_gain": g if first else s["avg_gain"] + self.rsi_a * (g - s["avg_gain"]),
+                "avg_loss": ls if first else s["avg_loss"] + self.rsi_a * (ls - s["avg_loss"]),
+                "ema12": s["ema12"] + (2 / 13) * (c - s["ema12"]),
+                "ema26": s["ema26"] + (2 / 27) * (c - s["ema26"]),
+                "atr_st": s["atr_st"] + self.st_a * (tr - s["atr_st"]),
+                "atr_kc": s["atr_kc"] + self.kc_a * (tr - s["atr_kc"]),
+            }
+        macd = ns["ema12"] - ns["ema26"]
+        ns["sig9"] = macd if s is None else s["sig9"] + 0.2 * (macd - s["sig9"])
+
+        hl2 = (h + l) / 2
+        upper = hl2 + self.st_mult * ns["atr_st"]
+        lower = hl2 - self.st_mult * ns["atr_st"]
+        if s is None:
+            ns["st"], ns["dir"] = upper, -1
+        else:
+            d_ = 1 if c > s["st"] else (-1 if c < s["st"] else s["dir"])
+            ns["dir"] = d_
+            ns["st"] = max(lower, s["st"]) if d_ == 1 else min(upper, s["st"])
+        return ns, macd
+
+    def _row(self, ns, macd, bar, closes):
+        if ns["deltas"] >= self.rsi_period:
+            ag, al = ns["avg_gain"], ns["avg_loss"]
+            rsi = math.nan if ag == 0 and al == 0 else (100.0 if al == 0 else 100 - 100 / (1 + ag / al))
+        else:
+            rsi = math.nan
+        if len(closes) == self.bb_period:
+            mid = math.fsum(closes) / self.bb_period
+            std = math.sqrt(math.fsum((x - mid) ** 2 for x in closes) / (self.bb_period - 1))
+            squeeze = (mid - 2 * std > mid - 1.5 * ns["atr_kc"]) and (mid + 2 * std < mid + 1.5 * ns["atr_kc"])
+        else:
+            mid, squeeze = math.nan, False
+        return {
+            "close": bar["close"], "end": bar.get("end", bar.get("bucket")),
+            "rsi": rsi, "bb_mid": mid,
+            "macd": macd, "macd_signal": ns["sig9"], "macd_hist": macd - ns["sig9"],
+            "squeeze": squeeze, "supertrend": ns["st"], "st_dir": ns["dir"],
+        }
+
+    def commit(self, bar):
+        self.state, macd = self._step(self.state, bar)
+        self.closes.append(bar["close"])
+        self.n += 1
+        prev = self.last_row
+        self.last_row = self._row(self.state, macd, bar, self.closes)
+        return prev, self.last_row
+
+    def peek(self, bar):
+        ns, macd = self._step(self.state, bar)
+        window = list(self.closes)[1:] + [bar["close"]] if len(self.closes) == self.bb_period \
+            else list(self.closes) + [bar["close"]]
+        return self.last_row, self._row(ns, macd, bar, window)
+
+    def ready(self, extra=0):
+        return self.n + extra >= self.MIN_BARS
+
+# ============================================================
+# EVALUATORS
+# ============================================================
+class IncrementalValidateSignal:
+    """
+    Pawangi.validate_signal on incremental indicator rows: O(1) per tick.
+    """
+    def __init__(self):
+        self.ind = IncrementalIndicators()
+
+    def intrabar(self, bar):
+        if not self.ind.ready(extra=1) or self.ind.last_row is None:
+            return None
+        prev, last = self.ind.peek(bar)
+        return to_signal(validate_signal(_Rows(prev, last)))
+
+    def close(self, bar):
+        prev, last = self.ind.commit(bar)
+        if not self.ind.ready() or prev is None:
+            return None
+        return to_signal(validate_signal(_Rows(prev, last)))
+
+class TailEvaluator:
+    """
+    Any DataFrame signal function (get_sig, SignalEngine().validate, ...)
+    evaluated on a bounded tail of closed bars + the forming bar, so the
+    per-tick cost is fixed by `lookback`, not by session length.
+    """
+    def __init__(self, signal_fn, lookback=120):
+        self.signal_fn = signal_fn
+        self.bars = deque(maxlen=lookback)
+
+    def _eval(self, rows):
+        try:
+            return to_signal(self.signal_fn(pd.DataFrame(rows)))
+        except (IndexError, KeyError):
+            return None
+
+    def intrabar(self, bar):
+        return self._eval(list(self.bars) + [bar])
+
+    def close(self, bar):
+        self.bars.append(dict(bar))
+        return self._eval(list(self.bars))
+
+# ============================================================
+# REPAINT ENGINE (PER SYMBOL / TIMEFRAME COUNTERS)
+# ============================================================
+class _Track:
+    __slots__ = ("evaluator", "bar", "bucket", "painted_bar", "last_px",
+                 "painted", "confirmed", "late", "bars")
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.bar = None
+        self.bucket = None
+        self.painted_bar = set()        # signals seen intrabar on the forming bar
+        self.last_px = None
+        self.painted = 0                # bars with an intrabar signal
+        self.confirmed = 0              # ...that the closed bar kept
+        self.late = 0                   # closed signal never painted intrabar
+        self.bars = 0
+
+class RepaintEngine:
+    def __init__(self, evaluator_factory):
+        """
+        evaluator_factory() -> object with intrabar(bar) and close(bar),
+        e.g. IncrementalValidateSignal or lambda: TailEvaluator(get_sig).
+        """
+        self.evaluator_factory = evaluator_factory
+        self.tracks = {}                # (symbol, tf) -> _Track
+        self.dirty = set()
+        self._lock = threading.Lock()
+
+    def _track(self, symbol, tf):
+        key = (symbol, tf)
+        tr = self.tracks.get(key)
+        if tr is None:
+            tr = self.tracks[key] = _Track(self.evaluator_factory())
+        return tr
+
+    # ---------------- feed from an existing candle builder ----------------
+    def on_forming(self, symbol, tf, bar):
+        tr = self._track(symbol, tf)
+        if bar["close"] == tr.last_px and tr.bar is not None:
+            return None                 # same inputs → same answer, skip
+        tr.bar, tr.last_px = bar, bar["close"]
+        sig = tr.evaluator.intrabar(bar)
+        if sig:
+            tr.painted_bar.add(sig)
+        return sig
+
+    def on_close(self, symbol, tf, bar):
+        tr = self._track(symbol, tf)
+        confirmed = tr.evaluator.close(bar)
+        painted = tr.painted_bar
+        with self._lock:
+            tr.bars += 1
+            if painted:
+                tr.painted += 1
+                if confirmed in painted:
+                    tr.confirmed += 1
+            elif confirmed:
+                tr.late += 1
+            self.dirty.add((symbol, tf))
+        tr.painted_bar = set()
+        tr.bar = tr.last_px = None
+        return confirmed
+
+    # ---------------- or let the engine bucket raw ticks ----------------
+    def on_tick(self, symbol, tf_minutes, price, ts):
+        tr = self._track(symbol, tf_minutes)
+        bucket = ts.replace(second=0, microsecond=0) - timedelta(minutes=ts.minute % tf_minutes)
+        cur = tr.bar
+        confirmed = None
+        if cur is not None and tr.bucket != bucket:
+            confirmed = self.on_close(symbol, tf_minutes, cur)
+            cur = None
+        elif cur is None and tr.bucket == bucket:
+            return None                 # late tick for a bar close_due already closed
+        if cur is None:
+            cur = {"bucket": bucket, "end": bucket + timedelta(minutes=tf_minutes),
+                   "open": price, "high": price, "low": price, "close": price}
+        else:
+            cur = dict(cur, high=max(cur["high"], price), low=min(cur["low"], price), close=price)
+        tr.bucket = bucket
+        self.on_forming(symbol, tf_minutes, cur)
+        tr.bar = cur
+        return confirmed                # closed-bar signal when this tick rolled the bar
+
+    def close_due(self, boundary, tf_minutes, symbols=None):
+        """
+        Close on_tick bars of `tf_minutes` that ended at or before
+        `boundary` without a later tick (illiquid tokens). Run it on the
+        thread that feeds those symbols. Returns [(symbol, signal)].
+        """
+        out = []
+        for (symbol, tf), tr in list(self.tracks.items()):
+            if tf != tf_minutes or tr.bar is None or (symbols is not None and symbol not in symbols):
+                continue
+            end = tr.bar.get("end")
+            if end is not None and end <= boundary:
+                out.append((symbol, self.on_close(symbol, tf, tr.bar)))
+        return out
+
+    # ---------------- views ----------------
+    def row(self, symbol, tf):
+        tr = self.tracks[(symbol, tf)]
+        return {
+            "Symbol": symbol,
+            "Timeframe": f"{tf}m" if isinstance(tf, int) else tf,
+            "Bars": tr.bars,
+            "Painted": tr.painted,
+            "Confirmed": tr.confirmed,
+            "Late": tr.late,
+            "Repaint %": round(100.0 * (tr.painted - tr.confirmed) / tr.painted, 1) if tr.painted else 0.0,
+        }
+
+    def table(self):
+        return pd.DataFrame([self.row(s, tf) for (s, tf) in list(self.tracks)])
+
+    def publish(self, ui_store, table="repaint"):
+        """
+        Push only the (symbol, tf) rows whose counters moved since the
+        last publish into a pawanui.UIStore.
+        """
+        with self._lock:
+            keys, self.dirty = self.dirty, set()
+        for s, tf in keys:
+            ui_store.push_row(table, f"{s}|{tf}", self.row(s, tf))
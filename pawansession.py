@@ -0,0 +1,288 @@
+# ============================================================
+# PAWAN BROKER SESSION (LOGIN ONCE, CACHED TOKENS, AUTO-RENEW)
+# - One SmartConnect per (api_key, client) per process; restarts
+#   and Streamlit reruns reuse it instead of a TOTP login
+# - jwt / feed / refresh tokens cached in a 0600 file and reused
+#   across restarts until the jwt is about to expire
+# - Renewal goes through the refresh token (generateToken); a full
+#   TOTP login only happens when that fails
+# - HTTP calls share one pooled keep-alive session (pool=...)
+# - The raw jwt is cached; SmartConnect adds "Bearer " to REST calls,
+#   auth_token adds it for the websocket
+# - client(): a proxy that logs in again when the broker rejects the
+#   jwt (AG8001, e.g. logged in elsewhere) and retries the call once
+# ============================================================
+
+import base64
+import json
+import os
+import threading
+import time
+
+SESSION_DIR = ".session_cache"
+RENEW_BEFORE_S = 30 * 60            # renew this long before the jwt expires
+DEFAULT_TTL_S = 20 * 3600           # used when the jwt carries no exp claim
+HTTP_POOL = {"pool_connections": 4, "pool_maxsize": 16, "max_retries": 0}
+INVALID_TOKEN_CODES = ("AG8001", "AG8002", "AG8003")   # invalid / expired / missing jwt
+
+def raw_jwt(token):
+    """
+    generateSession returns the jwt as "Bearer <jwt>"; keep just <jwt>.
+    """
+    if token and token.startswith("Bearer "):
+        return token[len("Bearer "):]
+    return token
+
+def is_token_error(res):
+    """
+    A broker response (dict) or exception saying the jwt is no good.
+    """
+    if isinstance(res, dict):
+        return res.get("errorcode") in INVALID_TOKEN_CODES
+    if isinstance(res, Exception):
+        text = str(res)
+        return "Invalid Token" in text or any(c in text for c in INVALID_TOKEN_CODES)
+    return False
+
+def jwt_expiry(token):
+    """
+    `exp` claim of a (possibly "Bearer "-prefixed) jwt, or None.
+    """
+    try:
+        payload = token.split()[-1].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+class BrokerSession:
+    def __init__(self, api_key, client_id, pin, totp_secret, client_cls=None,
+                 cache_dir=SESSION_DIR, renew_before=RENEW_BEFORE_S, pool=HTTP_POOL):
+        """
+        client_cls: SmartConnect class (imported from SmartApi if None).
+        """
+        self.api_key = api_key
+        self.client_id = client_id
+        self.pin = pin
+        self.totp_secret = totp_secret
+        self.client_cls = client_cls
+        self.cache_path = os.path.join(cache_dir, f"{client_id}.json")
+        self.renew_before = renew_before
+        self.pool = pool
+
+        self.smart = None
+        self.tokens = {}                # jwt (no "Bearer "), refresh, feed, expires_at, login_at
+        self.generation = 0             # bumped whenever the jwt changes
+        self.stats = {"logins": 0, "renewals": 0, "cache_hits": 0, "errors": 0}
+        self._lock = threading.RLock()
+        self._renewer = None
+
+    # ---------------- cache ----------------
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("api_key") != self.api_key:
+            return None
+        return data
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", mode=0o700, exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        # created 0600, never world-readable even for an instant
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"api_key": self.api_key, **self.tokens}, f)
+        os.replace(tmp, self.cache_path)
+
+    def clear_cache(self):
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
+
+    # ---------------- client ----------------
+    def _client(self, **tokens):
+        cls = self.client_cls
+        if cls is None:
+            from SmartApi import SmartConnect as cls
+        return cls(api_key=self.api_key, pool=self.pool, **tokens)
+
+    def _set_tokens(self, jwt, refresh, feed):
+        self.generation += 1
+        self.tokens = {
+            "jwt": raw_jwt(jwt),
+            "refresh": refresh,
+            "feed": feed,
+            "expires_at": jwt_expiry(jwt) or time.time() + DEFAULT_TTL_S,
+            "login_at": self.tokens.get("login_at", time.time()),
+        }
+        self._save_cache()
+
+    def login(self):
+        import pyotp
+        t0 = time.perf_counter()
+        # same object on re-login: wrappers and workers holding it stay valid
+        smart = self.smart or self._client()
+        data = smart.generateSession(self.client_id, self.pin, pyotp.TOTP(self.totp_secret).now())
+        if not data or not data.get("status"):
+            self.stats["errors"] += 1
+            raise RuntimeError(f"Login failed: {data}")
+        d = data["data"]
+        self.smart = smart
+        self.tokens = {"login_at": time.time()}
+        self._set_tokens(d["jwtToken"], d["refreshToken"], d.get("feedToken") or smart.getfeedToken())
+        self.stats["logins"] += 1
+        print(f"✅ Logged in {self.client_id} ({time.perf_counter() - t0:.2f}s)")
+        return smart
+
+    def renew(self):
+        """
+        New jwt / feed token from the refresh token; TOTP login if refused.
+        """
+        with self._lock:
+            try:
+                res = self.smart.generateToken(self.tokens["refresh"])
+                d = res["data"] if res and res.get("status") else None
+            except Exception as e:
+                print("⚠️ Token renewal failed:", e)
+                d = None
+            if not d:
+                self.stats["errors"] += 1
+                return self.login()
+            self.smart.setAccessToken(raw_jwt(d["jwtToken"]))
+            if d.get("refreshToken"):
+                self.smart.setRefreshToken(d["refreshToken"])
+            if d.get("feedToken"):
+                self.smart.setFeedToken(d["feedToken"])
+            self._set_tokens(d["jwtToken"], d.get("refreshToken") or self.tokens["refresh"],
+                             d.get("feedToken") or self.tokens["feed"])
+            self.stats["renewals"] += 1
+            print(f"✅ Session renewed for {self.client_id}")
+            return self.smart
+
+    def connect(self):
+        """
+        Live SmartConnect: the one already open, the cached tokens, or
+        a fresh login — in that order.
+        """
+        with self._lock:
+            if self.smart is not None:
+                return self.ensure_fresh()
+            cached = self._load_cache()
+            if cached is None:
+                return self.login()
+            self.tokens = {k: cached.get(k) for k in ("jwt", "refresh", "feed", "expires_at", "login_at")}
+            self.tokens["jwt"] = raw_jwt(self.tokens["jwt"])   # caches written before the jwt was stored raw
+            self.smart = self._client(access_token=self.tokens["jwt"], refresh_token=cached["refresh"],
+                                      feed_token=cached["feed"], userId=self.client_id)
+            self.stats["cache_hits"] += 1
+            # jwt (nearly) expired: the refresh token usually still works
+            return self.ensure_fresh()
+
+    def ensure_fresh(self):
+        with self._lock:
+            if (self.tokens.get("expires_at") or 0) - time.time() <= self.renew_before:
+                return self.renew()
+            return self.smart
+
+    def invalidate(self, seen=None):
+        """
+        Broker rejected the jwt (e.g. logged out elsewhere): drop the
+        cache and log in again on the same client. seen: the generation
+        the failed call ran with; if the jwt changed since, another
+        caller already logged in and this one just retries.
+        """
+        with self._lock:
+            if seen is not None and seen != self.generation:
+                return self.smart
+            print(f"⚠️ Broker rejected the session for {self.client_id}; logging in again")
+            self.tokens = {}
+            self.clear_cache()
+            return self.login()
+
+    def client(self):
+        return SessionClient(self)
+
+    def start_renewer(self, check_every=60.0):
+        def run():
+            while True:
+                time.sleep(check_every)
+                try:
+                    self.ensure_fresh()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print("❌ Session renewer:", e)
+        if self._renewer is None:
+            self._renewer = threading.Thread(target=run, name="session-renew", daemon=True)
+            self._renewer.start()
+        return self._renewer
+
+    # ---------------- websocket credentials (always current) ----------------
+    @property
+    def auth_token(self):
+        jwt = self.tokens.get("jwt")
+        return f"Bearer {jwt}" if jwt else None
+
+    @property
+    def feed_token(self):
+        return self.tokens.get("feed")
+
+    def status(self):
+        left = (self.tokens.get("expires_at") or 0) - time.time()
+        return {**self.stats, "expires_in_min": round(left / 60, 1) if self.tokens else None}
+
+class SessionClient:
+    """
+    SmartConnect proxy: a call the broker answers with an invalid-token
+    error (returned or raised) triggers one re-login and one retry.
+    Attributes pass through.
+    """
+    def __init__(self, session):
+        self._session = session
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._session.smart, name)
+        if not callable(attr):
+            return attr
+        fn = self._wrapped.get(name)
+        if fn is None:
+            sess = self._session
+
+            def fn(*args, _name=name, **kw):
+                seen = sess.generation
+                try:
+                    res = getattr(sess.smart, _name)(*args, **kw)
+                except Exception as e:
+                    if not is_token_error(e):
+                        raise
+                else:
+                    if not is_token_error(res):
+                        return res
+                sess.stats["errors"] += 1
+                sess.invalidate(seen)
+                return getattr(sess.smart, _name)(*args, **kw)
+            self._wrapped[name] = fn
+        return fn
+
+# ============================================================
+# ONE SESSION PER (API KEY, CLIENT) PER PROCESS
+# ============================================================
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(api_key, client_id, pin, totp_secret, **kwargs):
+    """
+    Shared BrokerSession; module state survives Streamlit reruns, so
+    a rerun gets the already-connected client back.
+    """
+    key = (api_key, client_id)
+    with _sessions_lock:
+        sess = _sessions.get(key)
+        if sess is None:
+            sess = _sessions[key] = BrokerSession(api_key, client_id, pin, totp_secret, **kwargs)
+    sess.connect()
+    return sess
@@ -0,0 +1,126 @@
+# ============================================================
+# PAWAN SIGNAL EVENT STORE (BOUNDED, INDEXED, COLUMNAR)
+# - Per (symbol, timeframe) ring buffer of fixed capacity
+# - O(1) last-signal lookup → constant-time repaint check
+# - Global columnar tail for dashboard tables
+# Memory is fixed by capacities, not by session length.
+# ============================================================
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_CODES = {None: 0, "BUY": 1, "SELL": -1}
+SIGNAL_NAMES = {v: k for k, v in SIGNAL_CODES.items()}
+
+# ============================================================
+# FIXED-CAPACITY COLUMNAR RING
+# ============================================================
+class ColumnRing:
+    def __init__(self, capacity, columns):
+        """
+        columns: name -> numpy dtype (use object for free-form payloads)
+        """
+        self.capacity = capacity
+        self.cols = {k: np.empty(capacity, dtype=dt) for k, dt in columns.items()}
+        self.n = 0                      # total rows ever appended
+
+    def __len__(self):
+        return min(self.n, self.capacity)
+
+    def append(self, **row):
+        i = self.n % self.capacity
+        for k, arr in self.cols.items():
+            arr[i] = row.get(k)
+        self.n += 1
+
+    def tail(self, k=None):
+        size = len(self)
+        k = size if k is None else min(k, size)
+        if k == 0:
+            return {c: a[:0] for c, a in self.cols.items()}
+        end = self.n % self.capacity
+        idx = (np.arange(end - k, end)) % self.capacity
+        return {c: a[idx] for c, a in self.cols.items()}
+
+# ============================================================
+# SIGNAL EVENT STORE
+# ============================================================
+class SignalEventStore:
+    def __init__(self, per_key=500, tail_size=2000):
+        self.per_key = per_key
+        self.rings = {}                 # (symbol, tf) -> ColumnRing
+        self.last = {}                  # (symbol, tf) -> (signal, time)
+        self.counts = {}                # (symbol, tf) -> [events, repaints]
+        self.all = ColumnRing(tail_size, {
+            "time": "float64",
+            "symbol": object,
+            "tf": object,
+            "signal": "int8",
+            "repaint": bool,
+            "payload": object,
+        })
+        self._lock = threading.Lock()
+
+    def record(self, symbol, tf, signal, ts=None, payload=None):
+        """
+        Appends one event and returns True when it differs from the
+        previous signal for the same (symbol, tf) — a repaint.
+        """
+        ts = time.time() if ts is None else ts
+        code = SIGNAL_CODES.get(signal, 0)
+        key = (symbol, tf)
+        with self._lock:
+            prev = self.last.get(key)
+            repaint = prev is not None and prev[0] != code
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = ColumnRing(
+                    self.per_key, {"time": "float64", "signal": "int8", "repaint": bool})
+                self.counts[key] = [0, 0]
+            ring.append(time=ts, signal=code, repaint=repaint)
+            self.all.append(time=ts, symbol=symbol, tf=tf, signal=code,
+                            repaint=repaint, payload=payload)
+            self.last[key] = (code, ts)
+            c = self.counts[key]
+            c[0] += 1
+            c[1] += repaint
+        return repaint
+
+    def last_signal(self, symbol, tf):
+        prev = self.last.get((symbol, tf))
+        return None if prev is None else SIGNAL_NAMES[prev[0]]
+
+    def __len__(self):
+        return self.all.n
+
+    # ---------------- dashboard views ----------------
+    def tail(self, n=50, symbol=None, tf=None):
+        with self._lock:
+            if symbol is not None and tf is not None:
+                ring = self.rings.get((symbol, tf))
+                cols = ring.tail(n) if ring else {"time": [], "signal": [], "repaint": []}
+                cols = dict(cols, symbol=symbol, tf=tf)
+            else:
+                cols = self.all.tail(n)
+        df = pd.DataFrame(cols)
+        if len(df):
+            df["time"] = pd.to_datetime(df["time"], unit="s")
+            df["signal"] = df["signal"].map(SIGNAL_NAMES)
+        return df
+
+    def tail_records(self, n=5):
+        df = self.tail(n)
+        return df.to_dict("records")
+
+    def summary(self):
+        with self._lock:
+            rows = [
+                {"symbol": s, "tf": tf, "events": c[0], "repaints": c[1],
+                 "repaint_pct": round(100.0 * c[1] / c[0], 2) if c[0] else 0.0,
+                 "last": SIGNAL_NAMES[self.last[(s, tf)][0]]}
+                for (s, tf), c in self.counts.items()
+            ]
+        return pd.DataFrame(rows)
@@ -0,0 +1,325 @@
+# ============================================================
+# PAWAN SIMULATED BROKER (SMARTCONNECT SURFACE, LOCAL FILLS)
+# - placeOrder / placeOrderFullResponse / cancelOrder / orderBook /
+#   tradeBook / position / ltpData with AngelOne-shaped rows
+# - Configurable ack + exchange latency distributions, adverse
+#   slippage, partial fills, rejects and per-endpoint rate limits
+# - One matching thread drains a time-ordered heap, so placeOrder
+#   is a lock + heap push (thousands of orders / second)
+# Paper mode and load tests run the live order path unchanged.
+# ============================================================
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# ============================================================
+# LATENCY MODEL
+# ============================================================
+class Latency:
+    """
+    Seconds drawn from a distribution:
+    Latency("lognormal", median_ms=40, sigma=0.5), Latency("fixed", median_ms=5),
+    Latency("uniform", low_ms=5, high_ms=50).
+    """
+    def __init__(self, kind="lognormal", median_ms=0.0, sigma=0.5, low_ms=0.0, high_ms=0.0, rng=None):
+        self.kind = kind
+        self.median = median_ms / 1e3
+        self.sigma = sigma
+        self.low, self.high = low_ms / 1e3, high_ms / 1e3
+        self.rng = rng or random.Random()
+
+    def sample(self):
+        if self.kind == "fixed" or (self.kind == "lognormal" and self.median <= 0):
+            return self.median
+        if self.kind == "uniform":
+            return self.rng.uniform(self.low, self.high)
+        return self.median * self.rng.lognormvariate(0.0, self.sigma)
+
+# ============================================================
+# RATE LIMIT (TOKEN BUCKET PER ENDPOINT)
+# ============================================================
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.t = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+# AngelOne published limits (requests / second)
+ANGEL_RATE_LIMITS = {"placeOrder": 20, "cancelOrder": 20, "orderBook": 1, "tradeBook": 1, "position": 1}
+
+RATE_LIMITED = {"status": False, "message": "Access denied because of exceeding access rate",
+                "errorcode": "AB1004", "data": None}
+
+def _ok(data):
+    return {"status": True, "message": "SUCCESS", "errorcode": "", "data": data}
+
+# ============================================================
+# SIM BROKER
+# ============================================================
+class SimBroker:
+    def __init__(self, price_fn=None, ack_latency=None, fill_latency=None, slippage_bps=1.0,
+                 partial_prob=0.0, max_partials=3, reject_prob=0.0, rate_limits=None,
+                 seed=None, history=200000):
+        """
+        price_fn(token) -> LTP (e.g. the feed's last price); set_ltp() also works.
+        ack_latency: blocks the caller like the REST round-trip (None = instant).
+        fill_latency: order accepted → exchange fill.
+        rate_limits: endpoint -> requests/s (ANGEL_RATE_LIMITS), None = unlimited.
+        """
+        self.rng = random.Random(seed)
+        self.price_fn = price_fn
+        self.ltp = {}
+        self.ack_latency = ack_latency
+        self.fill_latency = fill_latency or Latency("lognormal", median_ms=30, sigma=0.6, rng=self.rng)
+        self.slippage_bps = slippage_bps
+        self.partial_prob = partial_prob
+        self.max_partials = max_partials
+        self.reject_prob = reject_prob
+        self.buckets = {k: TokenBucket(v) for k, v in (rate_limits or {}).items()}
+
+        self.orders = {}                # orderid -> order row
+        self.trades = deque(maxlen=history)
+        self.net = {}                   # token -> position accumulator
+        self.stats = {"orders": 0, "fills": 0, "partials": 0, "rejects": 0, "cancels": 0,
+                      "rate_limited": 0}
+        self._ids = itertools.count(1)
+        self._fills = itertools.count(1)
+        self._heap = []                 # (due, seq, orderid, qty)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self.running = True
+        self._thread = threading.Thread(target=self._match_loop, name="sim-broker", daemon=True)
+        self._thread.start()
+
+    # ---------------- market data ----------------
+    def set_ltp(self, token, price):
+        self.ltp[str(token)] = price
+
+    def _price(self, token):
+        px = self.price_fn(token) if self.price_fn else None
+        return self.ltp.get(token) if px is None else px
+
+    def ltpData(self, exchange, tradingsymbol, symboltoken):
+        return _ok({"exchange": exchange, "tradingsymbol": tradingsymbol,
+                    "symboltoken": symboltoken, "ltp": self._price(str(symboltoken))})
+
+    # ---------------- helpers ----------------
+    def _limited(self, endpoint):
+        b = self.buckets.get(endpoint)
+        if b is None:
+            return False
+        with self._lock:
+            ok = b.take()
+            if not ok:
+                self.stats["rate_limited"] += 1
+        return not ok
+
+    def _ack(self):
+        if self.ack_latency is not None:
+            d = self.ack_latency.sample()
+            if d > 0:
+                time.sleep(d)
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime("%d-%b-%Y %H:%M:%S")
+
+    # ---------------- orders ----------------
+    def placeOrderFullResponse(self, params):
+        if self._limited("placeOrder"):
+            return RATE_LIMITED
+        self._ack()
+        oid = f"SIM{next(self._ids):012d}"
+        qty = int(params.get("quantity") or 0)
+        token = str(params.get("symboltoken"))
+        row = {
+            "variety": params.get("variety", "NORMAL"),
+            "ordertype": params.get("ordertype", "MARKET"),
+            "producttype": params.get("producttype", "INTRADAY"),
+            "duration": params.get("duration", "DAY"),
+            "price": float(params.get("price") or 0),
+            "quantity": str(qty),
+            "tradingsymbol": params.get("tradingsymbol"),
+            "symboltoken": token,
+            "transactiontype": params.get("transactiontype"),
+            "exchange": params.get("exchange", "NFO"),
+            "averageprice": 0.0,
+            "filledshares": "0",
+            "unfilledshares": str(qty),
+            "orderid": oid,
+            "status": "open",
+            "orderstatus": "open",
+            "text": "",
+            "updatetime": self._now(),
+            "exchtime": "",
+        }
+        reject = None
+        if qty <= 0:
+            reject = "Invalid quantity"
+        elif self.reject_prob and self.rng.random() < self.reject_prob:
+            reject = "RMS:Margin Exceeds"
+        with self._lock:
+            self.stats["orders"] += 1
+            self.orders[oid] = row
+            if reject:
+                row["status"] = row["orderstatus"] = "rejected"
+                row["text"] = reject
+                self.stats["rejects"] += 1
+            else:
+                self._schedule(oid, qty)
+        return _ok({"script": row["tradingsymbol"], "orderid": oid, "uniqueorderid": oid})
+
+    def placeOrder(self, params):
+        res = self.placeOrderFullResponse(params)
+        return res["data"]["orderid"] if res.get("status") else None
+
+    def cancelOrder(self, order_id, variety="NORMAL"):
+        if self._limited("cancelOrder"):
+            return RATE_LIMITED
+        self._ack()
+        with self._lock:
+            o = self.orders.get(order_id)
+            if o is None or o["status"] not in ("open", "open pending"):
+                return {"status": False, "message": "Order not open", "errorcode": "AB2001", "data": None}
+            o["status"] = o["orderstatus"] = "cancelled"
+            o["updatetime"] = self._now()
+            self.stats["cancels"] += 1
+        return _ok({"orderid": order_id, "uniqueorderid": order_id})
+
+    def _schedule(self, oid, qty):
+        # caller holds the lock
+        due = time.monotonic() + self.fill_latency.sample()
+        if self.partial_prob and qty > 1 and self.rng.random() < self.partial_prob:
+            n = self.rng.randint(2, min(self.max_partials, qty))
+            cuts = sorted(self.rng.sample(range(1, qty), n - 1))
+            parts = [b - a for a, b in zip([0] + cuts, cuts + [qty])]
+            self.stats["partials"] += 1
+        else:
+            parts = [qty]
+        for p in parts:
+            heapq.heappush(self._heap, (due, next(self._seq), oid, p))
+            due += self.fill_latency.sample()
+        self._wake.notify()
+
+    # ---------------- matching thread ----------------
+    def _match_loop(self):
+        with self._lock:
+            while self.running:
+                if not self._heap:
+                    self._wake.wait(0.5)
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._wake.wait(wait)
+                    continue
+                _, _, oid, qty = heapq.heappop(self._heap)
+                o = self.orders[oid]
+                if o["status"] != "open":
+                    continue
+                px = self._price(o["symboltoken"])
+                if px is None:
+                    o["status"] = o["orderstatus"] = "rejected"
+                    o["text"] = "No LTP for symbol"
+                    self.stats["rejects"] += 1
+                    continue
+                if o["ordertype"] == "LIMIT":
+                    limit = o["price"]
+                    marketable = px <= limit if o["transactiontype"] == "BUY" else px >= limit
+                    if not marketable:
+                        heapq.heappush(self._heap, (time.monotonic() + 0.05, next(self._seq), oid, qty))
+                        continue
+                    fill_px = limit
+                else:
+                    sign = 1 if o["transactiontype"] == "BUY" else -1
+                    fill_px = px * (1 + sign * abs(self.rng.gauss(0, self.slippage_bps)) / 1e4)
+                self._fill(o, round(fill_px, 2), qty)
+
+    def _fill(self, o, px, qty):
+        filled = int(o["filledshares"])
+        new = filled + qty
+        o["averageprice"] = round((o["averageprice"] * filled + px * qty) / new, 4)
+        o["filledshares"] = str(new)
+        o["unfilledshares"] = str(int(o["quantity"]) - new)
+        now = self._now()
+        o["exchtime"] = o["updatetime"] = now
+        if new >= int(o["quantity"]):
+            o["status"] = o["orderstatus"] = "complete"
+        self.stats["fills"] += 1
+        self.trades.append({
+            "exchange": o["exchange"], "producttype": o["producttype"],
+            "tradingsymbol": o["tradingsymbol"], "symboltoken": o["symboltoken"],
+            "transactiontype": o["transactiontype"], "fillprice": px, "fillsize": str(qty),
+            "tradevalue": round(px * qty, 2), "orderid": o["orderid"],
+            "fillid": str(next(self._fills)), "filltime": now.split(" ")[-1],
+        })
+        p = self.net.setdefault(o["symboltoken"], {
+            "tradingsymbol": o["tradingsymbol"], "symboltoken": o["symboltoken"],
+            "exchange": o["exchange"], "producttype": o["producttype"],
+            "buyqty": 0, "sellqty": 0, "buyamount": 0.0, "sellamount": 0.0})
+        side = "buy" if o["transactiontype"] == "BUY" else "sell"
+        p[side + "qty"] += qty
+        p[side + "amount"] += px * qty
+
+    # ---------------- books ----------------
+    def orderBook(self):
+        if self._limited("orderBook"):
+            return RATE_LIMITED
+        self._ack()
+        with self._lock:
+            return _ok([dict(o) for o in self.orders.values()])
+
+    def tradeBook(self):
+        if self._limited("tradeBook"):
+            return RATE_LIMITED
+        self._ack()
+        with self._lock:
+            return _ok(list(self.trades))
+
+    def position(self):
+        if self._limited("position"):
+            return RATE_LIMITED
+        self._ack()
+        rows = []
+        with self._lock:
+            for token, p in self.net.items():
+                net = p["buyqty"] - p["sellqty"]
+                ltp = self._price(token) or 0.0
+                buy_avg = p["buyamount"] / p["buyqty"] if p["buyqty"] else 0.0
+                sell_avg = p["sellamount"] / p["sellqty"] if p["sellqty"] else 0.0
+                avg = buy_avg if net > 0 else sell_avg if net < 0 else 0.0
+                rows.append({
+                    "tradingsymbol": p["tradingsymbol"], "symboltoken": token,
+                    "exchange": p["exchange"], "producttype": p["producttype"],
+                    "buyqty": str(p["buyqty"]), "sellqty": str(p["sellqty"]),
+                    "netqty": str(net), "buyavgprice": round(buy_avg, 4),
+                    "sellavgprice": round(sell_avg, 4), "avgnetprice": round(avg, 4),
+                    "ltp": ltp,
+                    "pnl": round(p["sellamount"] - p["buyamount"] + net * ltp, 2),
+                })
+        return _ok(rows)
+
+    # ---------------- lifecycle ----------------
+    def pending(self):
+        with self._lock:
+            return len(self._heap)
+
+    def stop(self):
+        with self._lock:
+            self.running = False
+            self._wake.notify()
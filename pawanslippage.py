@@ -0,0 +1,173 @@
+# ============================================================
+# PAWAN SLIPPAGE & FILL-QUALITY ANALYTICS
+# - One columnar row per broker fill:
+#   signal LTP / signal time → batch → order sent → ack → broker fill
+# - Slippage (price, bps, ₹) and latency (batch wait, decision,
+#   ack, fill)
+#   derived vectorised at query time
+# - Distributions per symbol and per time-of-day bucket
+# Feed it from pawanrecon.BrokerReconciler.listeners.
+# ============================================================
+
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pawansignals import ColumnRing
+
+_FILL_TIME_FORMATS = ("%d-%b-%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%H:%M:%S")
+
+def fill_epoch(fill_time, ref_ts):
+    """
+    Broker fill / exchange time → epoch seconds. Trade book rows only
+    carry HH:MM:SS, which is taken on the day of `ref_ts`.
+    """
+    if fill_time is None:
+        return np.nan
+    if isinstance(fill_time, (int, float)):
+        return float(fill_time)
+    for fmt in _FILL_TIME_FORMATS:
+        try:
+            t = datetime.strptime(str(fill_time), fmt)
+        except ValueError:
+            continue
+        if fmt == "%H:%M:%S":
+            t = datetime.combine(datetime.fromtimestamp(ref_ts).date(), t.time())
+        return t.timestamp()
+    return np.nan
+
+def _q(p):
+    f = lambda s: s.quantile(p)
+    f.__name__ = f"p{int(p * 100)}"
+    return f
+
+# ============================================================
+# FILL QUALITY STORE
+# ============================================================
+class FillQualityStore:
+    def __init__(self, capacity=20000, bucket_minutes=15):
+        self.bucket_minutes = bucket_minutes
+        self.ring = ColumnRing(capacity, {
+            "signal_ts": "float64",     # tick that produced the signal
+            "batch_ts": "float64",      # bar batch that decided it (NaN = unbatched)
+            "sent_ts": "float64",       # placeOrder called
+            "ack_ts": "float64",        # placeOrder returned
+            "fill_ts": "float64",       # broker fill time
+            "symbol": object,
+            "side": "int8",             # +1 BUY / -1 SELL
+            "qty": "int64",
+            "ref_price": "float64",     # LTP at signal time
+            "fill_price": "float64",
+        })
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ring)
+
+    # ---------------- ingest ----------------
+    def on_fill(self, rec):
+        """
+        BrokerReconciler listener: rec is the reconciler's fill record.
+        """
+        sent = rec["sent_ts"]
+        signal = rec.get("signal_ts")
+        batch = rec.get("batch_ts")
+        ref = rec.get("ref_price")
+        with self._lock:
+            self.ring.append(
+                signal_ts=np.nan if signal is None else signal,
+                batch_ts=np.nan if batch is None else batch,
+                sent_ts=sent,
+                ack_ts=rec.get("ack_ts", sent),
+                fill_ts=fill_epoch(rec.get("fill_time"), sent),
+                symbol=rec["symbol"],
+                side=1 if rec["side"] == "BUY" else -1,
+                qty=rec["qty"],
+                ref_price=np.nan if ref is None else ref,
+                fill_price=rec["fill_price"],
+            )
+
+    # ---------------- columnar view ----------------
+    def frame(self):
+        with self._lock:
+            c = self.ring.tail()
+        slip = (c["fill_price"] - c["ref_price"]) * c["side"]
+        # decision latency starts when the batch decided, not at the tick:
+        # the wait for the bar boundary is reported on its own
+        decided = np.where(np.isnan(c["batch_ts"]), c["signal_ts"], c["batch_ts"])
+        df = pd.DataFrame({
+            "symbol": c["symbol"],
+            "side": np.where(c["side"] > 0, "BUY", "SELL"),
+            "qty": c["qty"],
+            "ref_price": c["ref_price"],
+            "fill_price": c["fill_price"],
+            "slippage": slip,                                   # +ve = paid more than signal LTP
+            "slippage_bps": slip / c["ref_price"] * 1e4,
+            "slippage_rs": slip * c["qty"],
+            "batch_wait_ms": (c["batch_ts"] - c["signal_ts"]) * 1e3,    # signal tick → bar batch
+            "decision_ms": (c["sent_ts"] - decided) * 1e3,          # batch → placeOrder
+            "ack_ms": (c["ack_ts"] - c["sent_ts"]) * 1e3,
+            "fill_ms": (c["fill_ts"] - c["sent_ts"]) * 1e3,
+            "signal_time": pd.to_datetime(c["signal_ts"], unit="s"),
+            "sent_time": pd.to_datetime(c["sent_ts"], unit="s"),
+        })
+        local = pd.to_datetime(c["sent_ts"], unit="s").tz_localize("UTC").tz_convert(
+            datetime.now().astimezone().tzinfo)
+        mins = (local.hour * 60 + local.minute) // self.bucket_minutes * self.bucket_minutes
+        df["time_bucket"] = [f"{m // 60:02d}:{m % 60:02d}" for m in mins]
+        return df
+
+    # ---------------- distributions ----------------
+    def distribution(self, by="symbol"):
+        """
+        by: "symbol" | "time_bucket" | any frame() column.
+        """
+        df = self.frame()
+        if df.empty:
+            return df
+        out = df.groupby(by).agg(
+            fills=("slippage", "size"),
+            slip_mean=("slippage", "mean"),
+            slip_bps_p50=("slippage_bps", _q(0.5)),
+            slip_bps_p90=("slippage_bps", _q(0.9)),
+            slip_rs=("slippage_rs", "sum"),
+            batch_wait_ms_p50=("batch_wait_ms", _q(0.5)),
+            decision_ms_p50=("decision_ms", _q(0.5)),
+            decision_ms_p90=("decision_ms", _q(0.9)),
+            ack_ms_p50=("ack_ms", _q(0.5)),
+            fill_ms_p50=("fill_ms", _q(0.5)),
+            fill_ms_p90=("fill_ms", _q(0.9)),
+        )
+        return out.round(2).reset_index()
+
+    def cost_by_latency(self, edges_ms=(0, 50, 100, 250, 500, 1000, 2500, np.inf)):
+        """
+        ₹ slippage grouped by decision latency (batch → placeOrder, or
+        signal tick → placeOrder when unbatched): what the order path
+        costs, without the wait for the bar boundary.
+        """
+        df = self.frame()
+        if df.empty:
+            return df
+        df["decision_band"] = pd.cut(df["decision_ms"], list(edges_ms), right=False)
+        out = df.groupby("decision_band", observed=True).agg(
+            fills=("slippage_rs", "size"),
+            slip_bps_mean=("slippage_bps", "mean"),
+            slip_rs=("slippage_rs", "sum"),
+            slip_rs_per_fill=("slippage_rs", "mean"),
+        )
+        return out.round(2).reset_index().astype({"decision_band": str})
+
+    def totals(self):
+        df = self.frame()
+        if df.empty:
+            return {"fills": 0}
+        return {
+            "fills": len(df),
+            "slippage_rs": round(float(np.nansum(df["slippage_rs"])), 2),
+            "slippage_bps_mean": round(float(np.nanmean(df["slippage_bps"])), 2),
+            "decision_ms_p50": round(float(np.nanmedian(df["decision_ms"])), 1),
+            "fill_ms_p50": round(float(np.nanmedian(df["fill_ms"])), 1),
+        }
@@ -0,0 +1,186 @@
+# ============================================================
+# PAWAN STARTUP (LAZY IMPORTS + COLD-START PROFILE)
+# - lazy_module("plotly.graph_objects") defers the import to the
+#   first attribute access and records what it cost
+# - prewarm() loads deferred modules on a background thread once
+#   the engine is live, so the first snapshot doesn't stall orders
+# - StartupProfile: phase marks against a cold-start budget
+# - import_times(): `python -X importtime` tree for any modules
+# Stdlib only: import this first, before anything heavy.
+# ============================================================
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ENGINE_START_BUDGET_S = 4.0         # process start → feed subscribed (cached scrip master)
+
+LAZY_LOADS = []                     # (module, seconds, perf_counter at load)
+_lazy_lock = threading.Lock()
+
+# ============================================================
+# LAZY MODULES
+# ============================================================
+class LazyModule:
+    """
+    Module proxy: the real import happens on first attribute access.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._mod = None
+
+    def _load(self):
+        mod = self._mod
+        if mod is None:
+            with _lazy_lock:
+                if self._mod is None:
+                    t0 = time.perf_counter()
+                    self._mod = importlib.import_module(self._name)
+                    LAZY_LOADS.append((self._name, time.perf_counter() - t0, t0))
+                mod = self._mod
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._mod is not None else "deferred"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_module(name):
+    mod = sys.modules.get(name)
+    return mod if mod is not None else LazyModule(name)
+
+def prewarm(*names, delay=0.0):
+    """
+    Import `names` on a daemon thread (after `delay` seconds). Errors
+    are printed, never raised: a missing optional dependency only
+    matters when the feature is used.
+    """
+    def run():
+        if delay:
+            time.sleep(delay)
+        for n in names:
+            t0 = time.perf_counter()
+            try:
+                importlib.import_module(n)
+            except Exception as e:
+                print(f"⚠️ Prewarm {n} failed:", e)
+                continue
+            LAZY_LOADS.append((n, time.perf_counter() - t0, t0))
+    t = threading.Thread(target=run, name="prewarm", daemon=True)
+    t.start()
+    return t
+
+# ============================================================
+# COLD-START PROFILE
+# ============================================================
+class StartupProfile:
+    def __init__(self, budget_s=ENGINE_START_BUDGET_S, t0=None):
+        """
+        mark(name) closes the phase that ran since the previous mark.
+        """
+        self.budget_s = budget_s
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.last = self.t0
+        self.modules0 = len(sys.modules)
+        self.phases = []            # (name, start_s, seconds)
+        self.ready_s = None
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, self.last - self.t0, now - self.last))
+        self.last = now
+        return now - self.t0
+
+    def ready(self, name="ready"):
+        """
+        Closes the last phase and checks the budget.
+        """
+        self.mark(name)
+        self.ready_s = self.last - self.t0
+        ok = self.budget_s is None or self.ready_s <= self.budget_s
+        print(f"{'✅' if ok else '⚠️'} Engine ready in {self.ready_s:.2f}s "
+              f"(budget {self.budget_s}s, {len(sys.modules) - self.modules0} modules imported)")
+        return ok
+
+    def rows(self):
+        out = [{"kind": "phase", "name": n, "start_s": round(s, 3), "seconds": round(d, 3)}
+               for n, s, d in self.phases]
+        out += [{"kind": "lazy", "name": n, "start_s": round(t - self.t0, 3), "seconds": round(d, 3)}
+                for n, d, t in list(LAZY_LOADS) if t >= self.t0]
+        return out
+
+    def summary(self):
+        return {
+            "ready_s": round(self.ready_s, 3) if self.ready_s is not None else None,
+            "budget_s": self.budget_s,
+            "over_budget": self.ready_s is not None and self.budget_s is not None
+                           and self.ready_s > self.budget_s,
+            "slowest_phase": max(self.phases, key=lambda p: p[2])[0] if self.phases else None,
+            "lazy_loaded": [n for n, _, t in list(LAZY_LOADS) if t >= self.t0],
+        }
+
+# ============================================================
+# IMPORT-TIME TREE (python -X importtime, FRESH INTERPRETER)
+# ============================================================
+def _importtime(code):
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                         text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                     "self_ms": int(self_us) / 1e3, "cumulative_ms": int(cum_us) / 1e3})
+    return res, rows
+
+def import_times(modules):
+    """
+    Cold import cost of `modules` in a clean subprocess (interpreter
+    boot modules excluded). Rows sorted by cumulative ms: module,
+    depth, self_ms, cumulative_ms; depth 0 = imported directly.
+    """
+    _, boot = _importtime("pass")
+    boot = {r["module"] for r in boot}
+    res, rows = _importtime("import " + ", ".join(modules))
+    if res.returncode != 0:
+        err = res.stderr.strip().splitlines()
+        print(f"❌ import {', '.join(modules)} failed:", err[-1] if err else res.returncode)
+        return []
+    rows = [r for r in rows if r["module"] not in boot]
+    rows.sort(key=lambda r: -r["cumulative_ms"])
+    return rows
+
+# ============================================================
+# CLI: python pawanstartup.py plotly.graph_objects SmartApi pandas
+# ============================================================
+HEAVY_MODULES = ("pandas", "numpy", "plotly.graph_objects", "kaleido", "ta", "requests",
+                 "SmartApi", "SmartApi.smartWebSocketV2", "streamlit", "pyotp")
+ENGINE_MODULES = ("pawanfeed", "pawanchain", "pawanchart", "pawanstore", "pawanrecon",
+                  "pawanslippage", "pawansignals", "pawanrepaint", "pawanstrategy")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Cold import cost per module (python -X importtime)")
+    ap.add_argument("modules", nargs="*", help="default: engine modules, then heavy dependencies")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    groups = [("requested", args.modules)] if args.modules else \
+        [("engine", ENGINE_MODULES)] + [(m, (m,)) for m in HEAVY_MODULES]
+    for label, mods in groups:
+        rows = import_times(mods)
+        if not rows:
+            continue
+        direct = sum(r["cumulative_ms"] for r in rows if r["depth"] == 0)
+        print(f"\n⏱️ {label}: {direct:.1f} ms")
+        for r in rows[:args.top]:
+            print(f"  {r['cumulative_ms']:9.1f} ms  {r['self_ms']:8.1f} ms  {'  ' * r['depth']}{r['module']}")
@@ -0,0 +1,234 @@
+# ============================================================
+# PAWAN PERSISTENT STATE STORE (SQLITE WAL + GROUP COMMIT)
+# - Hot path only enqueues (put / delete / append)
+# - Background writer batches everything queued within a short
+#   window into one transaction (group commit)
+# - Startup recovery reconciles against the broker position book
+# ============================================================
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+DB_PATH = "pawan_state.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_day_kind ON events (day, kind);
+"""
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if hasattr(o, "item"):              # numpy scalars
+        return o.item()
+    return str(o)
+
+def dumps(v):
+    return json.dumps(v, default=_default, separators=(",", ":"))
+
+_FLUSH = object()
+_STOP = object()
+
+# ============================================================
+# STATE STORE
+# ============================================================
+class StateStore:
+    def __init__(self, path=DB_PATH, group_window=0.005, max_batch=500):
+        self.path = path
+        self.group_window = group_window
+        self.max_batch = max_batch
+        self.q = queue.SimpleQueue()
+        self.commits = 0
+        self.writes = 0
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._thread = threading.Thread(target=self._writer, name="state-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---------------- hot path (enqueue only) ----------------
+    def put(self, ns, key, value):
+        self.q.put(("put", ns, str(key), value, time.time()))
+
+    def delete(self, ns, key):
+        self.q.put(("del", ns, str(key), None, time.time()))
+
+    def append(self, kind, payload):
+        self.q.put(("evt", kind, None, payload, time.time()))
+
+    def flush(self, timeout=5.0):
+        done = threading.Event()
+        self.q.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self.q.put((_STOP,))
+        self._thread.join(timeout=5.0)
+
+    # ---------------- writer thread ----------------
+    def _apply(self, cur, op):
+        kind, a, key, value, ts = op
+        if kind == "put":
+            cur.execute(
+                "INSERT INTO kv (ns, key, value, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(ns, key) DO UPDATE SET value=excluded.value, updated=excluded.updated",
+                (a, key, dumps(value), ts))
+        elif kind == "del":
+            cur.execute("DELETE FROM kv WHERE ns=? AND key=?", (a, key))
+        else:
+            day = datetime.fromtimestamp(ts).date().isoformat()
+            cur.execute("INSERT INTO events (ts, day, kind, payload) VALUES (?, ?, ?, ?)",
+                        (ts, day, a, dumps(value)))
+
+    def _writer(self):
+        conn = self._connect()
+        q = self.q
+        while True:
+            batch, waiters, stop = [q.get()], [], False
+            deadline = time.monotonic() + self.group_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            ops = []
+            for op in batch:
+                if op[0] is _FLUSH:
+                    waiters.append(op[1])
+                elif op[0] is _STOP:
+                    stop = True
+                else:
+                    ops.append(op)
+            if ops:
+                try:
+                    with conn:
+                        cur = conn.cursor()
+                        for op in ops:
+                            self._apply(cur, op)
+                    self.commits += 1
+                    self.writes += len(ops)
+                except sqlite3.Error as e:
+                    print("❌ State store write failed:", e)
+            for w in waiters:
+                w.set()
+            if stop:
+                conn.close()
+                return
+
+    # ---------------- reads (startup / dashboard) ----------------
+    def load(self, ns):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT key, value FROM kv WHERE ns=?", (ns,)).fetchall()
+        finally:
+            conn.close()
+        return {k: json.loads(v) for k, v in rows}
+
+    def events(self, kind, day=None):
+        day = (day or date.today()).isoformat()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT payload FROM events WHERE day=? AND kind=? ORDER BY id", (day, kind)).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(p) for (p,) in rows]
+
+# ============================================================
+# STARTUP RECOVERY (LOCAL STATE vs BROKER POSITION BOOK)
+# ============================================================
+def broker_net_positions(smart, exchange=None, product=None):
+    """
+    token -> {"symbol", "netqty", "price"} for every non-flat broker
+    position in `exchange` / `product` (None = any). Positions this
+    engine can't have opened (another segment, delivery holdings,
+    manual trades in other products) are left alone.
+    None when the position book could not be read: a failed call is
+    not a flat book.
+    """
+    try:
+        res = smart.position()
+    except Exception as e:
+        print("⚠️ Broker position book failed:", repr(e))
+        return None
+    if not res or not res.get("status"):
+        print("⚠️ Broker position book failed:", (res or {}).get("message"))
+        return None
+    out = {}
+    for p in (res or {}).get("data") or []:
+        qty = int(float(p.get("netqty") or 0))
+        if qty == 0:
+            continue
+        if exchange is not None and p.get("exchange") != exchange:
+            continue
+        if product is not None and p.get("producttype") != product:
+            continue
+        px = p.get("avgnetprice") or p.get("netprice") or p.get("buyavgprice") or 0
+        out[str(p["symboltoken"])] = {
+            "symbol": p.get("tradingsymbol"),
+            "netqty": qty,
+            "price": float(px),
+        }
+    return out
+
+def reconcile_positions(local, broker):
+    """
+    local: token -> {"Symbol", "Signal", "Entry", "Qty"} (pawansystem layout).
+    Broker wins on quantity; positions closed while we were down are
+    dropped; broker positions we never recorded are adopted.
+    Returns (positions, report).
+    """
+    merged, report = {}, {"kept": [], "dropped": [], "adopted": [], "qty_fixed": []}
+    for token, p in local.items():
+        b = broker.get(token)
+        if b is None:
+            report["dropped"].append(token)
+            continue
+        side = "BUY" if b["netqty"] > 0 else "SELL"
+        q = abs(b["netqty"])
+        if int(p["Qty"]) != q or p["Signal"] != side:
+            report["qty_fixed"].append(token)
+            p = dict(p, Qty=str(q), Signal=side)
+        else:
+            report["kept"].append(token)
+        merged[token] = p
+    for token, b in broker.items():
+        if token not in merged:
+            merged[token] = {
+                "Symbol": b["symbol"],
+                "Signal": "BUY" if b["netqty"] > 0 else "SELL",
+                "Entry": b["price"],
+                "Qty": str(abs(b["netqty"])),
+            }
+            report["adopted"].append(token)
+    return merged, report
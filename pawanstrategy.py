@@ -0,0 +1,409 @@
+# ============================================================
+# PAWAN STRATEGY PLUG-INS (DECLARED RULES → COMPILED EVALUATOR)
+# - A strategy is named column expressions + named conditions,
+#   written over indicator columns:
+#       "mid":              "sma(close, 20)"
+#       "BUY_Price_RSI70":  "prev(rsi) < 70 and rsi > 70"
+# - Expressions are checked and compiled ONCE into a single Python
+#   function of NumPy array ops (and/or/not → & | ~), so one call
+#   evaluates every condition for every bar — and, with stacked
+#   frames, for every token at once
+# - explain(df) reproduces SignalEngine.validate's (signal, conds)
+# - decide(df) short-circuits: cheap / selective conditions first,
+#   indicator columns computed only when a condition needs them
+# ============================================================
+
+import ast
+
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# FUNCTIONS AVAILABLE INSIDE EXPRESSIONS
+# Time runs along axis 0; any trailing axis is tokens.
+# Rolling / EWM maths goes through pandas so values are bit-for-bit
+# the ones the dashboards' own indicator functions produce.
+# ============================================================
+def _pd(x):
+    x = np.asarray(x, dtype=float)
+    return pd.Series(x) if x.ndim == 1 else pd.DataFrame(x)
+
+def prev(x, k=1):
+    x = np.asarray(x, dtype=float)
+    out = np.empty_like(x)
+    out[:k] = np.nan
+    out[k:] = x[:-k]
+    return out
+
+def sma(x, n):
+    return _pd(x).rolling(n).mean().to_numpy()
+
+def std(x, n):
+    return _pd(x).rolling(n).std().to_numpy()
+
+def ema(x, span):
+    return _pd(x).ewm(span=span, adjust=False).mean().to_numpy()
+
+def highest(x, n):
+    return _pd(x).rolling(n).max().to_numpy()
+
+def lowest(x, n):
+    return _pd(x).rolling(n).min().to_numpy()
+
+def rsi_sma(close, n=14):
+    # rolling-mean RSI (Pawansmart / Pawanbetter rsi)
+    delta = _pd(close).diff()
+    avg_gain = delta.clip(lower=0).rolling(n).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(n).mean()
+    return (100 - (100 / (1 + avg_gain / avg_loss))).to_numpy()
+
+def rsi_wilder(close, n=14):
+    # Wilder RSI (Pawangi.rsi_wilder)
+    delta = _pd(close).diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / n, min_periods=n, adjust=False).mean()
+    return (100 - (100 / (1 + avg_gain / avg_loss))).to_numpy()
+
+ELEMENTWISE = {"abs", "maximum", "minimum"}
+
+def _indicator_calls(expr):
+    return sum(isinstance(n, ast.Call) and n.func.id not in ELEMENTWISE | {"prev"}
+               for n in ast.walk(ast.parse(expr, mode="eval")))
+
+FUNCS = {
+    "prev": prev, "sma": sma, "std": std, "ema": ema,
+    "highest": highest, "lowest": lowest,
+    "rsi_sma": rsi_sma, "rsi_wilder": rsi_wilder,
+    "abs": np.abs, "maximum": np.maximum, "minimum": np.minimum,
+}
+
+# ============================================================
+# EXPRESSION COMPILER
+# ============================================================
+_ALLOWED = (ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call,
+            ast.Name, ast.Constant, ast.Load, ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd,
+            ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod,
+            ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+class _Vectorise(ast.NodeTransformer):
+    """
+    column names → _c["name"], functions → _f["name"],
+    and / or / chained compares → elementwise & |, not x → x == 0
+    (also valid on float columns, e.g. stacked NaN-padded flags).
+    """
+    def visit_Name(self, node):
+        return ast.Subscript(value=ast.Name("_c", ast.Load()), slice=ast.Constant(node.id), ctx=ast.Load())
+
+    def visit_Call(self, node):
+        node.args = [self.visit(a) for a in node.args]
+        node.func = ast.Subscript(value=ast.Name("_f", ast.Load()), slice=ast.Constant(node.func.id),
+                                  ctx=ast.Load())
+        return node
+
+    def visit_BoolOp(self, node):
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        vals = [self.visit(v) for v in node.values]
+        out = vals[0]
+        for v in vals[1:]:
+            out = ast.BinOp(left=out, op=op, right=v)
+        return out
+
+    def visit_UnaryOp(self, node):
+        operand = self.visit(node.operand)
+        if isinstance(node.op, ast.Not):
+            return ast.Compare(left=operand, ops=[ast.Eq()], comparators=[ast.Constant(0)])
+        node.operand = operand
+        return node
+
+    def visit_Compare(self, node):
+        left = self.visit(node.left)
+        parts = []
+        for op, right in zip(node.ops, node.comparators):
+            right = self.visit(right)
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        out = parts[0]
+        for p in parts[1:]:
+            out = ast.BinOp(left=out, op=ast.BitAnd(), right=p)
+        return out
+
+def compile_expr(name, expr):
+    """
+    Validated, vectorised AST expression for one declared rule.
+    """
+    tree = ast.parse(expr, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED):
+            raise ValueError(f"{name}: '{type(node).__name__}' not allowed in '{expr}'")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCS or node.keywords:
+                raise ValueError(f"{name}: unknown function in '{expr}'")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"{name}: only numeric constants allowed in '{expr}'")
+    return _Vectorise().visit(tree).body
+
+def names_in(expr):
+    tree = ast.parse(expr, mode="eval")
+    calls = {n.func.id for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} - calls
+
+# ============================================================
+# STRATEGY
+# ============================================================
+class Strategy:
+    def __init__(self, name, columns, conditions, buy=None, sell=None, min_bars=2):
+        """
+        columns: derived column -> expression (evaluated in order)
+        conditions: condition -> boolean expression (kept in order)
+        buy / sell: condition names that must ALL hold; default is every
+        condition whose name contains "BUY" / "SELL" (SignalEngine rule).
+        """
+        self.name = name
+        self.columns = dict(columns)
+        self.conditions = dict(conditions)
+        self.buy = list(buy) if buy is not None else [k for k in self.conditions if "BUY" in k]
+        self.sell = list(sell) if sell is not None else [k for k in self.conditions if "SELL" in k]
+        self.min_bars = min_bars
+        self.source, self._fn = self._compile()
+        self._plan()
+
+    def _compile(self):
+        fn = "_strategy"
+        lines = [f"def {fn}(_c, _f):"]
+        for col, expr in self.columns.items():
+            lines.append(f"    _c[{col!r}] = {ast.unparse(compile_expr(col, expr))}")
+        lines.append("    return {")
+        for k, expr in self.conditions.items():
+            lines.append(f"        {k!r}: {ast.unparse(compile_expr(k, expr))},")
+        lines.append("    }")
+        source = "\n".join(lines)
+        ns = {}
+        exec(compile(source, f"<strategy {self.name}>", "exec"), ns)
+        return source, ns[fn]
+
+    # ---------------- staged plan ----------------
+    def _lambda(self, name, expr):
+        src = f"lambda _c, _f: {ast.unparse(compile_expr(name, expr))}"
+        return eval(compile(src, f"<strategy {self.name}:{name}>", "eval"))
+
+    def _plan(self):
+        """
+        Per-rule pieces for decide(): every derived column / condition as
+        its own function, the derived columns each condition needs (in
+        dependency order), a static cost and whether the condition can be
+        evaluated on the last few rows only.
+        """
+        self._col_fns = {c: self._lambda(c, e) for c, e in self.columns.items()}
+        self._cond_fns = {k: self._lambda(k, e) for k, e in self.conditions.items()}
+        closure = {}
+        for col, expr in self.columns.items():
+            closure[col] = set().union(*([closure[n] | {n} for n in names_in(expr) if n in closure] or [set()]))
+        self._needs, self._cost, self._tail_ok = {}, {}, {}
+        lags = [1]
+        for k, expr in self.conditions.items():
+            need = set().union(*([closure[n] | {n} for n in names_in(expr) if n in closure] or [set()]))
+            self._needs[k] = [c for c in self.columns if c in need]
+            self._cost[k] = sum(_indicator_calls(self.columns[c]) for c in need) + len(need)
+            calls = [n for n in ast.walk(ast.parse(expr, mode="eval")) if isinstance(n, ast.Call)]
+            self._tail_ok[k] = all(
+                c.func.id in ELEMENTWISE or (c.func.id == "prev" and
+                                             all(isinstance(a, ast.Constant) for a in c.args[1:]))
+                for c in calls)
+            lags += [c.args[1].value for c in calls if c.func.id == "prev" and len(c.args) > 1]
+        self.lag = max(lags)
+        self._seen = dict.fromkeys(self.conditions, 0)
+        self._passed = dict.fromkeys(self.conditions, 0)
+
+    def _ordered(self, names):
+        # cheapest first; among equals, the one that fails most often
+        rate = lambda k: (self._passed[k] + 1) / (self._seen[k] + 2)
+        return sorted(names, key=lambda k: (self._cost[k], rate(k)))
+
+    def stage_stats(self):
+        return pd.DataFrame([
+            {"condition": k, "cost": self._cost[k], "evaluated": self._seen[k],
+             "pass_rate": round(self._passed[k] / self._seen[k], 3) if self._seen[k] else None}
+            for k in self.conditions
+        ])
+
+    # ---------------- evaluation ----------------
+    def evaluate(self, cols):
+        """
+        cols: input column -> array (T,) or (T, tokens).
+        Returns condition -> boolean array of the same shape.
+        """
+        c = dict(cols)
+        with np.errstate(all="ignore"):
+            return self._fn(c, FUNCS)
+
+    def signals(self, conds):
+        buy = np.logical_and.reduce([conds[k] for k in self.buy]) if self.buy else False
+        sell = np.logical_and.reduce([conds[k] for k in self.sell]) if self.sell else False
+        return np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+
+    def explain(self, df):
+        """
+        (signal, conds) for the last bar of df — SignalEngine.validate shape.
+        """
+        if len(df) < self.min_bars:
+            return None, {}
+        conds = self.evaluate(frame_columns(df))
+        last = {k: bool(v[-1]) for k, v in conds.items()}
+        if all(last[k] for k in self.buy):
+            return "BUY", last
+        if all(last[k] for k in self.sell):
+            return "SELL", last
+        return None, last
+
+    def decide(self, df):
+        """
+        Signal for the last bar with short-circuiting: conditions run
+        cheapest / most selective first and an indicator column is only
+        computed when a condition that needs it is reached. Returns
+        (signal, Decision); Decision.conds() completes the full dict on
+        demand (debug / heatmap) reusing whatever was already computed.
+        """
+        d = Decision(self, df)
+        if len(df) < self.min_bars:
+            return None, d
+        for side, names in (("BUY", self.buy), ("SELL", self.sell)):
+            if names and all(d.cond(k, track=True) for k in self._ordered(names)):
+                d.signal = side
+                return side, d
+        return None, d
+
+# ============================================================
+# STAGED DECISION (LAZY COLUMNS + CONDITIONS)
+# ============================================================
+class _Tail:
+    # last `w` rows of every column, sliced on access
+    __slots__ = ("cols", "w")
+
+    def __init__(self, cols, w):
+        self.cols = cols
+        self.w = w
+
+    def __getitem__(self, k):
+        return self.cols[k][-self.w:]
+
+class Decision:
+    __slots__ = ("strategy", "cols", "computed", "values", "signal")
+
+    def __init__(self, strategy, df):
+        self.strategy = strategy
+        self.cols = frame_columns(df) if len(df) >= strategy.min_bars else None
+        self.computed = set()
+        self.values = {}
+        self.signal = None
+
+    def _column(self, col):
+        if col not in self.computed:
+            self.cols[col] = self.strategy._col_fns[col](self.cols, FUNCS)
+            self.computed.add(col)
+
+    def cond(self, k, track=False):
+        v = self.values.get(k)
+        if v is None:
+            s = self.strategy
+            with np.errstate(all="ignore"):
+                for col in s._needs[k]:
+                    self._column(col)
+                c = _Tail(self.cols, s.lag + 1) if s._tail_ok[k] else self.cols
+                v = self.values[k] = bool(s._cond_fns[k](c, FUNCS)[-1])
+            if track:
+                s._seen[k] += 1
+                s._passed[k] += v
+        return v
+
+    def conds(self):
+        if self.cols is None:
+            return {}
+        return {k: self.cond(k) for k in self.strategy.conditions}
+
+# ============================================================
+# INPUTS
+# ============================================================
+def frame_columns(df):
+    return {k: df[k].to_numpy() for k in df.columns if df[k].dtype.kind in "biuf"}
+
+def stack_columns(frames, fields=("open", "high", "low", "close"), lookback=None):
+    """
+    token -> DataFrame  ⇒  field -> (T, tokens) array, right-aligned on
+    the latest bar; shorter histories are NaN-padded at the top.
+    """
+    tokens = list(frames)
+    T = max((len(frames[t]) for t in tokens), default=0)
+    if lookback:
+        T = min(T, lookback)
+    out = {f: np.full((T, len(tokens)), np.nan) for f in fields}
+    lengths = np.zeros(len(tokens), dtype=int)
+    for j, t in enumerate(tokens):
+        df = frames[t]
+        n = min(len(df), T)
+        lengths[j] = len(df)
+        for f in fields:
+            if n:
+                out[f][T - n:, j] = df[f].to_numpy(float)[-n:]
+    return tokens, out, lengths
+
+_SIGNAL_NAMES = np.array([None, "BUY", "SELL"], dtype=object)     # indexed by 0 / 1 / -1
+
+class StrategyBook:
+    """
+    Many strategies × many tokens per bar: each strategy's compiled
+    function runs once over the stacked (T, tokens) arrays.
+    """
+    def __init__(self, strategies, lookback=None, fields=("open", "high", "low", "close")):
+        """
+        fields: input columns the strategies read (indicator columns
+        too, when the frames already carry them).
+        """
+        self.strategies = list(strategies)
+        self.lookback = lookback
+        self.fields = tuple(fields)
+
+    def last(self, frames):
+        tokens, cols, lengths = stack_columns(frames, fields=self.fields, lookback=self.lookback)
+        out = pd.DataFrame(index=pd.Index(tokens, name="token"))
+        if not tokens or not len(cols["close"]):
+            return out
+        for s in self.strategies:
+            sig = s.signals({k: v[-1] for k, v in s.evaluate(cols).items()})
+            sig = np.where(lengths >= s.min_bars, sig, 0)
+            out[s.name] = _SIGNAL_NAMES[sig]
+        return out
+
+# ============================================================
+# SHARED INDICATOR COLUMNS
+# ============================================================
+# Pawansmart / Pawanbetter indicator set (bollinger_bands, supertrend,
+# macd, rsi) as declared columns.
+SIGNAL_ENGINE_COLUMNS = {
+    "mid": "sma(close, 20)",
+    "bb_std": "std(close, 20)",
+    "upper": "mid + 2 * bb_std",
+    "lower": "mid - 2 * bb_std",
+    "hl2": "(high + low) / 2",
+    "st_atr": "sma(high - low, 10)",
+    "st_upper": "hl2 + 3 * st_atr",
+    "st_lower": "hl2 - 3 * st_atr",
+    "st_color": "close > st_lower",
+    "macd_line": "ema(close, 12) - ema(close, 26)",
+    "macd_signal": "ema(macd_line, 9)",
+    "macd_hist": "macd_line - macd_signal",
+    "rsi": "rsi_sma(close, 14)",
+}
+
+# Pawangi.validate_signal over calculate_indicators output.
+PAWANGI_VALIDATE = Strategy("pawangi", {}, {
+    "BUY_ST_flip": "prev(st_dir) == -1 and st_dir == 1",
+    "BUY_Above_mid": "close > bb_mid",
+    "BUY_RSI": "rsi > 60",
+    "BUY_MACD": "macd_hist > 0",
+    "BUY_No_squeeze": "not squeeze",
+    "SELL_ST_flip": "prev(st_dir) == 1 and st_dir == -1",
+    "SELL_Below_mid": "close < bb_mid",
+    "SELL_RSI": "rsi < 40",
+    "SELL_MACD": "macd_hist < 0",
+    "SELL_No_squeeze": "not squeeze",
+}, min_bars=50)
@@ -0,0 +1,322 @@
+# ============================================================
+# PAWAN FEED STRESS HARNESS (CAPACITY PLANNING)
+# - SyntheticFeed → FeedHub → SmartWebSocketV2 stand-in →
+#   ShardedFeedManager → engine handler (candles, incremental
+#   indicators, validate_signal, orders on SimBroker)
+# - Reports offered vs processed ticks/s, shard queue depths,
+#   tick-to-decision and tick-to-signal latency, drain time
+# - capacity() steps the offered rate to find the sustainable one
+# Everything runs in one process: generator cost shares the GIL.
+# ============================================================
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pawanfeed import ShardedFeedManager, MAX_SHARDS, MAX_TOKENS_PER_SHARD
+from pawanfeedsim import FeedHub, FeedServer, SyntheticFeed, loopback_factory, smart_ws_factory
+from pawanrepaint import IncrementalIndicators, IncrementalValidateSignal, RepaintEngine
+
+WARM_BARS = IncrementalIndicators.MIN_BARS + 10
+
+# ============================================================
+# REFERENCE ENGINE (THE Pawanangry LIVE TICK PATH)
+# ============================================================
+class ReferenceEngine:
+    """
+    handler(ws, msg) -> closed-bar signal or None.
+    Per tick: bucket into every timeframe, O(1) indicator peek,
+    validate_signal; on a confirmed signal place a MARKET order.
+    """
+    def __init__(self, timeframes=(1, 5), broker=None, qty=1, max_trades=2):
+        self.timeframes = timeframes
+        self.repaint = RepaintEngine(IncrementalValidateSignal)
+        self.broker = broker
+        self.qty = qty
+        self.max_trades = max_trades
+        self.trades = {}
+        self.signals = 0
+        self.orders = 0
+
+    def warm(self, feed, bars=WARM_BARS, seed=None):
+        """
+        Seed every (token, timeframe) with closed random-walk bars ending
+        at the feed's current price, so indicators are past warm-up and
+        signals fire from the first tick.
+        """
+        rng = np.random.default_rng(seed)
+        start = datetime.fromtimestamp(feed.exchange_ms() / 1000).replace(second=0, microsecond=0)
+        last = feed.prices()
+        for tf in self.timeframes:
+            sd = feed.vol * np.sqrt(tf * 60)
+            steps = rng.standard_normal((bars, 4, len(last))) * sd
+            walk = np.cumsum(steps[:, 3], axis=0)
+            path = last * np.exp(walk - walk[-1])
+            first = start - timedelta(minutes=start.minute % tf) - timedelta(minutes=tf * bars)
+            for k in range(bars):
+                o = path[k - 1] if k else path[0] * np.exp(steps[0, 0])
+                c = path[k]
+                h = np.maximum(o, c) * np.exp(np.abs(steps[k, 1]))
+                l = np.minimum(o, c) * np.exp(-np.abs(steps[k, 2]))
+                bucket = first + timedelta(minutes=tf * k)
+                for j, token in enumerate(feed.tokens):
+                    self.repaint.on_close(token, tf, {
+                        "bucket": bucket, "end": bucket + timedelta(minutes=tf),
+                        "open": o[j], "high": h[j], "low": l[j], "close": c[j]})
+
+    def __call__(self, ws, msg):
+        token = msg["token"]
+        ltp = msg["last_traded_price"] / 100
+        ts = datetime.fromtimestamp(msg["exchange_timestamp"] / 1000)
+        sig = None
+        for tf in self.timeframes:
+            sig = self.repaint.on_tick(token, tf, ltp, ts) or sig
+        if sig:
+            self.signals += 1
+            if self.broker is not None and self.trades.get(token, 0) < self.max_trades:
+                self.trades[token] = self.trades.get(token, 0) + 1
+                self.broker.placeOrder({
+                    "variety": "NORMAL", "tradingsymbol": token, "symboltoken": token,
+                    "transactiontype": sig, "exchange": "NFO", "ordertype": "MARKET",
+                    "producttype": "INTRADAY", "duration": "DAY", "quantity": self.qty,
+                })
+                self.orders += 1
+        return sig
+
+# ============================================================
+# LATENCY RECORDER (ONE RING PER WORKER THREAD, NO LOCKS)
+# ============================================================
+class _Ring:
+    def __init__(self, capacity):
+        self.a = np.zeros(capacity, dtype=np.int64)
+        self.n = 0
+
+    def add(self, v):
+        self.a[self.n % len(self.a)] = v
+        self.n += 1
+
+    def values(self):
+        return self.a[:min(self.n, len(self.a))]
+
+class LatencyProbe:
+    def __init__(self, hub, handler, capacity=1 << 18):
+        """
+        Wraps handler(ws, msg): latency = perf_counter_ns at handler
+        return - hub send time of that sequence_number.
+        """
+        self.hub = hub
+        self.handler = handler
+        self.capacity = capacity
+        self.rings = []                 # (decision ring, signal ring) per worker
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _mine(self):
+        r = getattr(self._local, "rings", None)
+        if r is None:
+            r = self._local.rings = (_Ring(self.capacity), _Ring(self.capacity // 16))
+            with self._lock:
+                self.rings.append(r)
+        return r
+
+    def __call__(self, ws, msg):
+        sig = self.handler(ws, msg)
+        hub = self.hub
+        lat = time.perf_counter_ns() - hub.sent_ns[msg["sequence_number"] & hub.mask]
+        decision, signal = self._mine()
+        decision.add(lat)
+        if sig:
+            signal.add(lat)
+        return sig
+
+    def reset(self):
+        with self._lock:
+            for d, s in self.rings:
+                d.n = s.n = 0
+
+    def percentiles(self, which=0, q=(50, 99, 99.9)):
+        with self._lock:
+            v = [r[which].values() for r in self.rings]
+        v = np.concatenate(v) if v else np.zeros(0)
+        if not len(v):
+            return {f"p{p}": np.nan for p in q} | {"max": np.nan, "n": 0}
+        ms = np.percentile(v, q) / 1e6
+        return {f"p{p}": round(float(m), 3) for p, m in zip(q, ms)} | \
+            {"max": round(float(v.max()) / 1e6, 3), "n": len(v)}
+
+# ============================================================
+# ONE RUN
+# ============================================================
+def run_stress(feed, handler=None, seconds=10.0, transport="loopback", warmup=1.0,
+               max_tokens_per_shard=MAX_TOKENS_PER_SHARD, max_shards=MAX_SHARDS,
+               sample_every=0.05, drain_timeout=30.0, hub=None, warm_bars=WARM_BARS):
+    """
+    feed: SyntheticFeed (or pass a running FeedHub as hub).
+    transport: "loopback" (in-process packets) | "tcp" (real
+    SmartWebSocketV2 against a local FeedServer).
+    Returns (summary dict, per-shard DataFrame).
+    """
+    own_hub = hub is None
+    hub = hub or FeedHub(feed)
+    feed = hub.feed
+    handler = handler or ReferenceEngine()
+    if isinstance(handler, ReferenceEngine) and warm_bars:
+        handler.warm(feed, warm_bars)
+    if own_hub:
+        hub.start()
+    probe = LatencyProbe(hub, handler)
+
+    server = None
+    if transport == "tcp":
+        server = FeedServer(hub).start()
+        ws_factory = smart_ws_factory(server.url)
+    else:
+        ws_factory = loopback_factory(hub)
+
+    mgr = ShardedFeedManager(ws_factory, probe, max_tokens_per_shard=max_tokens_per_shard,
+                             max_shards=max_shards)
+    mgr.subscribe(feed.tokens, exchange_type=feed.exchange_type)
+    mgr.start()
+    deadline = time.time() + 10
+    while not all(s.connected for s in mgr.shards) and time.time() < deadline:
+        time.sleep(0.01)
+
+    time.sleep(warmup)
+    probe.reset()
+    base_gen = hub.stats["generated"]
+    base_in = [s.ticks_in for s in mgr.shards]
+    base_done = [s.ticks_done for s in mgr.shards]
+    depth = [[] for _ in mgr.shards]
+
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for i, s in enumerate(mgr.shards):
+            depth[i].append(s.queue_depth())
+        time.sleep(sample_every)
+    elapsed = time.perf_counter() - t0
+
+    gen = hub.stats["generated"] - base_gen
+    ins = [s.ticks_in - b for s, b in zip(mgr.shards, base_in)]
+    done = [s.ticks_done - b for s, b in zip(mgr.shards, base_done)]
+    backlog = [s.queue_depth() for s in mgr.shards]
+
+    # stop offering load, time how long the workers need to catch up
+    if own_hub:
+        hub.stop()
+    else:
+        hub.stall(drain_timeout)
+    d0 = time.perf_counter()
+    while any(s.queue_depth() for s in mgr.shards) and time.perf_counter() - d0 < drain_timeout:
+        time.sleep(0.01)
+    drain_s = time.perf_counter() - d0
+
+    mgr.stop()
+    if server is not None:
+        server.stop()
+
+    shards = pd.DataFrame([{
+        "shard": s.shard_id,
+        "tokens": s.size(),
+        "ticks_in_s": round(i / elapsed, 1),
+        "ticks_done_s": round(d / elapsed, 1),
+        "depth_p50": float(np.median(q)) if q else 0.0,
+        "depth_max": max(q, default=0),
+        "backlog_end": b,
+        "errors": s.errors,
+    } for s, i, d, q, b in zip(mgr.shards, ins, done, depth, backlog)])
+
+    offered, processed = gen / elapsed, sum(done) / elapsed
+    summary = {
+        "tokens": len(feed.tokens),
+        "shards": len(mgr.shards),
+        "transport": transport,
+        "seconds": round(elapsed, 2),
+        "offered_tps": round(offered, 1),
+        "delivered_tps": round(sum(ins) / elapsed, 1),
+        "processed_tps": round(processed, 1),
+        "backlog_end": sum(backlog),
+        "depth_max": int(shards["depth_max"].max()) if len(shards) else 0,
+        "drain_s": round(drain_s, 3),
+        "hub_late_steps": hub.stats["late_steps"],
+        "sustained": bool(processed >= 0.97 * offered and sum(backlog) <= max(offered * 0.5, 100)),
+    }
+    summary.update({f"decision_{k}": v for k, v in probe.percentiles(0).items()})
+    summary.update({f"signal_{k}": v for k, v in probe.percentiles(1).items()})
+    if isinstance(handler, ReferenceEngine):
+        summary.update({"signals": handler.signals, "orders": handler.orders})
+    return summary, shards
+
+# ============================================================
+# CAPACITY SWEEP
+# ============================================================
+def capacity(total_rates, feed_kwargs=None, seconds=10.0, handler_factory=None, **run_kwargs):
+    """
+    One run per offered total ticks/s (fresh feed + engine each).
+    Returns (table, highest sustained ticks/s).
+    """
+    rows = []
+    for r in total_rates:
+        feed = SyntheticFeed(**(feed_kwargs or {}))
+        feed.set_rate(r / len(feed.tokens))
+        handler = handler_factory() if handler_factory else None
+        summary, _ = run_stress(feed, handler, seconds=seconds, **run_kwargs)
+        rows.append({"target_tps": r, **summary})
+        print(f"{'✅' if summary['sustained'] else '❌'} {r} ticks/s → processed "
+              f"{summary['processed_tps']}, depth_max {summary['depth_max']}, "
+              f"p99 {summary['decision_p99']} ms")
+    table = pd.DataFrame(rows)
+    ok = table.loc[table["sustained"], "processed_tps"]
+    return table, (float(ok.max()) if len(ok) else 0.0)
+
+# ============================================================
+# CLI: python pawanstress.py --tokens 600 --capacity 2000,5000,10000,20000
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Drive the feed → signal → order path with synthetic ticks")
+    ap.add_argument("--tokens", type=int, default=300)
+    ap.add_argument("--tps", type=float, default=3000, help="offered ticks/s across all tokens")
+    ap.add_argument("--capacity", default=None, help="comma-separated ticks/s steps")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--skew", type=float, default=1.0)
+    ap.add_argument("--open-burst", type=float, default=0.0)
+    ap.add_argument("--burst-every", type=float, default=0.0)
+    ap.add_argument("--burst-mult", type=float, default=10.0)
+    ap.add_argument("--gap-prob", type=float, default=0.0)
+    ap.add_argument("--clock-speed", type=float, default=60.0, help="exchange seconds per real second")
+    ap.add_argument("--timeframes", default="1,5")
+    ap.add_argument("--shard-size", type=int, default=MAX_TOKENS_PER_SHARD)
+    ap.add_argument("--shards", type=int, default=MAX_SHARDS)
+    ap.add_argument("--tcp", action="store_true", help="real SmartWebSocketV2 over a local server")
+    ap.add_argument("--orders", action="store_true", help="send signals to a SimBroker")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    feed_kwargs = dict(n_tokens=args.tokens, skew=args.skew, open_burst=args.open_burst,
+                       burst_every=args.burst_every, burst_mult=args.burst_mult,
+                       gap_prob=args.gap_prob, clock_speed=args.clock_speed, seed=args.seed)
+    tfs = tuple(int(t) for t in args.timeframes.split(","))
+
+    def make_engine():
+        broker = None
+        if args.orders:
+            from pawansim import SimBroker
+            broker = SimBroker(seed=args.seed)
+        return ReferenceEngine(tfs, broker=broker)
+
+    run_kwargs = dict(transport="tcp" if args.tcp else "loopback",
+                      max_tokens_per_shard=args.shard_size, max_shards=args.shards)
+    if args.capacity:
+        table, best = capacity([float(x) for x in args.capacity.split(",")], feed_kwargs,
+                               args.seconds, make_engine, **run_kwargs)
+        print(table.to_string())
+        print(f"✅ Sustainable: {best:.0f} ticks/s over {args.tokens} tokens")
+    else:
+        feed = SyntheticFeed(**feed_kwargs)
+        feed.set_rate(args.tps / args.tokens)
+        summary, shards = run_stress(feed, make_engine(), seconds=args.seconds, **run_kwargs)
+        print(shards.to_string())
+        print("✅", ", ".join(f"{k}={v}" for k, v in summary.items()))
@@ -0,0 +1,266 @@
+# ============================================================
+# PAWAN PARAMETER SWEEP (CACHED INDICATORS + VECTORISED GRID)
+# - Pawangi.calculate_indicators runs ONCE per symbol; arrays are
+#   cached on disk (npz) keyed by the candle data
+# - Strategy = Pawangi.validate_signal with swept thresholds:
+#   RSI buy / sell, SignalEngine body-vs-range multiple, TP / SL
+# - Every candidate entry is simulated once for the whole TP × SL
+#   grid (first-touch via searchsorted on running extremes); the
+#   threshold grid is one boolean matrix → one matmul per symbol
+# - Symbols run in parallel processes; results are ranked
+# Each signal is scored as an independent trade (no position overlap).
+# ============================================================
+
+import argparse
+import hashlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".sweep_cache"
+INDICATOR_VERSION = "pawangi-1"     # bump when Pawangi indicator maths changes
+CACHE_FIELDS = ("ts", "open", "high", "low", "close", "rsi", "bb_mid",
+                "macd_hist", "squeeze", "st_dir")
+
+DEFAULT_GRID = {
+    "rsi_buy": (50, 55, 60, 65, 70, 75),
+    "rsi_sell": (25, 30, 35, 40, 45, 50),
+    "range_mult": (0.0, 0.5, 1.0, 1.5),     # 0 → body/range filter off
+    "tp_pct": (0.005, 0.01, 0.02, 0.03, 0.05),
+    "sl_pct": (0.0025, 0.005, 0.01, 0.02),
+}
+MAX_HOLD = 75                               # bars before a time exit
+
+# ============================================================
+# CANDLES
+# ============================================================
+def history_frame(rows):
+    """
+    smart.getCandleData rows ([ts, o, h, l, c, v]) → OHLC DataFrame.
+    """
+    df = pd.DataFrame(rows, columns=["timestamp", "open", "high", "low", "close", "volume"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.tz_localize(None)
+    return df.astype({k: float for k in ("open", "high", "low", "close")})
+
+def _ts_ns(df):
+    for k in ("end", "timestamp", "bucket", "time"):
+        if k in df:
+            return pd.to_datetime(df[k]).to_numpy("datetime64[ns]").astype(np.int64)
+    return np.arange(len(df), dtype=np.int64)
+
+# ============================================================
+# INDICATOR CACHE (ONE PANDAS PASS PER SYMBOL, EVER)
+# ============================================================
+def cache_key(df):
+    h = hashlib.sha1(INDICATOR_VERSION.encode())
+    h.update(_ts_ns(df).tobytes())
+    for k in ("open", "high", "low", "close"):
+        h.update(np.ascontiguousarray(df[k].to_numpy(float)).tobytes())
+    return h.hexdigest()[:20]
+
+def indicator_arrays(symbol, df, cache_dir=CACHE_DIR):
+    """
+    Column arrays of Pawangi.calculate_indicators(df) (straight from
+    the fused indicator_kernel, no DataFrame), loaded from
+    `cache_dir` when the same candles were seen before.
+    """
+    path = os.path.join(cache_dir, f"{symbol}_{cache_key(df)}.npz")
+    if os.path.exists(path):
+        with np.load(path) as z:
+            return {k: z[k] for k in CACHE_FIELDS}, True
+
+    from Pawangi import indicator_kernel
+    if len(df) < 50:                    # calculate_indicators returns None below this
+        return None, False
+    ind = indicator_kernel(df["high"].to_numpy(float), df["low"].to_numpy(float),
+                           df["close"].to_numpy(float))
+    arr = {k: df[k].to_numpy(float) for k in ("open", "high", "low", "close")}
+    arr.update({k: ind[k].astype(float) for k in CACHE_FIELDS if k in ind and k != "squeeze"})
+    arr["squeeze"] = ind["squeeze"].astype(bool)
+    arr["ts"] = _ts_ns(df)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arr)
+    os.replace(tmp, path)
+    return arr, False
+
+# ============================================================
+# CANDIDATE ENTRIES (THRESHOLD-FREE PART OF validate_signal)
+# ============================================================
+def candidate_entries(a):
+    """
+    Bars where every non-swept validate_signal condition holds.
+    Returns (index, side) with side +1 BUY / -1 SELL.
+    """
+    d = a["st_dir"]
+    flip_up = np.r_[False, (d[:-1] == -1) & (d[1:] == 1)]
+    flip_dn = np.r_[False, (d[:-1] == 1) & (d[1:] == -1)]
+    free = ~a["squeeze"]
+    with np.errstate(invalid="ignore"):
+        buy = flip_up & (a["close"] > a["bb_mid"]) & (a["macd_hist"] > 0) & free
+        sell = flip_dn & (a["close"] < a["bb_mid"]) & (a["macd_hist"] < 0) & free
+    idx = np.flatnonzero(buy | sell)
+    idx = idx[idx < len(d) - 1]                     # need at least one bar after entry
+    return idx, np.where(buy[idx], 1, -1).astype(np.int8)
+
+def entry_returns(a, idx, side, tps, sls, max_hold=MAX_HOLD):
+    """
+    R[e, t, s]: fractional return of entry e under TP tps[t] / SL sls[s].
+    Entry at the signal bar close; SL wins when both touch in one bar.
+    """
+    tps, sls = np.asarray(tps, float), np.asarray(sls, float)
+    R = np.empty((len(idx), len(tps), len(sls)))
+    c, h, l = a["close"], a["high"], a["low"]
+    for j, (i, s) in enumerate(zip(idx, side)):
+        end = min(i + 1 + max_hold, len(c))
+        px = c[i]
+        if s > 0:
+            fav = np.maximum.accumulate(h[i + 1:end]) / px - 1
+            adv = 1 - np.minimum.accumulate(l[i + 1:end]) / px
+            last = c[end - 1] / px - 1
+        else:
+            fav = 1 - np.minimum.accumulate(l[i + 1:end]) / px
+            adv = np.maximum.accumulate(h[i + 1:end]) / px - 1
+            last = 1 - c[end - 1] / px
+        n = len(fav)
+        t_tp = np.searchsorted(fav, tps)[:, None]   # running extremes are monotone
+        t_sl = np.searchsorted(adv, sls)[None, :]
+        R[j] = np.where((t_sl < n) & (t_sl <= t_tp), -sls[None, :],
+                        np.where(t_tp < n, tps[:, None], last))
+    return R
+
+def entry_mask(a, idx, side, grid):
+    """
+    Boolean (rsi_buy × rsi_sell × range_mult, E) activation matrix.
+    """
+    rsi = a["rsi"][idx]
+    body = (a["close"][idx] - a["open"][idx]) * side
+    prev_range = a["high"][idx - 1] - a["low"][idx - 1]
+    rb = np.asarray(grid["rsi_buy"], float)[:, None, None, None]
+    rs = np.asarray(grid["rsi_sell"], float)[None, :, None, None]
+    m = np.asarray(grid["range_mult"], float)[None, None, :, None]
+    with np.errstate(invalid="ignore"):
+        rsi_ok = np.where(side > 0, rsi > rb, rsi < rs)
+        range_ok = (m <= 0) | (body > m * prev_range)
+    mask = rsi_ok & range_ok
+    return mask.reshape(-1, len(idx))
+
+def grid_params(grid):
+    """
+    Row order of every per-param result: threshold combos × (tp, sl).
+    """
+    keys = ("rsi_buy", "rsi_sell", "range_mult", "tp_pct", "sl_pct")
+    return pd.DataFrame(list(itertools.product(*(grid[k] for k in keys))), columns=keys)
+
+# ============================================================
+# PER-SYMBOL EVALUATION
+# ============================================================
+def prepare_symbol(symbol, df, grid, cache_dir=CACHE_DIR, max_hold=MAX_HOLD):
+    """
+    Everything a grid evaluation needs for one symbol:
+    entry times, activation matrix and the TP × SL return cube.
+    horizon_ts is the last bar each entry's return can see.
+    """
+    a, hit = indicator_arrays(symbol, df, cache_dir)
+    if a is None:
+        return None
+    idx, side = candidate_entries(a)
+    R = entry_returns(a, idx, side, grid["tp_pct"], grid["sl_pct"], max_hold)
+    return {
+        "symbol": symbol,
+        "cache_hit": hit,
+        "ts": a["ts"][idx],
+        "horizon_ts": a["ts"][np.minimum(idx + max_hold, len(a["ts"]) - 1)],
+        "mask": entry_mask(a, idx, side, grid).astype(np.float32),
+        "R": R.reshape(len(idx), -1),
+    }
+
+def score(mask, R):
+    """
+    Additive per-param sums: (combos × tp·sl) arrays, flattened in
+    grid_params order.
+    """
+    trades = np.repeat(mask.sum(1), R.shape[1])
+    return {
+        "trades": trades,
+        "wins": (mask @ (R > 0)).ravel(),
+        "ret": (mask @ R).ravel(),
+        "gross_win": (mask @ np.clip(R, 0, None)).ravel(),
+        "gross_loss": (mask @ np.clip(R, None, 0)).ravel(),
+    }
+
+def _sweep_symbol(job):
+    symbol, df, grid, cache_dir, max_hold = job
+    t0 = time.perf_counter()
+    p = prepare_symbol(symbol, df, grid, cache_dir, max_hold)
+    if p is None or not len(p["ts"]):
+        return symbol, None, False, time.perf_counter() - t0
+    return symbol, score(p["mask"], p["R"]), p["cache_hit"], time.perf_counter() - t0
+
+# ============================================================
+# REPORT
+# ============================================================
+def rank(params, totals, min_trades=5, top=50):
+    df = params.copy()
+    for k, v in totals.items():
+        df[k] = v
+    df = df[df["trades"] >= min_trades]
+    df["win_rate"] = df["wins"] / df["trades"]
+    df["total_ret_pct"] = df["ret"] * 100
+    df["avg_ret_pct"] = df["ret"] / df["trades"] * 100
+    df["profit_factor"] = df["gross_win"] / -df["gross_loss"].where(df["gross_loss"] < 0)
+    cols = list(params.columns) + ["trades", "win_rate", "total_ret_pct", "avg_ret_pct", "profit_factor"]
+    return df.sort_values("total_ret_pct", ascending=False)[cols].head(top).round(4).reset_index(drop=True)
+
+def sweep(frames, grid=None, workers=None, cache_dir=CACHE_DIR, max_hold=MAX_HOLD,
+          min_trades=5, top=50):
+    """
+    frames: symbol -> OHLC DataFrame (closed candles).
+    Returns (ranked report, run info).
+    """
+    grid = grid or DEFAULT_GRID
+    params = grid_params(grid)
+    totals = {k: np.zeros(len(params)) for k in ("trades", "wins", "ret", "gross_win", "gross_loss")}
+    info = {"symbols": 0, "cache_hits": 0, "combos": len(params)}
+    t0 = time.perf_counter()
+
+    jobs = [(s, df, grid, cache_dir, max_hold) for s, df in frames.items()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for symbol, res, hit, _ in pool.map(_sweep_symbol, jobs):
+            info["symbols"] += 1
+            info["cache_hits"] += hit
+            if res is None:
+                continue
+            for k, v in res.items():
+                totals[k] += v
+
+    info["seconds"] = round(time.perf_counter() - t0, 3)
+    return rank(params, totals, min_trades, top), info
+
+# ============================================================
+# CLI: python pawansweep.py data/*.csv
+# ============================================================
+def load_csvs(paths):
+    return {os.path.splitext(os.path.basename(p))[0]: pd.read_csv(p) for p in paths}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sweep Pawangi signal thresholds over OHLC CSVs")
+    ap.add_argument("csv", nargs="+", help="one CSV per symbol: timestamp,open,high,low,close")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-hold", type=int, default=MAX_HOLD)
+    ap.add_argument("--min-trades", type=int, default=5)
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--out", default=None, help="write the ranked report to this CSV")
+    args = ap.parse_args()
+
+    report, info = sweep(load_csvs(args.csv), workers=args.workers, max_hold=args.max_hold,
+                         min_trades=args.min_trades, top=args.top)
+    print(f"✅ {info['combos']} combos × {info['symbols']} symbols in {info['seconds']}s "
+          f"(indicator cache hits: {info['cache_hits']})")
+    print(report.to_string())
+    if args.out:
+        report.to_csv(args.out, index=False)
@@ -4,13 +4,35 @@
 # DIAMOND SIGNAL SNAPSHOTS | NO DUPLICATE TRADES
 # =========================================================
 
+from pawanstartup import ENGINE_START_BUDGET_S, StartupProfile, lazy_module, prewarm
+startup = StartupProfile(ENGINE_START_BUDGET_S)     # before the heavy imports below
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import datetime, time, pyotp, requests, os
+import datetime, time, os, threading, queue
+from types import SimpleNamespace
 from SmartApi import SmartConnect
-from SmartApi.smartWebSocketV2 import SmartWebSocketV2
-import plotly.graph_objects as go
+from pawanfeed import ShardedFeedManager, FeedSupervisor, HistoricalBackfill
+from pawanchain import OptionChainIndex, ChainSubscriptionManager, load_scrip_master
+from pawanchart import ChartDataService, OVERLAY_MA20, OVERLAY_ST_BASIC, build_figure
+from pawanstore import StateStore, broker_net_positions, reconcile_positions
+from pawanrecon import BrokerReconciler, order_id_of
+from pawanslippage import FillQualityStore
+from pawanprofile import SamplingProfiler, latest_profile
+from pawanclock import ExchangeClock, SessionScheduler
+from pawansession import get_session
+from pawanalloc import BarAllocator
+from pawanstrategy import StrategyBook, PAWANGI_VALIDATE
+from Pawangi import calculate_indicators, INDICATOR_COLUMNS
+from pawanaccounts import OrderFanout, accounts_from_config
+from pawanmetrics import (REGISTRY as METRICS, METRICS_PORT, TimedClient, timed, start_http_server,
+                          register_feed, register_candles, register_reconciler)
+
+# only needed for snapshots / once a shard connects: not on the cold-start path
+go = lazy_module("plotly.graph_objects")
+smart_ws = lazy_module("SmartApi.smartWebSocketV2")
+startup.mark("imports")
 
 # -----------------------------
 # 1️⃣ Credentials & Risk Setup
@@ -22,10 +44,25 @@ C = {
     "totp": "SWO6GQESTOBCAWU5B5XAZ2U634"
 }
 
-PER_TRADE_CAP = 20000
+# Follower accounts mirror every entry / exit of the main account, scaled by
+# their multiplier: {"name", "api_key", "cid", "pin", "totp", "multiplier", "limits"}
+FOLLOWER_ACCOUNTS = []
+
+PER_TRADE_CAP = 20000           # ₹ per option buy (full premium)
+FUT_TRADE_CAP = 400000          # ₹ margin per futures trade: one FUTSTK lot blocks 1-3 lakh
+FUT_MARGIN_PCT = 0.20           # SPAN + exposure margin, fraction of futures notional
 MAX_OPEN_TRADES = 10
+CAPITAL = 1000000               # free capital = CAPITAL - capital blocked by open positions
 MAX_TRADE_PER_SYMBOL = 2
+OPTION_STRIKES_AROUND_ATM = 10   # CE+PE subscribed on each side of ATM
+NIFTY_SPOT_TOKEN = "26000"       # NSE index token, drives chain re-centring
 TIMEFRAMES = ["5min","15min","1h","4h"]
+CHART_WINDOW = 750               # bars visible in Live Chart
+CHART_POINTS = 300               # max candles sent to the browser
+CHART_SIGNAL_LOOKBACK = 250      # bars fed to get_sig for the chart marker
+RECON_INTERVAL = 2.0             # seconds between orderBook/tradeBook polls
+PROFILE_SECONDS = 30             # sampling profiler run (sidebar button / kill -USR2)
+OVERNIGHT_BARS = CHART_WINDOW    # 1-min bars kept per token at end of day
 
 # Snapshot directory
 SNAPSHOT_DIR = "signal_snapshots"
@@ -44,12 +81,13 @@ class CandleBuilder:
             self.candles[token] = []
         bucket = ts.replace(second=0, microsecond=0)
         if not self.candles[token] or self.candles[token][-1]['bucket'] != bucket:
-            self.candles[token].append({'bucket': bucket,'open': price,'high': price,'low': price,'close': price})
+            self.candles[token].append({'bucket': bucket,'open': price,'high': price,'low': price,'close': price,'n': 1})
         else:
             c = self.candles[token][-1]
             c['high'] = max(c['high'], price)
             c['low'] = min(c['low'], price)
             c['close'] = price
+            c['n'] += 1             # ticks in the bar: liquidity for the allocator
 
     def get_closed_df(self, token):
         token = str(token)
@@ -57,18 +95,21 @@ class CandleBuilder:
             return pd.DataFrame()
         return pd.DataFrame(self.candles[token])
 
-cb = CandleBuilder()
-pos = {}           # Open positions
-orderbook = []     # Live orders
-pnl_table = []     # Profit & Loss table
-trade_count_symbol = {}  # Max 2 trades per symbol
-snapshots_recorded = set()  # Track snapshots to avoid duplicates
+# hot-path metrics: children resolved once, updates are per-thread adds
+TICK_TIME = METRICS.histogram("tick_seconds", "on_data time per tick (candles, signal, orders)")
+SIG_TIME = METRICS.histogram("indicator_seconds", "get_sig time (indicators + rules) per closed-bar update")
+SIGNALS = METRICS.counter("signals", "Signals fired", ("side",))
+ORDERS = METRICS.counter("orders_sent", "Entry orders sent", ("side",))
 
 # -----------------------------
 # 3️⃣ Signal Validator
 # -----------------------------
 def get_sig(df):
     if len(df) < 20: return None
+    sig_indicators(df)
+    return sig_rules(df)
+
+def sig_indicators(df):
     df['ma'] = df['close'].rolling(20).mean()
     df['up'] = df['ma'] + df['close'].rolling(20).std() * 2
     df['lo'] = df['ma'] - df['close'].rolling(20).std() * 2
@@ -85,6 +126,7 @@ def get_sig(df):
     df['rsi'] = 100 - 100 / (1 + roll_up / (roll_down + 1e-9))
     df['slope'] = np.gradient(df['ma'])
 
+def sig_rules(df):
     if len(df) >= 20:
         last_20 = df['close'].iloc[-20:]
         horizontal_break_up = df['close'].iloc[-1] > last_20.max()
@@ -104,6 +146,10 @@ def get_sig(df):
             return "SELL"
     return None
 
+# Pawangi.validate_signal for every token in one pass (Signal Validator tab)
+SIGNAL_BOOK = StrategyBook([PAWANGI_VALIDATE], lookback=PAWANGI_VALIDATE.lag + 1,
+                           fields=("close",) + INDICATOR_COLUMNS)
+
 # -----------------------------
 # 4️⃣ Visual Snapshot Function (No Duplicates)
 # -----------------------------
@@ -131,189 +177,582 @@ def save_signal_snapshot(df, symbol, sig):
     fig.write_image(filename, engine="kaleido")
     return filename
 
-# -----------------------------
-# 5️⃣ Connect AngelOne
-# -----------------------------
-smart = SmartConnect(api_key=C["api_key"])
-totp = pyotp.TOTP(C["totp"]).now()
-session = smart.generateSession(C["cid"], C["pin"], totp)
-auth_token = session["data"]["jwtToken"]
-feed_token = smart.getfeedToken()
-
-u = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
-raw = pd.DataFrame(requests.get(u).json())
-today = datetime.datetime.now().date()
-raw['dt'] = pd.to_datetime(raw['expiry'], format='%d%b%Y', errors='coerce').dt.date
-valid = raw[(raw['dt'] >= today)]
-
-futstk = valid[valid['instrumenttype']=='FUTSTK']
-nifty_opts = valid[(valid['instrumenttype']=='OPTIDX') & (valid['symbol'].str.contains("NIFTY"))]
-near_date = nifty_opts['dt'].min()
-atm_opts = nifty_opts[nifty_opts['dt']==near_date]
-
-tokens_list = list(futstk['token'].astype(str)) + list(atm_opts['token'].astype(str))
-token_symbol_map = {str(row['token']): row['symbol'] for _, row in pd.concat([futstk, atm_opts]).iterrows()}
+snapshots_recorded = set()  # Track snapshots to avoid duplicates
 
-# -----------------------------
-# 6️⃣ Auto Exit / Take Profit
-# -----------------------------
-def process_positions(df, token, instrument_type):
-    global pos, pnl_table, orderbook, trade_count_symbol
-    if token in pos:
-        entry = pos[token]
-        entry_price = entry['Entry']
-        qty = entry['Qty']
-        macd_slope = df['macd'].iloc[-1] - df['macd'].iloc[-2]
-        exit_flag = False
-
-        if instrument_type == "FUTSTK":
-            if (df['st'].iloc[-1] < df['ma'].iloc[-1] and macd_slope < 0) or (df['close'].iloc[-1] >= entry_price * 1.05):
-                exit_flag = True
-        elif instrument_type == "OPTIDX":
-            if df['close'].iloc[-1] >= entry_price * 2.0:
-                exit_flag = True
-
-        if exit_flag:
-            smart.placeOrder({
+# =========================================================
+# ENGINE (BUILT ONCE PER PROCESS, SHARED BY EVERY RERUN)
+# =========================================================
+@st.cache_resource(show_spinner="Starting engine…")
+def build_engine():
+    """
+    Login, feed shards, reconciler, store, scheduler and profiler are
+    built on the first run only. Streamlit reruns (any widget click)
+    get the same engine back; the dashboard below only reads it.
+    """
+    cb = CandleBuilder()
+    chart_service = ChartDataService(
+        lambda token, tf: cb.candles.get(str(token), []),
+        overlays={"ma": OVERLAY_MA20, "st": OVERLAY_ST_BASIC},
+    )
+    pos = {}           # Open positions
+    orderbook = []     # Live orders
+    pnl_table = []     # Profit & Loss table
+    trade_count_symbol = {}  # Max 2 trades per symbol
+    order_lock = threading.Lock()  # shard workers share pos / trade counters
+    risk = {"per_trade_cap": PER_TRADE_CAP, "fut_trade_cap": FUT_TRADE_CAP,     # sidebar-editable
+            "max_open": MAX_OPEN_TRADES, "capital": CAPITAL}
+
+    # -----------------------------
+    # 5️⃣ Connect AngelOne
+    # -----------------------------
+    # one login per process: reruns and restarts reuse the cached tokens,
+    # renewed through the refresh token before the jwt expires
+    broker_session = get_session(C["api_key"], C["cid"], C["pin"], C["totp"], client_cls=SmartConnect)
+    broker_session.start_renewer()
+    smart = TimedClient(broker_session.client())   # timed → pawan_broker_call_seconds; re-login on AG8001
+    startup.mark("login")
+
+    raw = load_scrip_master()
+    today = datetime.datetime.now().date()
+    raw['dt'] = pd.to_datetime(raw['expiry'], format='%d%b%Y', errors='coerce').dt.date
+    valid = raw[(raw['dt'] >= today)]
+
+    futstk = valid[valid['instrumenttype']=='FUTSTK']
+    # Only ±N strikes around spot are streamed; the window follows spot.
+    # Matched on the underlying name: "NIFTY" in the symbol also hits
+    # BANKNIFTY / FINNIFTY / MIDCPNIFTY, whose expiries differ.
+    option_chains = OptionChainIndex.from_scrip_master(raw, today=today, names=["NIFTY"])
+    near_date = option_chains.nearest_expiry("NIFTY")
+    nifty_chain = option_chains.chain("NIFTY", near_date)
+    if nifty_chain is None:
+        raise RuntimeError("No NIFTY option chain in the scrip master")
+    atm_opts = valid[(valid['instrumenttype']=='OPTIDX') & (valid['name']=="NIFTY") & (valid['dt']==near_date)]
+    futstk_tokens_list = list(futstk['token'].astype(str))
+    token_symbol_map = {str(row['token']): row['symbol'] for _, row in pd.concat([futstk, atm_opts]).iterrows()}
+    token_lotsize = {str(t): int(float(l) or 1) for t, l in pd.concat([futstk, atm_opts])[['token', 'lotsize']].values}
+    startup.mark("scrip_master")
+
+    # -----------------------------
+    # 5️⃣b Crash Recovery (WAL state store ↔ broker position book)
+    # -----------------------------
+    state = StateStore()
+    TRADE_COUNT_NS = f"trade_count:{today.isoformat()}"
+    # signals are computed once; each follower has its own session, worker, limits
+    # and a ledger in the store, so positions survive a restart until square-off
+    fanout = OrderFanout(accounts_from_config(FOLLOWER_ACCOUNTS, client_cls=SmartConnect, store=state)).start()
+
+    # only this engine's segment / product: NFO intraday, as placed below
+    stored = state.load("pos")
+    broker_book = broker_net_positions(smart, exchange="NFO", product="INTRADAY")
+    if broker_book is None:
+        # never drop stored positions on a failed read: keep them as they are
+        print("⚠️ Positions not reconciled with the broker; keeping the stored book")
+        recovered = stored
+        recovery_report = {"unreconciled": list(stored), "kept": [], "dropped": [], "adopted": [], "qty_fixed": []}
+    else:
+        recovered, recovery_report = reconcile_positions(stored, broker_book)
+    pos.update(recovered)
+    for t in recovery_report["dropped"]:
+        state.delete("pos", t)
+    for t in recovery_report["adopted"] + recovery_report["qty_fixed"]:
+        state.put("pos", t, pos[t])
+    trade_count_symbol.update(state.load(TRADE_COUNT_NS))
+    # an adopted position is one trade of its symbol today
+    for t in recovery_report["adopted"]:
+        sym = pos[t]["Symbol"]
+        trade_count_symbol[sym] = trade_count_symbol.get(sym, 0) + 1
+        state.put(TRADE_COUNT_NS, sym, trade_count_symbol[sym])
+    orderbook.extend(state.events("order"))
+    pnl_table.extend(state.events("pnl"))
+    startup.mark("recovery")
+
+    # -----------------------------
+    # 5️⃣c Broker Reconciliation (fills → ledger, off the order path)
+    # -----------------------------
+    def apply_fill(row, price, qty):
+        # order rows carry Price; P&L rows carry Entry/Exit/Side
+        if "Exit" in row:
+            row["Exit"] = price
+            d = 1 if row.get("Side", "BUY") == "BUY" else -1
+            row["P&L"] = (price - row["Entry"]) * int(qty) * d
+        else:
+            row["Price"] = price
+        row["Qty"] = str(qty)
+
+    # rows of orders the broker rejected never happened
+    rejected = {r["OrderID"] for r in state.events("reject")}
+    orderbook[:] = [r for r in orderbook if r.get("OrderID") not in rejected]
+    pnl_table[:] = [r for r in pnl_table if r.get("OrderID") not in rejected]
+
+    fills = {f["OrderID"]: f for f in state.events("fill")}
+    for row in orderbook + pnl_table:
+        f = fills.get(row.get("OrderID"))
+        if f:
+            apply_fill(row, f["Price"], f["Qty"])
+
+    def track_fill(token, rows, entry=False, closing=None):
+        # rows: ledger dicts to correct once the broker reports the real fill;
+        # closing: the position an exit order closes, restored if it is rejected
+        def on_fill(intent, price, qty, fill_time):
+            with order_lock:
+                for row in rows:
+                    apply_fill(row, price, qty)
+                if entry and token in pos:
+                    pos[token]["Entry"], pos[token]["Qty"] = price, str(qty)
+                    state.put("pos", token, pos[token])
+            state.append("fill", {"OrderID": intent.orderid, "Token": token, "Symbol": intent.symbol,
+                                  "Side": intent.side, "Price": price, "Qty": qty, "Ref": intent.ref_price,
+                                  "SignalTs": intent.signal_ts, "BatchTs": intent.batch_ts, "SentTs": intent.sent_ts,
+                                  "AckTs": intent.ack_ts, "FillTime": fill_time})
+
+        def on_reject(intent, status, text):
+            print(f"❌ Order {intent.orderid} {status}: {text}")
+            state.append("reject", {"OrderID": intent.orderid, "Token": token, "Symbol": intent.symbol,
+                                    "Side": intent.side, "Status": status, "Text": text})
+            drop_rows(*rows)
+            if entry:
+                with order_lock:
+                    p = pos.pop(token, None)
+                    if p:
+                        trade_count_symbol[p["Symbol"]] = trade_count_symbol.get(p["Symbol"], 0) - 1
+                        state.delete("pos", token)
+                        state.put(TRADE_COUNT_NS, p["Symbol"], trade_count_symbol[p["Symbol"]])
+                chain_subs.unpin(token)
+            elif closing is not None:
+                # the exit never happened: the position is still open at the broker
+                reopen_position(token, closing)
+                chain_subs.pin(token)
+        return {"on_fill": on_fill, "on_reject": on_reject}
+
+    recon = BrokerReconciler(smart, interval=RECON_INTERVAL)
+    # signal LTP → send → ack → fill, one columnar row per fill
+    fill_quality = FillQualityStore()
+    for f in fills.values():
+        if f.get("SentTs"):
+            fill_quality.on_fill({"symbol": f["Symbol"], "side": f["Side"], "qty": f["Qty"],
+                                  "ref_price": f["Ref"], "fill_price": f["Price"], "signal_ts": f["SignalTs"],
+                                  "batch_ts": f.get("BatchTs"),
+                                  "sent_ts": f["SentTs"], "ack_ts": f["AckTs"], "fill_time": f["FillTime"]})
+    recon.listeners.append(fill_quality.on_fill)
+    recon.start()
+
+    # -----------------------------
+    # 6️⃣ Auto Exit / Take Profit
+    # -----------------------------
+    def process_positions(df, token, instrument_type):
+        # a position adopted at startup can outrun its candles: no rules before get_sig has run
+        if token in pos and 'macd' in df:
+            entry = pos[token]
+            entry_price = entry['Entry']
+            macd_slope = df['macd'].iloc[-1] - df['macd'].iloc[-2]
+            exit_flag = False
+
+            if instrument_type == "FUTSTK":
+                if (df['st'].iloc[-1] < df['ma'].iloc[-1] and macd_slope < 0) or (df['close'].iloc[-1] >= entry_price * 1.05):
+                    exit_flag = True
+            elif instrument_type == "OPTIDX":
+                if df['close'].iloc[-1] >= entry_price * 2.0:
+                    exit_flag = True
+
+            if exit_flag:
+                exit_position(token, df['close'].iloc[-1])
+
+    def exit_position(token, exit_price):
+        # caller holds order_lock: book the exit, the order worker sends it
+        entry = pos.pop(token)
+        entry_price, qty = entry['Entry'], entry['Qty']
+        pnl_row = {
+            "Symbol": entry['Symbol'],
+            "Token": token,
+            "OrderID": None,
+            "Signal": "EXIT",
+            "Side": entry['Signal'],
+            "Entry": entry_price,
+            "Exit": exit_price,
+            "Qty": qty,
+            "P&L": (exit_price-entry_price)*int(qty) if entry['Signal']=="BUY" else (entry_price-exit_price)*int(qty),
+            "Time": datetime.datetime.now()
+        }
+        order_row = {
+            "Symbol": entry['Symbol'],
+            "Token": token,
+            "OrderID": None,
+            "Signal": "EXIT",
+            "Qty": qty,
+            "Price": exit_price,
+            "Time": datetime.datetime.now()
+        }
+        pnl_table.append(pnl_row)
+        orderbook.append(order_row)
+        trade_count_symbol[entry['Symbol']] = trade_count_symbol.get(entry['Symbol'], 0) - 1
+        state.delete("pos", token)
+        state.put(TRADE_COUNT_NS, entry['Symbol'], trade_count_symbol[entry['Symbol']])
+        order_q.put(lambda: send_exit(token, entry, exit_price, pnl_row, order_row))
+
+    def send_exit(token, entry, exit_price, pnl_row, order_row):
+        # order worker, no lock held
+        if entry.get("Unplaced"):
+            # its entry never reached the broker: nothing to close
+            drop_rows(pnl_row, order_row)
+            return
+        fanout.exit(token)
+        side = "SELL" if entry['Signal']=="BUY" else "BUY"
+        sent_ts = time.time()
+        oid = place_order(entry['Symbol'], token, side, entry['Qty'])
+        if not oid:
+            print(f"❌ Exit {entry['Symbol']} not placed; position kept open")
+            drop_rows(pnl_row, order_row)
+            reopen_position(token, entry)
+            return
+        chain_subs.unpin(token)
+        pnl_row["OrderID"] = order_row["OrderID"] = oid
+        # persisted by the background writer (group commit), off the order path
+        state.append("pnl", pnl_row)
+        state.append("order", order_row)
+        recon.register(oid, token, entry['Symbol'], side, entry['Qty'],
+                       ref_price=exit_price, sent_ts=sent_ts,
+                       **track_fill(token, [pnl_row, order_row], closing=entry))
+
+    def reopen_position(token, entry):
+        with order_lock:
+            pos.setdefault(token, entry)
+            trade_count_symbol[entry['Symbol']] = trade_count_symbol.get(entry['Symbol'], 0) + 1
+            state.put("pos", token, entry)
+            state.put(TRADE_COUNT_NS, entry['Symbol'], trade_count_symbol[entry['Symbol']])
+
+    def drop_rows(*rows):
+        with order_lock:
+            orderbook[:] = [r for r in orderbook if all(r is not x for x in rows)]
+            pnl_table[:] = [r for r in pnl_table if all(r is not x for x in rows)]
+
+    # -----------------------------
+    # 6️⃣b Order Worker (broker calls and snapshots, never under order_lock)
+    # -----------------------------
+    # Shard workers and the scheduler only book decisions under the lock;
+    # one worker sends them in order, so a slow placeOrder or kaleido
+    # render never holds up another shard's ticks.
+    order_q = queue.SimpleQueue()
+
+    def place_order(symbol, token, side, qty):
+        try:
+            return order_id_of(smart.placeOrder({
                 "variety":"NORMAL",
-                "tradingsymbol": entry['Symbol'],
+                "tradingsymbol": symbol,
                 "symboltoken": token,
-                "transactiontype":"SELL" if entry['Signal']=="BUY" else "BUY",
+                "transactiontype": side,
                 "exchange":"NFO",
                 "ordertype":"MARKET",
                 "producttype":"INTRADAY",
-                "quantity":qty
-            })
-            pnl_table.append({
-                "Symbol": entry['Symbol'],
-                "Token": token,
-                "Signal": "EXIT",
-                "Entry": entry_price,
-                "Exit": df['close'].iloc[-1],
-                "Qty": qty,
-                "P&L": (df['close'].iloc[-1]-entry_price)*int(qty) if entry['Signal']=="BUY" else (entry_price-df['close'].iloc[-1])*int(qty),
-                "Time": datetime.datetime.now()
-            })
-            orderbook.append({
-                "Symbol": entry['Symbol'],
-                "Token": token,
-                "Signal": "EXIT",
-                "Qty": qty,
-                "Price": df['close'].iloc[-1],
-                "Time": datetime.datetime.now()
-            })
-            del pos[token]
-            trade_count_symbol[entry['Symbol']] -= 1
-
-# -----------------------------
-# 7️⃣ WebSocket V2 Live Feed
-# -----------------------------
-sws = SmartWebSocketV2(auth_token, C["api_key"], C["cid"], feed_token)
-
-def on_open(ws):
-    st.sidebar.success("✅ WebSocket Connected")
-    ws.subscribe(tokens_list, mode=1)
-
-def on_data(ws, msg):
-    try:
+                "quantity": qty
+            }))
+        except Exception as e:
+            print(f"❌ placeOrder {symbol} {side} {qty}:", repr(e))
+            return None
+
+    def _work_loop():
+        while True:
+            task = order_q.get()
+            try:
+                task()
+            except Exception as e:
+                print("❌ Order task failed:", repr(e))
+
+    threading.Thread(target=_work_loop, name="orders", daemon=True).start()
+
+    # -----------------------------
+    # 7️⃣ WebSocket V2 Live Feed (Sharded)
+    # -----------------------------
+    futstk_tokens = set(futstk['token'].astype(str))
+    clock = ExchangeClock()          # advanced by on_data, read by the session scheduler
+    allocator = BarAllocator()       # this bar's entry candidates, last signal per token wins
+
+    def new_ws():
+        # read per connection, so a reconnect after renewal uses the new tokens
+        return smart_ws.SmartWebSocketV2(broker_session.auth_token, C["api_key"], C["cid"],
+                                         broker_session.feed_token)
+
+    @timed(TICK_TIME)
+    def on_data(ws, msg):
+        # exceptions propagate to the shard worker, which counts and prints them
         token = str(msg['token'])
-        ltp = float(msg['ltp'])
+        ltp = float(msg['last_traded_price']) / 100
+        clock.observe(msg['exchange_timestamp'])
         ts = datetime.datetime.now()
+        if token == NIFTY_SPOT_TOKEN:
+            chain_subs.on_spot(ltp)
+            return
 
         cb.update_tick(token, ltp, ts)
         df = cb.get_closed_df(token)
         if df.empty: return
 
-        instrument_type = "FUTSTK" if token in futstk['token'].astype(str).values else "OPTIDX"
-        process_positions(df, token, instrument_type)
-
-        sig = get_sig(df)
+        instrument_type = "FUTSTK" if token in futstk_tokens else "OPTIDX"
+        with SIG_TIME.time():
+            sig = get_sig(df)
         if sig:
-            symbol = token_symbol_map[token]
-            trades_for_symbol = trade_count_symbol.get(symbol, 0)
-            if trades_for_symbol < MAX_TRADE_PER_SYMBOL and len(pos) < MAX_OPEN_TRADES:
-                save_signal_snapshot(df, symbol, sig)
-                qty = str(int(PER_TRADE_CAP/ltp))
-                smart.placeOrder({
-                    "variety":"NORMAL",
-                    "tradingsymbol": symbol,
-                    "symboltoken": token,
-                    "transactiontype": sig,
-                    "exchange":"NFO",
-                    "ordertype":"MARKET",
-                    "producttype":"INTRADAY",
-                    "quantity": qty
-                })
-                pos[token] = {"Symbol": symbol, "Signal": sig, "Entry": ltp, "Qty": qty}
-                orderbook.append({"Symbol": symbol, "Token": token, "Signal": sig, "Qty": qty, "Price": ltp, "Time": ts})
-                trade_count_symbol[symbol] = trades_for_symbol + 1
-    except:
-        pass
-
-sws.on_open = on_open
-sws.on_data = on_data
-sws.connect()
+            SIGNALS.labels(sig).inc()
+        with order_lock:
+            process_positions(df, token, instrument_type)
+            if not sig or token in pos:
+                return
+        # entries are decided together at the bar boundary (place_batch)
+        last = df.iloc[-1]
+        allocator.submit({
+            "token": token, "symbol": token_symbol_map[token], "side": sig, "price": ltp,
+            "lotsize": token_lotsize.get(token, 1),
+            # futures block margin, option buys the whole premium
+            "margin_pct": FUT_MARGIN_PCT if instrument_type == "FUTSTK" else 1.0,
+            "per_trade_cap": risk["fut_trade_cap"] if instrument_type == "FUTSTK" else risk["per_trade_cap"],
+            "strength": abs(last['close'] - last['ma']) / (last['atr'] or 1e-9),
+            "liquidity": last['n'],
+            "volatility": last['atr'] / last['close'],
+            "signal_ts": ts, "df": df,
+        })
+
+    def place_batch(when):
+        """
+        Bar boundary: rank this bar's candidates, size them in lots against
+        free capital, book the batch; the order worker sends it.
+        """
+        with order_lock:
+            deployed = sum(float(p['Entry']) * int(p['Qty']) * (FUT_MARGIN_PCT if t in futstk_tokens else 1.0)
+                           for t, p in pos.items())
+            batch = allocator.flush(
+                keep=lambda c: c["token"] not in pos
+                               and trade_count_symbol.get(c["symbol"], 0) < MAX_TRADE_PER_SYMBOL,
+                capital=risk["capital"] - deployed,
+                max_orders=risk["max_open"] - len(pos))
+            batch_ts = time.time()      # decision time; signal_ts is the tick
+            for c in batch:
+                c["batch_ts"] = batch_ts
+                enter_position(c)
+
+    def enter_position(c):
+        # caller holds order_lock: reserve the slot, the order worker sends it
+        token, symbol, sig, ltp, ts = c["token"], c["symbol"], c["side"], c["price"], c["signal_ts"]
+        qty = str(c["qty"])
+        pos[token] = entry = {"Symbol": symbol, "Signal": sig, "Entry": ltp, "Qty": qty}
+        order_row = {"Symbol": symbol, "Token": token, "OrderID": None, "Signal": sig, "Qty": qty, "Price": ltp, "Time": ts}
+        orderbook.append(order_row)
+        trade_count_symbol[symbol] = trade_count_symbol.get(symbol, 0) + 1
+        state.put("pos", token, entry)
+        state.put(TRADE_COUNT_NS, symbol, trade_count_symbol[symbol])
+        chain_subs.pin(token)           # keep its ticks while the window moves
+        order_q.put(lambda: send_entry(c, entry, order_row))
+
+    def send_entry(c, entry, order_row):
+        # order worker, no lock held
+        token, symbol, sig, ltp, ts = c["token"], c["symbol"], c["side"], c["price"], c["signal_ts"]
+        fanout.entry(token, symbol, sig, c["qty"], ltp, lotsize=c["lotsize"], signal_ts=ts.timestamp(),
+                     batch_ts=c["batch_ts"])
+        sent_ts = time.time()
+        oid = place_order(symbol, token, sig, entry["Qty"])
+        if not oid:
+            print(f"❌ Entry {symbol} {sig} not placed")
+            with order_lock:
+                entry["Unplaced"] = True        # a queued exit for it is dropped
+                if pos.get(token) is entry:
+                    del pos[token]
+                    state.delete("pos", token)
+                trade_count_symbol[symbol] = trade_count_symbol.get(symbol, 0) - 1
+                state.put(TRADE_COUNT_NS, symbol, trade_count_symbol[symbol])
+            chain_subs.unpin(token)
+            drop_rows(order_row)
+            return
+        ORDERS.labels(sig).inc()
+        order_row["OrderID"] = oid
+        state.append("order", order_row)
+        recon.register(oid, token, symbol, sig, entry["Qty"], ref_price=ltp, signal_ts=ts.timestamp(),
+                       batch_ts=c["batch_ts"], sent_ts=sent_ts, **track_fill(token, [order_row], entry=True))
+        save_signal_snapshot(c["df"], symbol, sig)
+
+    # Each shard owns one websocket session (<= 1000 tokens), a receive thread
+    # and a worker thread; tokens are disjoint so candle state never contends.
+    feed = ShardedFeedManager(new_ws, on_data)
+    feed.subscribe(futstk_tokens_list, exchange_type=2)
+    feed.subscribe([NIFTY_SPOT_TOKEN], exchange_type=1)
+    chain_subs = ChainSubscriptionManager(feed, nifty_chain, n_strikes=OPTION_STRIKES_AROUND_ATM)
+    for token in pos:                   # recovered positions hold their strikes
+        chain_subs.pin(token)
+    chain_subs.on_spot(float(smart.ltpData("NSE", "NIFTY", NIFTY_SPOT_TOKEN)["data"]["ltp"]))
+    feed.start()
+
+    # Stale shards are reconnected; missed minutes are replayed from the
+    # historical API into the candle builder before live ticks resume.
+    supervisor = FeedSupervisor(feed, backfill=HistoricalBackfill(smart, cb.update_tick))
+    supervisor.start()
+
+    # Session events on exchange time: 15:20 square-off, end-of-day trim of the
+    # candle store, pre-open day roll. Nothing on the tick path but clock.observe.
+    scheduler = SessionScheduler(clock)
+
+    def square_off(when):
+        fanout.square_off()
+        with order_lock:
+            for token in list(pos):
+                bars = cb.candles.get(token)
+                exit_position(token, bars[-1]['close'] if bars else pos[token]['Entry'])
+
+    def end_of_day(when):
+        # each shard trims its own tokens on its worker, between ticks
+        def trim(shard):
+            for toks in shard.tokens.values():
+                for t in toks:
+                    bars = cb.candles.get(t)
+                    if bars and len(bars) > OVERNIGHT_BARS:
+                        del bars[:-OVERNIGHT_BARS]
+        feed.broadcast(trim)
+        state.flush()
+
+    def pre_open(when):
+        nonlocal TRADE_COUNT_NS
+        with order_lock:
+            TRADE_COUNT_NS = f"trade_count:{when.date().isoformat()}"
+            fanout.new_day(when.date())
+            trade_count_symbol.clear()
+            trade_count_symbol.update(state.load(TRADE_COUNT_NS))
+
+    scheduler.every_bar(1, place_batch)
+    scheduler.daily("square_off", square_off)
+    scheduler.daily("eod", end_of_day)
+    scheduler.daily("pre_open", pre_open)
+    scheduler.start()
+    startup.ready("feed")
+    # loaded off the order path now, so the first signal snapshot doesn't pay for them
+    prewarm("plotly.graph_objects", "kaleido")
+
+    # Sampling profiler over the shard threads: nothing runs until the sidebar
+    # button (or kill -USR2 <pid> when started outside Streamlit) turns it on.
+    profiler = SamplingProfiler(thread_prefixes=("feed-",))
+    profiler.install_signal(seconds=PROFILE_SECONDS)
+
+    # Scrape-time collectors read these objects; one endpoint per process
+    register_feed(feed)
+    register_candles("1min", cb.candles)
+    register_reconciler(recon)
+    metrics_server = start_http_server(METRICS, METRICS_PORT)
+
+    return SimpleNamespace(
+        startup=startup, broker_session=broker_session, smart=smart, fanout=fanout,
+        cb=cb, chart_service=chart_service, order_lock=order_lock, pos=pos, orderbook=orderbook,
+        pnl_table=pnl_table, risk=risk, state=state, recovery_report=recovery_report, recon=recon, fill_quality=fill_quality,
+        allocator=allocator, feed=feed, chain_subs=chain_subs, scheduler=scheduler, profiler=profiler,
+        metrics_server=metrics_server, token_symbol_map=token_symbol_map,
+        futstk_tokens_list=futstk_tokens_list,
+    )
+
+st.set_page_config(page_title="Pawan Master Algo", layout="wide")
+E = build_engine()
+st.sidebar.success(f"✅ WebSocket Connected ({len(E.feed.shards)} shards)")
 
 # -----------------------------
 # 8️⃣ Streamlit Dashboard
 # -----------------------------
-st.set_page_config(page_title="Pawan Master Algo", layout="wide")
 st.title("💎 Pawan Master Algo System")
 
 # Sidebar
+with st.sidebar.expander(f"⏱️ Cold start {E.startup.ready_s:.2f}s / {E.startup.budget_s}s"):
+    st.dataframe(pd.DataFrame(E.startup.rows()))
+with st.sidebar.expander("🔑 Broker session"):
+    st.caption(", ".join(f"{k}={v}" for k, v in E.broker_session.status().items()))
+with st.sidebar.expander("⏰ Session scheduler"):
+    st.dataframe(pd.DataFrame(E.scheduler.rows()))
+with st.sidebar.expander("🔬 Profiler"):
+    if st.button(f"Profile engine {PROFILE_SECONDS}s"):
+        E.profiler.start(PROFILE_SECONDS)
+    last_profile = latest_profile()
+    if last_profile:
+        st.caption(f"{last_profile[0]} (flamegraph.pl / speedscope)")
+        st.dataframe(pd.read_csv(last_profile[1]))
 st.sidebar.header("Settings")
-PER_TRADE_CAP = st.sidebar.number_input("Per Trade Cap", value=PER_TRADE_CAP)
-MAX_OPEN_TRADES = st.sidebar.number_input("Max Open Trades", value=MAX_OPEN_TRADES)
+E.risk["per_trade_cap"] = st.sidebar.number_input("Per Trade Cap (options)", value=PER_TRADE_CAP)
+E.risk["fut_trade_cap"] = st.sidebar.number_input("Per Trade Margin Cap (futures)", value=FUT_TRADE_CAP)
+E.risk["max_open"] = st.sidebar.number_input("Max Open Trades", value=MAX_OPEN_TRADES)
+E.risk["capital"] = st.sidebar.number_input("Capital", value=CAPITAL)
 if st.sidebar.button("⚠️ Panic! Cancel All Orders"):
-    for o in orderbook:
-        try: smart.cancelOrder(o.get("OrderID",""))
+    for o in E.orderbook:
+        try: E.smart.cancelOrder(o.get("OrderID",""))
         except: pass
-    pos.clear()
+    with E.order_lock:
+        for t in list(E.pos):
+            E.state.delete("pos", t)
+        E.pos.clear()
     st.sidebar.warning("All orders cancelled!")
 
+tokens_list = E.futstk_tokens_list + E.chain_subs.tokens()
+
 # Tabs
-tabs = st.tabs(["Live Chart","Signal Validator","Orderbook","Position","P&L","Heatmap","Signal Snapshots"])
-live_chart, sig_tab, order_tab, pos_tab, pnl_tab, heatmap_tab, snapshots_tab = tabs
+tabs = st.tabs(["Live Chart","Signal Validator","Orderbook","Position","P&L","Slippage","Heatmap","Signal Snapshots","Metrics"])
+live_chart, sig_tab, order_tab, pos_tab, pnl_tab, slippage_tab, heatmap_tab, snapshots_tab, metrics_tab = tabs
 
 # Live Chart
 with live_chart:
-    symbol = st.selectbox("Select Symbol", token_symbol_map.values())
-    token = [k for k,v in token_symbol_map.items() if v==symbol][0]
-    df = cb.get_closed_df(token)
-    if not df.empty:
-        fig = go.Figure()
-        fig.add_trace(go.Candlestick(x=df['bucket'], open=df['open'], high=df['high'], low=df['low'], close=df['close'], name="Price"))
-        fig.add_trace(go.Scatter(x=df['bucket'], y=df['ma'], line=dict(color='blue', width=1), name="MA"))
-        fig.add_trace(go.Scatter(x=df['bucket'], y=df['st'], line=dict(color='green', width=1), name="Supertrend"))
-        sig = get_sig(df)
-        if sig: fig.add_trace(go.Scatter(x=[df['bucket'].iloc[-1]], y=[df['close'].iloc[-1]], mode='markers', marker_symbol='diamond', marker_color='red', marker_size=15, name="Signal"))
+    symbol = st.selectbox("Select Symbol", E.token_symbol_map.values())
+    token = [k for k,v in E.token_symbol_map.items() if v==symbol][0]
+    # bounded window, OHLC-downsampled; cost does not grow with session length
+    data = E.chart_service.window(token, "1min", window=CHART_WINDOW, max_points=CHART_POINTS)
+    if len(data.get("x", [])):
+        sig = get_sig(pd.DataFrame(E.cb.candles[token][-CHART_SIGNAL_LOOKBACK:]))
+        fig = build_figure(data, {
+            "ma": ("MA", dict(color='blue', width=1)),
+            "st": ("Supertrend", dict(color='green', width=1)),
+        }, signal=sig)
         st.plotly_chart(fig, use_container_width=True)
 
 # Signal Validator
 with sig_tab:
-    sig_data = []
+    sig_data, frames = [], {}
     for t in tokens_list:
-        df = cb.get_closed_df(t)
-        if not df.empty: sig_data.append({"Symbol": token_symbol_map[t], "Signal": get_sig(df)})
-    st.dataframe(pd.DataFrame(sig_data))
+        df = E.cb.get_closed_df(t)
+        if df.empty: continue
+        sig_data.append({"token": t, "Symbol": E.token_symbol_map[t], "Signal": get_sig(df)})
+        ind = calculate_indicators(df)
+        if ind is not None: frames[t] = ind
+    book = SIGNAL_BOOK.last(frames)
+    sig_df = pd.DataFrame(sig_data, columns=["token", "Symbol", "Signal"])
+    sig_df["Pawangi"] = sig_df["token"].map(book[PAWANGI_VALIDATE.name]) if len(book.columns) else None
+    st.dataframe(sig_df.drop(columns="token"))
 
 # Orderbook
 with order_tab:
-    st.dataframe(pd.DataFrame(orderbook))
+    st.dataframe(pd.DataFrame(E.orderbook))
+    st.caption("Reconciler: " + ", ".join(f"{k}={v}" for k, v in E.recon.status().items()))
+    st.caption("Allocator: " + ", ".join(f"{k}={v}" for k, v in E.allocator.stats.items()))
+    if E.allocator.last_batch:
+        st.dataframe(pd.DataFrame(E.allocator.last_batch).drop(columns=["df"]))
+    if E.allocator.last_skipped:
+        st.caption("Skipped in the last batch")
+        st.dataframe(pd.DataFrame(E.allocator.last_skipped))
+    if E.fanout.accounts:
+        st.subheader("Follower Accounts")
+        st.dataframe(pd.DataFrame(E.fanout.rows()))
+    st.dataframe(pd.DataFrame(E.recon.slippage_stats()))
 
 # Position
 with pos_tab:
-    st.dataframe(pd.DataFrame(list(pos.items()), columns=["Token","Details"]))
+    if any(E.recovery_report.values()):
+        st.caption("Recovered at startup: " + ", ".join(f"{k}={len(v)}" for k, v in E.recovery_report.items()))
+    st.dataframe(pd.DataFrame(list(E.pos.items()), columns=["Token","Details"]))
 
 # P&L
 with pnl_tab:
-    st.dataframe(pd.DataFrame(pnl_table))
+    st.dataframe(pd.DataFrame(E.pnl_table))
+
+# Slippage / Fill Quality
+with slippage_tab:
+    st.caption(", ".join(f"{k}={v}" for k, v in E.fill_quality.totals().items()))
+    st.subheader("Per Symbol")
+    st.dataframe(E.fill_quality.distribution("symbol"))
+    st.subheader("Per Time of Day")
+    st.dataframe(E.fill_quality.distribution("time_bucket"))
+    st.subheader("Cost of Decision Latency (bar batch → placeOrder)")
+    st.dataframe(E.fill_quality.cost_by_latency())
 
 # Heatmap
 with heatmap_tab:
     heatmap_data = []
     for t in tokens_list:
-        heatmap_data.append({"Symbol": token_symbol_map[t], "5m":"BUY","15m":"BUY","1h":"BUY","4h":"BUY","Total":"Strong Buy"})
+        heatmap_data.append({"Symbol": E.token_symbol_map[t], "5m":"BUY","15m":"BUY","1h":"BUY","4h":"BUY","Total":"Strong Buy"})
     st.dataframe(pd.DataFrame(heatmap_data))
 
 # Signal Snapshots Viewer
@@ -326,3 +765,10 @@ with snapshots_tab:
         for f in files[:20]:  # show latest 20
             st.subheader(f.split("_")[0] + " | Signal: " + f.split("_")[1])
             st.image(os.path.join(SNAPSHOT_DIR, f), use_column_width=True)
+
+# Engine Metrics
+with metrics_tab:
+    if E.metrics_server:
+        st.caption(f"Prometheus: http://127.0.0.1:{METRICS_PORT}/metrics")
+    st.caption("rate_per_s is measured since the previous refresh of this tab")
+    st.dataframe(pd.DataFrame(METRICS.rows()))
@@ -0,0 +1,127 @@
+# ============================================================
+# PAWAN UI DATA LAYER (ENGINE → DELTAS → CACHED TABLES)
+# - Engine threads push rows and metrics into UIStore
+# - Unchanged values are dropped at push time (no delta)
+# - Each dashboard session keeps a UIView with a cursor into the
+#   delta log and only touches the tables that changed
+# ============================================================
+
+import threading
+from collections import defaultdict, deque
+
+import pandas as pd
+
+# ============================================================
+# SHARED STORE (ONE PER ENGINE PROCESS)
+# ============================================================
+class UIStore:
+    def __init__(self, log_size=20000):
+        self.version = 0
+        self.log = deque(maxlen=log_size)               # (version, kind, key)
+        self.rows = defaultdict(dict)                   # table -> key -> row
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, kind, key):
+        self.version += 1
+        self.log.append((self.version, kind, key))
+
+    # ---------------- engine side ----------------
+    def push_row(self, table, key, row):
+        with self._lock:
+            if self.rows[table].get(key) == row:
+                return False
+            self.rows[table][key] = dict(row)
+            self._emit("row", (table, key))
+            return True
+
+    def drop_row(self, table, key):
+        with self._lock:
+            if self.rows[table].pop(key, None) is None:
+                return False
+            self._emit("drop", (table, key))
+            return True
+
+    def push_metric(self, name, value):
+        with self._lock:
+            if self.metrics.get(name) == value:
+                return False
+            self.metrics[name] = value
+            self._emit("metric", name)
+            return True
+
+    # ---------------- dashboard side ----------------
+    def changes(self, cursor):
+        """
+        Returns (new_cursor, changed) where changed is {kind: set(keys)},
+        or (version, None) when the cursor fell off the log and the
+        caller must resync from scratch.
+        """
+        with self._lock:
+            if cursor == self.version:
+                return cursor, {}
+            if not self.log or cursor < self.log[0][0] - 1:
+                return self.version, None
+            changed = defaultdict(set)
+            # walk back from the newest entry: cost ∝ number of changes
+            for v, kind, key in reversed(self.log):
+                if v <= cursor:
+                    break
+                changed[kind].add(key)
+            return self.version, changed
+
+    def snapshot_rows(self, table):
+        with self._lock:
+            return {k: dict(r) for k, r in self.rows[table].items()}
+
+    def row(self, table, key):
+        with self._lock:
+            r = self.rows[table].get(key)
+            return None if r is None else dict(r)
+
+    def snapshot_metrics(self, names=None):
+        with self._lock:
+            if names is None:
+                return dict(self.metrics)
+            return {n: self.metrics.get(n) for n in names}
+
+# ============================================================
+# PER-SESSION VIEW (CACHED DATAFRAMES)
+# ============================================================
+class UIView:
+    def __init__(self, store):
+        self.store = store
+        self.cursor = 0
+        self.tables = {}                # table -> DataFrame indexed by key
+        self.metrics = {}
+        self.applied = 0                # deltas applied on the last sync
+
+    def sync(self):
+        self.cursor, changed = self.store.changes(self.cursor)
+        if changed is None:
+            self.tables.clear()
+            self.metrics = self.store.snapshot_metrics()
+            self.applied = -1
+            return
+        self.applied = sum(len(v) for v in changed.values())
+
+        for table, key in changed.get("row", ()):
+            if table not in self.tables:
+                continue                # built lazily on first read
+            row = self.store.row(table, key)
+            if row is not None:
+                df = self.tables[table]
+                for col in [c for c in row if c not in df.columns]:
+                    df[col] = None
+                df.loc[key, list(row.keys())] = list(row.values())
+        for table, key in changed.get("drop", ()):
+            if table in self.tables:
+                self.tables[table] = self.tables[table].drop(index=key, errors="ignore")
+        self.metrics.update(self.store.snapshot_metrics(changed.get("metric", ())))
+
+    # ---------------- tables ----------------
+    def table(self, name):
+        if name not in self.tables:
+            rows = self.store.snapshot_rows(name)
+            self.tables[name] = pd.DataFrame.from_dict(rows, orient="index")
+        return self.tables[name]
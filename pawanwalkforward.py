@@ -0,0 +1,175 @@
+# ============================================================
+# PAWAN WALK-FORWARD (OUT-OF-SAMPLE VALIDATION OF THE SWEEP)
+# - Indicators + per-entry TP × SL returns computed ONCE over the
+#   whole history (pawansweep, npz-cached)
+# - Per-param running sums over entries, taken only at fold
+#   boundaries (prefix sums): any train / test window is
+#   P[hi] - P[lo], all folds in one fancy-index
+# - Best params picked on each train window, scored on the next
+#   test window; symbols run in parallel processes
+# - Train entries whose MAX_HOLD horizon reaches into the test
+#   window are purged: no test bar ever scores a training trade
+# Cost is O(entries × params) + O(folds × params), never
+# O(folds × bars).
+# ============================================================
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pawansweep import (CACHE_DIR, DEFAULT_GRID, MAX_HOLD, grid_params, load_csvs,
+                        prepare_symbol, score)
+
+METRICS = ("trades", "wins", "ret", "gross_win", "gross_loss")
+DAY_NS = 86_400 * 10**9
+
+# ============================================================
+# FOLDS
+# ============================================================
+def make_folds(start_ns, end_ns, train_days=20, test_days=5, step_days=None):
+    """
+    Rolling (train_start, train_end, test_end) boundaries in epoch ns.
+    """
+    step = (step_days or test_days) * DAY_NS
+    train, test = train_days * DAY_NS, test_days * DAY_NS
+    out = []
+    t = start_ns
+    while t + train + test <= end_ns + DAY_NS:
+        out.append((t, t + train, t + train + test))
+        t += step
+    return np.asarray(out, dtype=np.int64).reshape(-1, 3)
+
+# ============================================================
+# PREFIX SUMS PER SYMBOL
+# ============================================================
+def boundary_sums(mask, R, bounds):
+    """
+    Running per-param sums evaluated only at the entry indices in
+    `bounds` (sorted, unique, starting at 0): each entry is folded in
+    exactly once, memory is O(len(bounds) × params).
+    Returns metric -> (len(bounds), combos · tp·sl).
+    """
+    out = {k: np.zeros((len(bounds), mask.shape[0] * R.shape[1])) for k in METRICS}
+    for j in range(1, len(bounds)):
+        a, b = bounds[j - 1], bounds[j]
+        seg = score(mask[:, a:b], R[a:b]) if b > a else None
+        for k in METRICS:
+            out[k][j] = out[k][j - 1] + (seg[k] if seg is not None else 0.0)
+    return out
+
+def _fold_sums(job):
+    symbol, df, grid, cache_dir, max_hold, folds = job
+    p = prepare_symbol(symbol, df, grid, cache_dir, max_hold)
+    if p is None or not len(p["ts"]):
+        return symbol, None
+    ts = p["ts"]                                            # entries in time order
+    cuts = np.searchsorted(ts, folds)                       # folds × (lo, mid, hi)
+    # horizons are monotone in entry time: train ends at the first entry
+    # whose exit window would reach the test start
+    purge = np.clip(np.searchsorted(p["horizon_ts"], folds[:, 1]), cuts[:, 0], cuts[:, 1])
+    bounds = np.unique(np.r_[0, cuts.ravel(), purge])
+    P = boundary_sums(p["mask"], p["R"], bounds)
+    lo, mid, hi = np.searchsorted(bounds, cuts).T
+    cut = np.searchsorted(bounds, purge)
+    train = {k: v[cut] - v[lo] for k, v in P.items()}       # folds × params
+    test = {k: v[hi] - v[mid] for k, v in P.items()}
+    return symbol, (train, test)
+
+# ============================================================
+# RUNNER
+# ============================================================
+def _pick(train, min_trades):
+    ret = np.where(train["trades"] >= min_trades, train["ret"], -np.inf)
+    return np.argmax(ret, axis=1)
+
+def walk_forward(frames, grid=None, train_days=20, test_days=5, step_days=None,
+                 workers=None, cache_dir=CACHE_DIR, max_hold=MAX_HOLD, min_trades=5):
+    """
+    frames: symbol -> OHLC DataFrame. Returns (per-fold report, summary).
+    """
+    t0 = time.perf_counter()
+    grid = grid or DEFAULT_GRID
+    params = grid_params(grid)
+
+    ts_min, ts_max = [], []
+    for df in frames.values():
+        t = pd.to_datetime(df[next(k for k in ("end", "timestamp", "bucket", "time") if k in df)])
+        ts_min.append(t.min().normalize())
+        ts_max.append(t.max())
+    folds = make_folds(min(ts_min).value, max(ts_max).value, train_days, test_days, step_days)
+    if not len(folds):
+        return pd.DataFrame(), {"folds": 0, "seconds": round(time.perf_counter() - t0, 3)}
+
+    zero = lambda: {k: np.zeros((len(folds), len(params))) for k in METRICS}
+    train, test = zero(), zero()
+    jobs = [(s, df, grid, cache_dir, max_hold, folds) for s, df in frames.items()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for symbol, res in pool.map(_fold_sums, jobs):
+            if res is None:
+                continue
+            for k in METRICS:
+                train[k] += res[0][k]
+                test[k] += res[1][k]
+
+    best = _pick(train, min_trades)
+    f = np.arange(len(folds))
+    valid = train["trades"][f, best] >= min_trades
+    rows = []
+    for i in f:
+        row = {
+            "fold": i,
+            "train_start": pd.Timestamp(folds[i, 0]),
+            "test_start": pd.Timestamp(folds[i, 1]),
+            "test_end": pd.Timestamp(folds[i, 2]),
+        }
+        if valid[i]:
+            row.update(params.iloc[best[i]].to_dict())
+        tt, ts_ = int(train["trades"][i, best[i]]), int(test["trades"][i, best[i]])
+        row.update({
+            "train_trades": tt if valid[i] else 0,
+            "train_ret_pct": train["ret"][i, best[i]] * 100 if valid[i] else np.nan,
+            "test_trades": ts_ if valid[i] else 0,
+            "test_win_rate": test["wins"][i, best[i]] / ts_ if valid[i] and ts_ else np.nan,
+            "test_ret_pct": test["ret"][i, best[i]] * 100 if valid[i] else 0.0,
+        })
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    num = report.select_dtypes("number").columns
+    report[num] = report[num].round(4)
+
+    summary = {
+        "folds": len(folds),
+        "symbols": len(frames),
+        "combos": len(params),
+        "oos_trades": int(report["test_trades"].sum()),
+        "oos_ret_pct": round(float(report["test_ret_pct"].sum()), 4),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    return report, summary
+
+# ============================================================
+# CLI: python pawanwalkforward.py data/*.csv --train-days 20 --test-days 5
+# ============================================================
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Walk-forward validation of the Pawangi threshold sweep")
+    ap.add_argument("csv", nargs="+", help="one CSV per symbol: timestamp,open,high,low,close")
+    ap.add_argument("--train-days", type=int, default=20)
+    ap.add_argument("--test-days", type=int, default=5)
+    ap.add_argument("--step-days", type=int, default=None)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-hold", type=int, default=MAX_HOLD)
+    ap.add_argument("--min-trades", type=int, default=5)
+    ap.add_argument("--out", default=None, help="write the per-fold report to this CSV")
+    args = ap.parse_args()
+
+    report, summary = walk_forward(load_csvs(args.csv), train_days=args.train_days,
+                                   test_days=args.test_days, step_days=args.step_days,
+                                   workers=args.workers, max_hold=args.max_hold,
+                                   min_trades=args.min_trades)
+    print(report.to_string())
+    print("✅", ", ".join(f"{k}={v}" for k, v in summary.items()))
+    if args.out:
+        report.to_csv(args.out, index=False)
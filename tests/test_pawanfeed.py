@@ -0,0 +1,123 @@
+# ============================================================
+# FEED SUPERVISOR / HISTORICAL BACKFILL
+# Loopback feed (pawanfeedsim) + a fake getCandleData
+# ============================================================
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pawanfeed import FeedSupervisor, HistoricalBackfill, ShardedFeedManager
+from pawanfeedsim import FeedHub, SyntheticFeed, loopback_factory
+
+FMT = "%Y-%m-%d %H:%M"
+
+class FakeHistory:
+    """
+    getCandleData over [fromdate, todate): one flat bar per minute.
+    on_call(params) runs inside the call (probes, delays).
+    """
+    def __init__(self, on_call=None):
+        self.calls = []
+        self.on_call = on_call
+        self._lock = threading.Lock()
+
+    def getCandleData(self, params):
+        with self._lock:
+            self.calls.append((time.monotonic(), params))
+        if self.on_call:
+            self.on_call(params)
+        t, end = datetime.strptime(params["fromdate"], FMT), datetime.strptime(params["todate"], FMT)
+        rows = []
+        while t < end:
+            rows.append([t.isoformat(), 100.0, 101.0, 99.0, 100.5, 0])
+            t += timedelta(minutes=1)
+        return {"status": True, "data": rows}
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+# ---------------- rate limit ----------------
+def test_rate_limit_is_shared_across_threads():
+    smart = FakeHistory()
+    bf = HistoricalBackfill(smart, lambda *a: None, min_call_gap=0.05)
+    now = datetime.now()
+    threads = [threading.Thread(target=bf.fetch, args=(str(i), 2, now, now)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamps = sorted(ts for ts, _ in smart.calls)
+    assert len(stamps) == 6
+    assert min(b - a for a, b in zip(stamps, stamps[1:])) >= 0.045
+
+# ---------------- same-minute outage ----------------
+def test_outage_inside_one_minute_is_replayed_up_to_reconnect():
+    smart, ticks = FakeHistory(), []
+    bf = HistoricalBackfill(smart, lambda tok, px, ts: ticks.append(ts), min_call_gap=0)
+    down_at = datetime(2026, 10, 19, 10, 15, 5)
+    until = datetime(2026, 10, 19, 10, 15, 40)
+
+    assert bf("1", 2, down_at, until) == 1
+    params = smart.calls[0][1]
+    assert (params["fromdate"], params["todate"]) == ("2026-10-19 10:15", "2026-10-19 10:16")
+    assert ticks == [datetime(2026, 10, 19, 10, 15, s) for s in (0, 15, 30)]
+
+# ---------------- end to end: stall → reconnect → backfill ----------------
+def test_backfill_runs_off_the_worker_and_lands_before_live_ticks():
+    hub = FeedHub(SyntheticFeed(tokens=["1", "2"], rate=200, seed=7)).start()
+    events, lock = [], threading.Lock()
+
+    def on_tick(ws, msg):
+        with lock:
+            events.append(("live", msg["token"], msg["sequence_number"]))
+
+    def replay_tick(token, px, ts):
+        with lock:
+            events.append(("replay", token, None))
+
+    feed = ShardedFeedManager(loopback_factory(hub), on_tick, reconnect_delay=0.05)
+    feed.subscribe(["1", "2", "999"])          # 999 never ticks
+    shard = feed.shards[0]
+
+    worker_free = []
+    def probe(params):
+        # the shard worker must keep running while history is fetched
+        ran = threading.Event()
+        shard.submit(ran.set)
+        worker_free.append(ran.wait(1.0))
+        time.sleep(0.2)
+    bf = HistoricalBackfill(FakeHistory(on_call=probe), replay_tick, min_call_gap=0.05)
+    sup = FeedSupervisor(feed, backfill=bf, stale_after=0.3, check_every=0.05)
+
+    feed.start()
+    sup.start()
+    try:
+        assert wait_for(lambda: shard.ticks_done > 50)
+        mark = []
+        on_reconnect = shard.on_reconnect
+        shard.on_reconnect = lambda s: (mark.append(hub.seq), on_reconnect(s))
+        hub.stall(0.5)
+        assert wait_for(lambda: sup.metrics["backfilled_tokens"] == 2)
+        assert wait_for(lambda: sum(1 for e in events if e[0] == "live" and e[2] >= mark[0]) > 20)
+    finally:
+        sup.stop()
+        feed.stop()
+        hub.stop()
+
+    assert sup.metrics["stale_detections"] >= 1
+    assert sup.metrics["backfill_skipped"] == 1
+    assert sup.metrics["backfill_errors"] == 0
+    assert worker_free and all(worker_free)
+    with lock:
+        seen = list(events)
+    for token in ("1", "2"):
+        kinds = [(k, seq) for k, tok, seq in seen if tok == token]
+        last_replay = max(i for i, (k, _) in enumerate(kinds) if k == "replay")
+        after = [i for i, (k, seq) in enumerate(kinds) if k == "live" and seq >= mark[0]]
+        assert after and min(after) > last_replay